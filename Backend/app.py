@@ -1,24 +1,73 @@
 # Backend/app.py - Merged Complete Version
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 # Update your import line
 from summarizer import (
     generate_summary, 
+    generate_budgeted_summary,
+    generate_fast_summary,
     generate_detailed_summary, 
     generate_structured_summary,
     generate_long_structured_summary,  # Add this
     generate_extended_summary,         # Add this
-    generate_multi_level_summary       # Add this
+    generate_multi_level_summary,      # Add this
+    get_summary_cache_stats,
+    invalidate_summary_cache,
+    start_model_warmup,
+    get_model_status,
+    get_summary_model,
+    should_regenerate_summary,
+    stream_summary,
+    text_content_hash,
+    SummaryPlan,
+    EXTRACTIVE_MODES
 )
 from utils.quiz_generator import generate_quiz_and_flashcards
-from utils.pdf_reader import extract_text_from_pdf
+from utils.ingest_queue import (
+    INGEST_STAGES,
+    cancel_ingest_jobs,
+    enqueue_ingest_job,
+    get_job_for_file
+)
+from utils.blob_store import acquire_blob, ensure_blob_indexes, find_processed_artefacts, release_blob, save_and_hash
+from utils.daily_stats import (
+    ensure_daily_stats_indexes,
+    get_daily_stats,
+    get_user_totals,
+    record_answer_activity,
+    record_answers_activity,
+    record_quiz_completion
+)
+from utils.lecture_catalog import (
+    VALID_QUESTION_QUERY,
+    ensure_lecture_indexes,
+    get_lectures_collection,
+    record_lecture_answer,
+    record_lecture_created
+)
+from utils.request_params import PROGRESS_WINDOWS, parse_budget_seconds, parse_progress_days
+from utils.text_store import (
+    BLOB_FIELDS,
+    ensure_text_store_indexes,
+    has_stored_text,
+    iter_field,
+    load_field,
+    load_file_text,
+    release_blobs,
+    summary_preview,
+    update_file_fields
+)
 from werkzeug.utils import secure_filename
 from datetime import datetime, timezone, timedelta
 from database import quiz_collection, flashcard_collection, db
 import os
 import math
+import time
+import json
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import uuid
 from dotenv import load_dotenv
 from flask_jwt_extended import JWTManager
@@ -51,12 +100,68 @@ def root():
 def health_check():
     return jsonify({'status': 'healthy', 'authentication': 'enabled'}), 200
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: summarization model and MongoDB state with timings"""
+    model_status = get_model_status()
+    
+    mongo_status = {'ready': False, 'ping_ms': None, 'error': None}
+    try:
+        start = time.time()
+        db.command('ping')
+        mongo_status['ping_ms'] = round((time.time() - start) * 1000, 1)
+        mongo_status['ready'] = True
+    except Exception as e:
+        mongo_status['error'] = str(e)
+    
+    ready = model_status['ready'] and mongo_status['ready']
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'ready': ready,
+        'model': model_status,
+        'mongo': mongo_status
+    }), 200 if ready else 503
+
+# The debug reloader's parent process only watches files, and spawned worker
+# processes re-import this module as __mp_main__; neither should load BART.
+# Uploads are processed by separate workers: python scripts/ingest_worker.py
+if __name__ != "__mp_main__" and (__name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+    start_model_warmup()
+
+try:
+    ensure_blob_indexes()
+    ensure_text_store_indexes()
+    # Per-user, newest-first file listing (/uploads keyset pagination)
+    db["files"].create_index([("uploaded_by", 1), ("createdAt", -1), ("_id", -1)])
+    ensure_lecture_indexes()
+    ensure_daily_stats_indexes()
+except Exception as e:
+    print(f"⚠️ Index setup failed: {e}")
+
+# How often the streamed upload status re-reads the file document
+UPLOAD_STATUS_POLL_SECONDS = 1
+
+# File list views never load extracted text or full summaries: long summaries
+# are shown by their stored preview, everything else comes from /summary/<id>
+FILE_LIST_EXCLUDED_FIELDS = ('text', 'content', 'page_offsets', 'multi_level_summary')
+
 # Collections for comprehensive tracking
 quiz_results_collection = db["quiz_results"]
 quiz_sessions_collection = db["quiz_sessions"]
 feedback_collection = db["feedback"]
 user_profiles_collection = db["user_profiles"]
 
+try:
+    # One session per attempt of a quiz by a user; quizzes, answers and
+    # /lectures read a user's latest attempt from it
+    quiz_sessions_collection.create_index([("user_id", 1), ("quiz_id", 1), ("attempt", -1)], unique=True)
+    # The lecture catalogue rebuild joins sessions by quiz_id
+    quiz_sessions_collection.create_index([("quiz_id", 1)])
+    # /progress lists one user's most recent completed sessions
+    quiz_sessions_collection.create_index([("user_id", 1), ("is_completed", 1), ("completed_at", -1)])
+except Exception as e:
+    print(f"⚠️ Quiz session index setup failed: {e}")
+
 # Respect existing upload folder structure
 UPLOAD_FOLDER = 'uploads'
 UPLOAD_SUBFOLDERS = {
@@ -105,15 +210,99 @@ def get_file_category(filename):
 
 # Backend/app.py - COMPLETE FIXED /uploads endpoint
 
+UPLOADS_PAGE_SIZE = 50
+UPLOADS_MAX_PAGE_SIZE = 200
+
+def encode_upload_cursor(file_doc):
+    """Keyset cursor: position of the last file on a page in (createdAt, _id) order"""
+    return f"{file_doc['createdAt'].isoformat()}|{file_doc['_id']}"
+
+def decode_upload_cursor(cursor):
+    """Filter for the files after the cursor position, newest first; ValueError if malformed"""
+    created_at, _, file_id = cursor.partition('|')
+    created_at = datetime.fromisoformat(created_at)
+    if not ObjectId.is_valid(file_id):
+        raise ValueError(f"bad file id in cursor: {file_id}")
+    return {'$or': [
+        {'createdAt': {'$lt': created_at}},
+        {'createdAt': created_at, '_id': {'$lt': ObjectId(file_id)}}
+    ]}
+
+def _is_set(field):
+    """Aggregation expression: field exists and is not null"""
+    return {'$not': [{'$in': [{'$type': f'${field}'}, ['missing', 'null']]}]}
+
+def _non_blank(field):
+    return {'$ne': [{'$trim': {'input': {'$ifNull': [f'${field}', '']}}}, '']}
+
+def get_upload_statistics(files_collection, user_id):
+    """Statistics over all of a user's files, computed by one $facet aggregation"""
+    has_summary = {'$or': [_non_blank('summary'), _is_set('summary_ref')]}
+    has_content = {'$or': [
+        _is_set('text_ref'), {'$gt': [{'$ifNull': ['$text_length', 0]}, 0]},
+        _non_blank('content'), _non_blank('text')
+    ]}
+    has_structured = {'$or': [
+        {'$eq': ['$has_structured_summary', True]},
+        _is_set('structured_summary'),
+        _is_set('structured_summary_ref')
+    ]}
+    has_compression = {'$gt': [{'$ifNull': ['$compression_ratio', 0]}, 0]}
+    
+    pipeline = [
+        {'$match': {'uploaded_by': user_id}},
+        {'$facet': {
+            'totals': [{'$group': {
+                '_id': None,
+                'total_files': {'$sum': 1},
+                'processed_files': {'$sum': {'$cond': [{'$and': [has_summary, has_content]}, 1, 0]}},
+                'files_with_summaries': {'$sum': {'$cond': [has_summary, 1, 0]}},
+                'files_with_structured_summaries': {'$sum': {'$cond': [has_structured, 1, 0]}},
+                'compression_total': {'$sum': {'$cond': [has_compression, '$compression_ratio', 0]}},
+                'compression_count': {'$sum': {'$cond': [has_compression, 1, 0]}}
+            }}],
+            'summary_types': [{'$group': {'_id': {'$ifNull': ['$summary_type', 'unknown']}, 'count': {'$sum': 1}}}],
+            'categories': [{'$group': {'_id': {'$ifNull': ['$category', 'documents']}}}]
+        }}
+    ]
+    facets = next(files_collection.aggregate(pipeline), {})
+    
+    totals = (facets.get('totals') or [{}])[0]
+    total_files = totals.get('total_files', 0)
+    processed_files = totals.get('processed_files', 0)
+    compression_count = totals.get('compression_count', 0)
+    summary_type_counts = {row['_id']: row['count'] for row in facets.get('summary_types', [])}
+    
+    statistics = {
+        'total_files': total_files,
+        'processed_files': processed_files,
+        'files_with_summaries': totals.get('files_with_summaries', 0),
+        'files_with_structured_summaries': totals.get('files_with_structured_summaries', 0),
+        'processing_rate': round((processed_files / total_files * 100), 1) if total_files > 0 else 0,
+        'average_compression_ratio': round(totals['compression_total'] / compression_count, 1) if compression_count else 0,
+        'summary_types': {
+            summary_type: summary_type_counts.get(summary_type, 0)
+            for summary_type in ('brief', 'detailed', 'comprehensive', 'structured', 'unknown')
+        }
+    }
+    filters = {
+        'categories': [row['_id'] for row in facets.get('categories', [])],
+        'summary_types': list(summary_type_counts),
+        'processing_status': ['all', 'processed', 'unprocessed', 'with_summaries', 'with_structured']
+    }
+    return statistics, filters
+
 @app.route('/uploads', methods=['GET'])
 def get_uploads():
-    """Get files from your existing database structure with enhanced summary data"""
+    """
+    One page of a user's files, newest first, with statistics over all of
+    them. Pass the returned next_cursor as ?cursor= to get the next page.
+    """
     try:
         user_id = request.args.get('user_id')
         include_structured = request.args.get('structured', 'false').lower() == 'true'
         
         print(f"📡 /uploads called with user_id: {user_id}")
-        print(f"📡 Request headers: {dict(request.headers)}")
         print(f"📡 Request args: {dict(request.args)}")
         
         if not user_id:
@@ -124,16 +313,36 @@ def get_uploads():
                 'received_params': dict(request.args)
             }), 400
         
+        try:
+            limit = int(request.args.get('limit', UPLOADS_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+        limit = max(1, min(limit, UPLOADS_MAX_PAGE_SIZE))
+        
+        query = {'uploaded_by': user_id}
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                query.update(decode_upload_cursor(cursor))
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+        
         print(f"📁 Fetching files for user: {user_id}")
         
         # Access your existing files collection
         files_collection = db["files"]
         
-        # Get all files for now (add user filtering later)
         try:
-            files_cursor = files_collection.find().sort("createdAt", -1)
-            total_count = files_collection.count_documents({})
-            print(f"📊 Total files in database: {total_count}")
+            projection = {field: 0 for field in FILE_LIST_EXCLUDED_FIELDS}
+            if not include_structured:
+                projection['structured_summary'] = 0
+            # One extra document tells whether another page follows
+            file_docs = list(
+                files_collection.find(query, projection)
+                .sort([("createdAt", -1), ("_id", -1)])
+                .limit(limit + 1)
+            )
+            statistics, filters = get_upload_statistics(files_collection, user_id)
         except Exception as db_error:
             print(f"❌ Database query error: {db_error}")
             return jsonify({
@@ -141,12 +350,13 @@ def get_uploads():
                 'error': f'Database error: {str(db_error)}'
             }), 500
         
-        uploads = []
-        processed_count = 0
+        has_more = len(file_docs) > limit
+        file_docs = file_docs[:limit]
+        next_cursor = encode_upload_cursor(file_docs[-1]) if has_more and file_docs[-1].get('createdAt') else None
         
-        for file_doc in files_cursor:
+        uploads = []
+        for file_doc in file_docs:
             try:
-                processed_count += 1
                 file_id = str(file_doc["_id"])
                 
                 # Handle date formatting safely
@@ -163,6 +373,9 @@ def get_uploads():
                 else:
                     last_summarized = None
                 
+                summary = summary_preview(file_doc)
+                has_content = has_stored_text(file_doc)
+                
                 # Create consistent file object with enhanced summary data
                 upload_item = {
                     "_id": file_id,
@@ -174,38 +387,45 @@ def get_uploads():
                     ),
                     "filename": file_doc.get("filename", f"doc_{file_id[-8:]}.txt"),
                     "category": file_doc.get("category", "documents"),
-                    "size": file_doc.get("size") or len(str(file_doc.get("content", ""))),
+                    "size": file_doc.get("size") or file_doc.get("text_length", 0),
                     "upload_date": upload_date,
                     "user_id": file_doc.get("user_id") or file_doc.get("uploaded_by", user_id),
                     "status": file_doc.get("status", "uploaded"),
-                    "content": file_doc.get("content", ""),
-                    "text": file_doc.get("text", file_doc.get("content", "")),
-                    "summary": file_doc.get("summary", ""),
+                    # Full text is served by /summary/<id>
+                    "content": "",
+                    "text": "",
+                    "content_url": f"/summary/{file_id}",
+                    "summary": summary,
+                    "summary_truncated": bool(file_doc.get("summary_ref")),
                     
                     # Enhanced summary metadata
                     "summary_type": file_doc.get("summary_type", "unknown"),
-                    "summary_length": file_doc.get("summary_length", len(file_doc.get("summary", ""))),
-                    "text_length": file_doc.get("text_length", len(str(file_doc.get("content", "")))),
+                    "summary_length": file_doc.get("summary_length", len(summary)),
+                    "text_length": file_doc.get("text_length", 0),
                     "compression_ratio": file_doc.get("compression_ratio", 0),
                     "last_summarized": last_summarized,
                     "processing_error": file_doc.get("processing_error"),
                     
                     # File processing status
-                    "has_summary": bool(file_doc.get("summary", "").strip()),
-                    "has_content": bool(file_doc.get("content", "").strip()),
-                    "is_processed": bool(file_doc.get("summary", "").strip() and file_doc.get("content", "").strip()),
+                    "has_summary": bool(summary.strip()),
+                    "has_content": has_content,
+                    "is_processed": bool(summary.strip() and has_content),
                     
                     # Additional metadata
                     "subfolder": file_doc.get("subfolder", "documents"),
                     "filepath": file_doc.get("filepath", "")
                 }
                 
-                # Include structured summary if requested and available
-                if include_structured and file_doc.get("structured_summary"):
-                    upload_item["structured_summary"] = file_doc["structured_summary"]
+                # Include structured summary if requested and available; long
+                # ones live in the text store
+                structured_summary = load_field(file_doc, "structured_summary") if include_structured else None
+                if structured_summary:
+                    upload_item["structured_summary"] = structured_summary
                     upload_item["has_structured_summary"] = True
                 else:
-                    upload_item["has_structured_summary"] = bool(file_doc.get("structured_summary"))
+                    upload_item["has_structured_summary"] = bool(
+                        file_doc.get("has_structured_summary") or file_doc.get("structured_summary") or file_doc.get("structured_summary_ref")
+                    )
                 
                 uploads.append(upload_item)
                 
@@ -213,17 +433,7 @@ def get_uploads():
                 print(f"⚠️ Error processing file {file_doc.get('_id', 'unknown')}: {item_error}")
                 continue
         
-        print(f"✅ Successfully processed {len(uploads)} out of {processed_count} files")
-        
-        # Calculate summary statistics
-        total_files = len(uploads)
-        processed_files = len([f for f in uploads if f['is_processed']])
-        files_with_summaries = len([f for f in uploads if f['has_summary']])
-        files_with_structured = len([f for f in uploads if f['has_structured_summary']])
-        
-        # Calculate average compression ratio for processed files
-        compression_ratios = [f['compression_ratio'] for f in uploads if f['compression_ratio'] > 0]
-        avg_compression = sum(compression_ratios) / len(compression_ratios) if compression_ratios else 0
+        total_files = statistics['total_files']
         
         # Return enhanced response format
         response_data = {
@@ -231,36 +441,26 @@ def get_uploads():
             'files': uploads,
             'uploads': uploads,  # Include both for compatibility
             'total': total_files,
+            'count': len(uploads),
             'user_id': user_id,
             'message': f'Found {total_files} files',
             
-            # Enhanced statistics
-            'statistics': {
-                'total_files': total_files,
-                'processed_files': processed_files,
-                'files_with_summaries': files_with_summaries,
-                'files_with_structured_summaries': files_with_structured,
-                'processing_rate': round((processed_files / total_files * 100), 1) if total_files > 0 else 0,
-                'average_compression_ratio': round(avg_compression, 1),
-                'summary_types': {
-                    'brief': len([f for f in uploads if f.get('summary_type') == 'brief']),
-                    'detailed': len([f for f in uploads if f.get('summary_type') == 'detailed']),
-                    'comprehensive': len([f for f in uploads if f.get('summary_type') == 'comprehensive']),
-                    'structured': len([f for f in uploads if f.get('summary_type') == 'structured']),
-                    'unknown': len([f for f in uploads if f.get('summary_type') == 'unknown'])
-                }
+            # Keyset pagination
+            'pagination': {
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': next_cursor
             },
             
+            # Enhanced statistics
+            'statistics': statistics,
+            
             # Filtering and sorting options
-            'filters': {
-                'categories': list(set([f['category'] for f in uploads])),
-                'summary_types': list(set([f.get('summary_type', 'unknown') for f in uploads])),
-                'processing_status': ['all', 'processed', 'unprocessed', 'with_summaries', 'with_structured']
-            }
+            'filters': filters
         }
         
-        print(f"📤 Returning response with {len(uploads)} files and enhanced metadata")
-        print(f"📊 Processing stats: {processed_files}/{total_files} processed, {files_with_summaries} with summaries")
+        print(f"📤 Returning {len(uploads)} of {total_files} files (has_more: {has_more})")
+        print(f"📊 Processing stats: {statistics['processed_files']}/{total_files} processed, {statistics['files_with_summaries']} with summaries")
         
         return jsonify(response_data), 200
 
@@ -286,7 +486,7 @@ def debug_uploads():
         total_files = files_collection.count_documents({})
         
         # Get first few files as samples
-        sample_files = list(files_collection.find().limit(3))
+        sample_files = list(files_collection.find({}, {field: 0 for field in FILE_LIST_EXCLUDED_FIELDS}).limit(3))
         
         debug_info = {
             'database_connected': True,
@@ -294,7 +494,7 @@ def debug_uploads():
             'sample_files': [
                 {
                     '_id': str(f.get('_id', 'missing')),
-                    'has_content': bool(f.get('content')),
+                    'has_content': has_stored_text(f),
                     'has_filename': bool(f.get('filename')),
                     'has_original_name': bool(f.get('original_name')),
                     'keys': list(f.keys())
@@ -376,9 +576,9 @@ def upload_file():
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
-        # Save file to disk
-        file.save(filepath)
-        print(f"💾 File saved to: {filepath}")
+        # Save file to disk, hashing it on the way so identical uploads share one copy
+        content_sha256, actual_size = save_and_hash(file, filepath)
+        print(f"💾 File saved to: {filepath} (sha256 {content_sha256[:12]})")
         
         # Verify file was actually saved
         if not os.path.exists(filepath):
@@ -386,11 +586,16 @@ def upload_file():
             print(f"❌ {error_msg}")
             return jsonify({'success': False, 'error': error_msg}), 500
         
-        actual_size = os.path.getsize(filepath)
         print(f"✅ File saved successfully. Actual size: {actual_size} bytes")
         
         category = get_file_category(file.filename)
         
+        blob, is_duplicate = acquire_blob(content_sha256, filepath, actual_size, category)
+        if is_duplicate:
+            # Same bytes were uploaded before: point at the stored copy
+            filepath = blob['filepath']
+            print(f"♻️ Duplicate upload, linked to stored blob {filepath} ({blob['ref_count']} references)")
+        
         # Create comprehensive document for your database
         file_doc = {
             'original_name': file.filename,
@@ -402,60 +607,45 @@ def upload_file():
             'uploaded_at': datetime.utcnow(),
             'status': 'uploaded',
             'filepath': filepath,
+            'content_sha256': content_sha256,
+            'blob_id': blob['_id'],
             'createdAt': datetime.utcnow(),
             'updatedAt': datetime.utcnow(),
             'received_via_key': file_key  # Track which key was used
         }
         
-        # Process text content for documents/PDFs
-        # In your upload_file() function, update the text processing section:
-        if category in ['documents', 'pdfs']:
-            try:
-                if category == 'pdfs':
-                    extracted_text = extract_text_from_pdf(filepath)
-                else:
-                    # For text files, read directly
-                    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                        extracted_text = f.read()
-                
-                # Generate both standard and structured summaries
-                summary = generate_detailed_summary(extracted_text)
-                structured_summary = generate_long_structured_summary(extracted_text, "detailed")
-                
-                file_doc.update({
-                    'text': extracted_text,
-                    'content': extracted_text,
-                    'summary': summary,
-                    'structured_summary': structured_summary,  # Add structured summary
-                    'text_length': len(extracted_text),
-                    'summary_length': len(summary) if summary else 0,
-                    'compression_ratio': round(len(summary) / len(extracted_text) * 100, 2) if extracted_text and len(extracted_text) > 0 else 0,
-                    'summary_type': 'detailed',
-                    'last_summarized': datetime.utcnow(),
-                    'has_structured_summary': True  # Flag indicating structured summary exists
-                })
-                
-                print(f"📝 Processed text content: {len(extracted_text)} chars, summary: {len(summary)} chars")
-                
-            except Exception as e:
-                print(f"⚠️ Text processing error: {e}")
-                file_doc.update({
-                    'text': '',
-                    'content': '',
-                    'summary': 'Failed to process text content',
-                    'structured_summary': None,
-                    'text_length': 0,
-                    'processing_error': str(e),
-                    'has_structured_summary': False
-                })
+        # Documents/PDFs are extracted and summarized by the ingest workers;
+        # the request only stores the file and queues the job. A duplicate of
+        # an already processed upload takes over its results instead.
+        needs_processing = category in ['documents', 'pdfs']
+        artefacts = find_processed_artefacts(content_sha256) if needs_processing and is_duplicate else None
+        if artefacts:
+            file_doc.update(artefacts)
+            file_doc['status'] = 'processed'
+            needs_processing = False
+            print(f"♻️ Reusing text and summaries of file {artefacts['reused_from']}")
+        elif needs_processing:
+            file_doc['status'] = 'queued'
         
         # Store in your existing files collection
         files_collection = db["files"]
-        result = files_collection.insert_one(file_doc)
+        try:
+            result = files_collection.insert_one(file_doc)
+        except Exception:
+            release_blob(blob['_id'])
+            if artefacts:
+                release_blobs(artefacts.get(f'{field}_ref') for field in BLOB_FIELDS)
+            raise
         file_id = str(result.inserted_id)
         
         print(f"✅ File stored with ID: {file_id}")
         
+        if needs_processing:
+            job = enqueue_ingest_job(result.inserted_id, filepath, category, {
+                'budget_seconds': parse_budget_seconds(request.form.get('budget_ms'))
+            })
+            print(f"📥 Queued ingest job {job['_id']}")
+        
         return jsonify({
             'success': True,
             'message': f'File {file.filename} uploaded successfully',
@@ -464,10 +654,14 @@ def upload_file():
             'filename': unique_filename,
             'category': category,
             'size': actual_size,
-            'processed': len(file_doc.get('content', '')) > 0,
-            'has_summary': bool(file_doc.get('summary', '').strip()),
+            'status': file_doc['status'],
+            'processed': bool(artefacts),
+            'has_summary': bool(artefacts),
+            'duplicate': is_duplicate,
+            'reused_from': str(artefacts['reused_from']) if artefacts else None,
+            'status_url': f'/upload/{file_id}/status' if needs_processing else None,
             'received_via_key': file_key
-        }), 200
+        }), 202 if needs_processing else 200
         
     except Exception as e:
         error_msg = f'Upload failed: {str(e)}'
@@ -476,6 +670,113 @@ def upload_file():
         traceback.print_exc()
         return jsonify({'success': False, 'error': error_msg}), 500
     
+def build_upload_status(file_doc):
+    """Processing status of an uploaded file and its latest ingest job"""
+    status = {
+        'success': True,
+        'file_id': str(file_doc['_id']),
+        'status': file_doc.get('status', 'uploaded'),
+        'stage': file_doc.get('processing_stage'),
+        'error': file_doc.get('processing_error'),
+        'has_summary': bool(summary_preview(file_doc).strip()),
+        'job': None
+    }
+    
+    job = get_job_for_file(file_doc['_id'])
+    if job:
+        stages = job.get('stages', {})
+        finished = [stage for stage in INGEST_STAGES if (stages.get(stage) or {}).get('seconds') is not None]
+        status['job'] = {
+            'job_id': str(job['_id']),
+            'status': job['status'],
+            'stage': job.get('stage'),
+            'attempts': job.get('attempts', 0),
+            'max_attempts': job.get('max_attempts'),
+            'error': job.get('error'),
+            'progress': round(len(finished) / len(INGEST_STAGES) * 100),
+            'stage_seconds': {stage: (stages.get(stage) or {}).get('seconds') for stage in INGEST_STAGES},
+            'retry_at': job['run_after'].isoformat() if job['status'] == 'queued' and job.get('attempts') else None,
+            'created_at': job['created_at'].isoformat(),
+            'finished_at': job['finished_at'].isoformat() if job.get('finished_at') else None
+        }
+    return status
+
+@app.route('/upload/<file_id>/status', methods=['GET'])
+def get_upload_status(file_id):
+    """
+    Ingest progress for an uploaded file. ?stream=true sends server-sent
+    'status' events until the file is processed or failed.
+    """
+    if not ObjectId.is_valid(file_id):
+        return jsonify({'success': False, 'error': 'Invalid file id'}), 400
+    
+    files_collection = db["files"]
+    projection = {'status': 1, 'processing_stage': 1, 'processing_error': 1, 'summary': 1, 'summary_preview': 1}
+    file_doc = files_collection.find_one({'_id': ObjectId(file_id)}, projection)
+    if not file_doc:
+        return jsonify({'success': False, 'error': 'File not found'}), 404
+    
+    if request.args.get('stream', 'false').lower() != 'true':
+        return jsonify(build_upload_status(file_doc)), 200
+    
+    def generate():
+        last_status = None
+        doc = file_doc
+        while doc is not None:
+            status = build_upload_status(doc)
+            if status != last_status:
+                yield sse_event('status', status)
+                last_status = status
+            if status['status'] not in ('queued', 'processing'):
+                return
+            time.sleep(UPLOAD_STATUS_POLL_SECONDS)
+            doc = files_collection.find_one({'_id': doc['_id']}, projection)
+    
+    return sse_response(generate())
+
+@app.route('/file/<file_id>', methods=['DELETE'])
+def delete_file(file_id):
+    """
+    Delete an uploaded file. The stored bytes are shared by every upload with
+    the same content hash and only leave the disk with the last reference.
+    """
+    try:
+        if not ObjectId.is_valid(file_id):
+            return jsonify({'success': False, 'error': 'Invalid file id'}), 400
+
+        files_collection = db["files"]
+        file_doc = files_collection.find_one_and_delete(
+            {'_id': ObjectId(file_id)},
+            projection={'blob_id': 1, 'filepath': 1, 'original_name': 1,
+                        **{f'{field}_ref': 1 for field in BLOB_FIELDS}}
+        )
+        if not file_doc:
+            return jsonify({'success': False, 'error': 'File not found'}), 404
+
+        cancelled_jobs = cancel_ingest_jobs(file_doc['_id'])
+        release_blobs(file_doc.get(f'{field}_ref') for field in BLOB_FIELDS)
+
+        if file_doc.get('blob_id') is not None:
+            blob_removed = release_blob(file_doc['blob_id'])
+        else:
+            # Uploaded before deduplication: the file on disk belongs to this document alone
+            filepath = file_doc.get('filepath')
+            blob_removed = bool(filepath) and os.path.exists(filepath)
+            if blob_removed:
+                os.remove(filepath)
+
+        print(f"🗑️ Deleted file {file_id} ({file_doc.get('original_name')}), stored copy removed: {blob_removed}")
+        return jsonify({
+            'success': True,
+            'file_id': file_id,
+            'blob_removed': blob_removed,
+            'cancelled_jobs': cancelled_jobs
+        }), 200
+
+    except Exception as e:
+        print(f"❌ Error deleting file {file_id}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/admin/fix-files', methods=['POST'])
 def fix_existing_files():
     """One-time fix for existing files in database - adds missing metadata"""
@@ -517,20 +818,44 @@ def fix_existing_files():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/admin/summary-cache', methods=['GET'])
+def summary_cache_stats():
+    """Hit/miss counters for the summary cache"""
+    return jsonify({"success": True, "cache": get_summary_cache_stats()}), 200
+
+@app.route('/admin/summary-cache/invalidate', methods=['POST'])
+def summary_cache_invalidate():
+    """Drop cached summaries and chunk summaries, optionally only those of one model"""
+    try:
+        data = request.get_json(silent=True) or {}
+        removed = invalidate_summary_cache(data.get('model_id'))
+        return jsonify({
+            "success": True,
+            "message": f"Invalidated summary cache ({removed} stored entries removed)",
+            "removed": removed
+        }), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/debug/files', methods=['GET'])
 def debug_files():
     """Debug route to see what's in your files collection"""
     try:
         files_collection = db["files"]
         
-        # Get all files (limit to 10 for safety)
-        all_files = list(files_collection.find().limit(10))
+        # Get all files (limit to 10 for safety), without the large text fields
+        all_files = list(files_collection.find({}, {field: 0 for field in FILE_LIST_EXCLUDED_FIELDS}).limit(10))
         
         # Convert ObjectIds to strings
         for file_doc in all_files:
             file_doc["_id"] = str(file_doc["_id"])
-            if "uploaded_by" in file_doc and isinstance(file_doc["uploaded_by"], ObjectId):
-                file_doc["uploaded_by"] = str(file_doc["uploaded_by"])
+            for field in ("uploaded_by", "blob_id", "reused_from"):
+                if isinstance(file_doc.get(field), ObjectId):
+                    file_doc[field] = str(file_doc[field])
+            for field in BLOB_FIELDS:
+                ref = file_doc.get(f"{field}_ref")
+                if ref:
+                    file_doc[f"{field}_ref"] = {**ref, "blob_id": str(ref["blob_id"])}
         
         return jsonify({
             "success": True,
@@ -635,6 +960,7 @@ def generate_quiz_route():
         # Insert into database
         if quiz_docs:
             quiz_collection.insert_many(quiz_docs)
+            record_lecture_created(quiz_docs)
             print(f"💾 Saved {len(quiz_docs)} questions for lecture: {lecture_title}")
             
         if flashcard_docs:
@@ -656,141 +982,146 @@ def generate_quiz_route():
         return jsonify({'error': f'Failed to generate quiz: {str(e)}'}), 500
 
 # ===== GET LECTURES (Fixed score display + Enhanced features) =====
+LECTURES_PAGE_SIZE = 50
+LECTURES_MAX_PAGE_SIZE = 200
+
+def format_lecture(doc, session=None, questions=None):
+    """
+    Shape a lecture catalogue document like the per-quiz payload the frontend
+    expects; progress comes from the user's latest session of the quiz
+    """
+    total_questions = doc.get('question_count', 0)
+    session = session or {}
+    completed = session.get('questions_completed') or 0
+    last_attempt = session.get('completed_at') or session.get('last_updated')
+    scored_attempts = doc.get('scored_attempts', 0)
+    
+    lecture = {
+        'quiz_id': doc['_id'],
+        'lecture_title': doc.get('lecture_title', 'Untitled Quiz'),
+        'total_questions': total_questions,
+        'difficulty': doc.get('difficulty', 'Medium'),
+        'topic_tags': doc.get('topic_tags', []),
+        'created_at': doc['created_at'].isoformat() if doc.get('created_at') else None,
+        'created_by': doc.get('created_by', 'anonymous'),
+        'source_summary': doc.get('source_summary', ''),
+        'progress': {
+            'completed': completed,
+            'total': total_questions,
+            'percentage': int((completed / (session.get('total_questions') or 1)) * 100),
+            'is_completed': session.get('is_completed') or False,
+            'current_question': session.get('current_question') or 1,
+            'final_score': session.get('final_score'),
+            'attempt': session.get('attempt', 0),
+            'last_attempt': last_attempt.isoformat() if last_attempt else None
+        },
+        'stats': {
+            'attempts': doc.get('attempts', 0),
+            'best_score': doc.get('best_score') or 0,
+            'average_score': doc['score_total'] / scored_attempts if scored_attempts else 0,
+            'total_time': doc.get('total_time', 0)
+        }
+    }
+    if questions is not None:
+        lecture['questions'] = questions
+    return lecture
+
+def get_latest_sessions(user_id, quiz_ids):
+    """The user's latest attempt at each of several quizzes, keyed by quiz_id"""
+    latest = {}
+    cursor = quiz_sessions_collection.find(
+        {'user_id': user_id, 'quiz_id': {'$in': list(quiz_ids)}},
+        {'answers': 0}
+    ).sort([('quiz_id', 1), ('attempt', -1)])
+    for session in cursor:
+        latest.setdefault(session['quiz_id'], session)
+    return latest
+
+def get_lecture_questions(quiz_ids):
+    """Questions of several lectures from one indexed query, keyed by quiz_id"""
+    questions = {quiz_id: [] for quiz_id in quiz_ids}
+    cursor = quiz_collection.find(
+        {'quiz_id': {'$in': list(quiz_ids)}, **VALID_QUESTION_QUERY},
+        {'quiz_id': 1, 'question': 1, 'options': 1, 'answer': 1, 'question_number': 1}
+    )
+    for quiz in cursor:
+        lecture_questions = questions[quiz['quiz_id']]
+        lecture_questions.append({
+            'question_id': str(quiz['_id']),
+            'question': quiz['question'],
+            'options': quiz['options'],
+            'answer': quiz['answer'],
+            'question_number': quiz.get('question_number', len(lecture_questions) + 1)
+        })
+    for lecture_questions in questions.values():
+        # Sort questions by question_number
+        lecture_questions.sort(key=lambda x: x.get('question_number', 0))
+    return questions
+
 @app.route('/lectures', methods=['GET'])
 def get_lectures():
-    """Get all lectures with comprehensive progress and metadata"""
+    """
+    Lectures with progress and metadata, newest first, read from the lecture
+    catalogue. ?page= and ?limit= page through them; ?questions=false leaves
+    out each lecture's embedded questions. Progress is that of ?user_id=.
+    """
     try:
         print("📚 Fetching lectures with enhanced data...")
         
         # Get query parameters for filtering
+        user_id = request.args.get('user_id', 'anonymous')
         search = request.args.get('search', '').strip()
         difficulty_filter = request.args.get('difficulty', '').strip()
         tag_filter = request.args.get('tag', '').strip()
-        user_id = request.args.get('user_id', 'anonymous')
+        include_questions = request.args.get('questions', 'true').lower() != 'false'
+        
+        try:
+            page = max(1, int(request.args.get('page', 1)))
+            limit = max(1, min(int(request.args.get('limit', LECTURES_PAGE_SIZE)), LECTURES_MAX_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'page and limit must be integers'}), 400
         
         # Build query
-        query = {
-            'question': {'$ne': None, '$exists': True, '$ne': ''},
-            'options': {'$ne': None, '$exists': True, '$not': {'$size': 0}},
-            'answer': {'$ne': None, '$exists': True, '$ne': ''}
-        }
+        query = {}
         
         # Add filters
         if difficulty_filter and difficulty_filter != 'all':
             query['difficulty'] = difficulty_filter
             
         if tag_filter:
-            query['topic_tags'] = {'$in': [tag_filter]}
+            query['topic_tags'] = tag_filter
             
         if search:
-            query['$or'] = [
-                {'question': {'$regex': search, '$options': 'i'}},
-                {'lecture_title': {'$regex': search, '$options': 'i'}}
-            ]
-        
-        # Get all matching quizzes
-        quizzes = list(quiz_collection.find(query).sort('created_at', -1))
-        print(f"📊 Found {len(quizzes)} total quiz questions")
-        
-        # Group by quiz_id and lecture_title
-        lectures = {}
-        
-        for quiz in quizzes:
-            quiz_id = quiz.get('quiz_id', str(quiz['_id']))
-            lecture_title = quiz.get('lecture_title', 'Untitled Quiz')
-            
-            if quiz_id not in lectures:
-                lectures[quiz_id] = {
-                    'quiz_id': quiz_id,
-                    'lecture_title': lecture_title,
-                    'questions': [],
-                    'total_questions': quiz.get('total_questions', 1),
-                    'difficulty': quiz.get('difficulty', 'Medium'),
-                    'topic_tags': quiz.get('topic_tags', []),
-                    'created_at': quiz.get('created_at'),
-                    'created_by': quiz.get('created_by', 'anonymous'),
-                    'source_summary': quiz.get('source_summary', ''),
-                    'progress': {
-                        'completed': 0,
-                        'total': quiz.get('total_questions', 1),
-                        'percentage': 0,
-                        'is_completed': False,
-                        'current_question': 1,
-                        'final_score': None,
-                        'last_attempt': None
-                    },
-                    'stats': {
-                        'attempts': 0,
-                        'best_score': 0,
-                        'average_score': 0,
-                        'total_time': 0
-                    }
-                }
-            
-            # Add question to lecture
-            lectures[quiz_id]['questions'].append({
-                'question_id': str(quiz['_id']),
-                'question': quiz['question'],
-                'options': quiz['options'],
-                'answer': quiz['answer'],
-                'question_number': quiz.get('question_number', len(lectures[quiz_id]['questions']) + 1)
-            })
-        
-        # Get progress and stats for each lecture - FIXED SCORE DISPLAY
-        for quiz_id, lecture_data in lectures.items():
-            # Get current session
-            session = quiz_sessions_collection.find_one({'quiz_id': quiz_id})
-            if session:
-                lecture_data['progress'] = {
-                    'completed': session.get('questions_completed', 0),
-                    'total': session.get('total_questions', lecture_data['total_questions']),
-                    'percentage': int((session.get('questions_completed', 0) / session.get('total_questions', 1)) * 100),
-                    'is_completed': session.get('is_completed', False),
-                    'current_question': session.get('current_question', 1),
-                    'final_score': session.get('final_score'),  # FIXED: This now properly retrieves the score
-                    'last_attempt': session.get('completed_at', session.get('last_updated'))
-                }
-            
-            # Get all-time stats
-            all_sessions = list(quiz_sessions_collection.find({
-                'quiz_id': quiz_id,
-                'is_completed': True
-            }))
-            
-            if all_sessions:
-                scores = [s.get('final_score', 0) for s in all_sessions if s.get('final_score') is not None]
-                times = [s.get('total_time', 0) for s in all_sessions if s.get('total_time') is not None]
-                
-                lecture_data['stats'] = {
-                    'attempts': len(all_sessions),
-                    'best_score': max(scores) if scores else 0,
-                    'average_score': sum(scores) / len(scores) if scores else 0,
-                    'total_time': sum(times) if times else 0
-                }
-            
-            # Update total_questions based on actual questions
-            actual_question_count = len(lecture_data['questions'])
-            lecture_data['total_questions'] = actual_question_count
-            lecture_data['progress']['total'] = actual_question_count
-            
-            # Sort questions by question_number
-            lecture_data['questions'].sort(key=lambda x: x.get('question_number', 0))
-            
-            # Format dates for JSON
-            if lecture_data['created_at']:
-                lecture_data['created_at'] = lecture_data['created_at'].isoformat()
-            if lecture_data['progress']['last_attempt']:
-                lecture_data['progress']['last_attempt'] = lecture_data['progress']['last_attempt'].isoformat()
-        
-        # Convert to list and sort
-        lecture_list = list(lectures.values())
-        lecture_list.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+            query['search_text'] = {'$regex': search, '$options': 'i'}
+        
+        lectures_collection = get_lectures_collection()
+        docs = list(
+            lectures_collection.find(query)
+            .sort([('created_at', -1), ('_id', -1)])
+            .skip((page - 1) * limit)
+            .limit(limit)
+        )
+        total_lectures = lectures_collection.count_documents(query)
+        
+        quiz_ids = [doc['_id'] for doc in docs]
+        sessions = get_latest_sessions(user_id, quiz_ids)
+        questions = get_lecture_questions(quiz_ids) if include_questions else {}
+        lecture_list = [
+            format_lecture(doc, sessions.get(doc['_id']), questions.get(doc['_id']) if include_questions else None)
+            for doc in docs
+        ]
         
-        print(f"📚 Returning {len(lecture_list)} lectures with enhanced data")
+        print(f"📚 Returning {len(lecture_list)} of {total_lectures} lectures with enhanced data")
         
         return jsonify({
             'lectures': lecture_list,
-            'total_lectures': len(lecture_list),
+            'total_lectures': total_lectures,
+            'pagination': {
+                'page': page,
+                'limit': limit,
+                'total_pages': math.ceil(total_lectures / limit),
+                'has_more': page * limit < total_lectures
+            },
             'available_tags': get_available_tags(),
             'available_difficulties': ['Easy', 'Medium', 'Hard']
         }), 200
@@ -802,23 +1133,62 @@ def get_lectures():
         return jsonify({'error': f'Failed to fetch lectures: {str(e)}'}), 500
 
 def get_available_tags():
-    """Get all unique tags from quizzes"""
+    """Get all unique tags from the lecture catalogue (answered from the topic_tags index)"""
     try:
-        pipeline = [
-            {'$unwind': '$topic_tags'},
-            {'$group': {'_id': '$topic_tags'}},
-            {'$sort': {'_id': 1}}
-        ]
-        tags = [doc['_id'] for doc in quiz_collection.aggregate(pipeline)]
-        return tags
+        return sorted(get_lectures_collection().distinct('topic_tags'))
     except:
         return []
 
 # ===== QUIZ ROUTES (Enhanced with proper score tracking) =====
+def get_or_start_session(quiz_id, user_id, lecture_title, total_questions):
+    """
+    The user's latest attempt at a quiz while it is unfinished, otherwise a
+    new attempt. Starting one is an upsert on the unique (user_id, quiz_id,
+    attempt) key, so concurrent requests end up sharing the same session.
+    """
+    for retry in range(2):
+        latest = quiz_sessions_collection.find_one(
+            {'user_id': user_id, 'quiz_id': quiz_id},
+            {'answers': 0},
+            sort=[('attempt', -1)]
+        )
+        if latest and not latest.get('is_completed'):
+            return latest
+
+        attempt = (latest.get('attempt') or 1) + 1 if latest else 1
+        key = {'user_id': user_id, 'quiz_id': quiz_id, 'attempt': attempt}
+        new_session = {
+            'lecture_title': lecture_title,
+            'total_questions': total_questions,
+            'current_question': 1,
+            'questions_completed': 0,
+            'is_completed': False,
+            'started_at': datetime.utcnow(),
+            'answers': []
+        }
+        try:
+            # Returns the existing session, or None when this call inserted it
+            existing = quiz_sessions_collection.find_one_and_update(
+                key,
+                {'$setOnInsert': new_session},
+                projection={'answers': 0},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Another request started this attempt first; the retry resumes it
+            if retry:
+                raise
+            continue
+        if existing:
+            return existing
+        print(f"📝 Started attempt {attempt} of quiz {quiz_id} for {user_id}")
+        return {**key, **new_session}
+
 @app.route('/quiz/<quiz_id>', methods=['GET'])
 def get_quiz(quiz_id):
     """Get quiz for taking with enhanced session management"""
     try:
+        user_id = request.args.get('user_id', 'anonymous')
         print(f"🎯 Getting quiz: {quiz_id}")
         
         # Get questions for this quiz
@@ -838,22 +1208,8 @@ def get_quiz(quiz_id):
         if not questions:
             return jsonify({'error': 'Quiz not found'}), 404
         
-        # Get or create quiz session
-        session = quiz_sessions_collection.find_one({'quiz_id': quiz_id})
-        if not session:
-            session = {
-                'quiz_id': quiz_id,
-                'lecture_title': questions[0]['lecture_title'],
-                'total_questions': len(questions),
-                'current_question': 1,
-                'questions_completed': 0,
-                'is_completed': False,
-                'started_at': datetime.utcnow(),
-                'answers': [],
-                'user_id': 'anonymous'
-            }
-            quiz_sessions_collection.insert_one(session)
-            print(f"📝 Created new quiz session for {quiz_id}")
+        # Resume the user's unfinished attempt or start a new one
+        session = get_or_start_session(quiz_id, user_id, questions[0]['lecture_title'], len(questions))
         
         # Format questions for frontend
         formatted_questions = []
@@ -874,6 +1230,7 @@ def get_quiz(quiz_id):
             'questions': formatted_questions,
             'total_questions': len(formatted_questions),
             'session': {
+                'attempt': session.get('attempt', 1),
                 'current_question': session['current_question'],
                 'questions_completed': session['questions_completed'],
                 'is_completed': session['is_completed'],
@@ -893,6 +1250,96 @@ def get_quiz(quiz_id):
         print(f"❌ Error getting quiz: {str(e)}")
         return jsonify({'error': f'Failed to get quiz: {str(e)}'}), 500
 
+def build_answer_update(answers, now):
+    """
+    Update pipeline recording answers on a quiz session. The server appends
+    them, advances the counters and, once every question is answered,
+    completes the session and computes its score in the same write, so
+    concurrent answers never overwrite each other.
+    """
+    def when_completed(expression):
+        return {'$cond': ['$is_completed', expression, '$$REMOVE']}
+
+    return [
+        {'$set': {
+            # $literal: answer values are user input and may start with '$'
+            'answers': {'$concatArrays': [{'$ifNull': ['$answers', []]}, {'$literal': answers}]},
+            'questions_completed': {'$add': [{'$ifNull': ['$questions_completed', 0]}, len(answers)]},
+            'current_question': {'$min': [{'$add': ['$current_question', len(answers)]}, '$total_questions']},
+            'last_updated': now
+        }},
+        {'$set': {'is_completed': {'$gte': ['$questions_completed', '$total_questions']}}},
+        {'$set': {
+            'completed_at': when_completed(now),
+            'correct_answers': when_completed({'$size': {'$filter': {
+                'input': '$answers',
+                'cond': {'$eq': ['$$this.is_correct', True]}
+            }}}),
+            'total_time': when_completed({'$sum': '$answers.time_taken'})
+        }},
+        {'$set': {
+            'final_score': when_completed(
+                {'$round': [{'$multiply': [{'$divide': ['$correct_answers', '$total_questions']}, 100]}, 1]}
+            ),
+            'average_time_per_question': when_completed(
+                {'$round': [{'$divide': ['$total_time', '$total_questions']}, 1]}
+            ),
+            'incorrect_answers': when_completed({'$subtract': ['$total_questions', '$correct_answers']})
+        }},
+        {'$set': {'accuracy_percentage': when_completed('$final_score')}}
+    ]
+
+
+def answer_progress(session, last_question):
+    """Response payload for a session just updated by build_answer_update"""
+    total_questions = session['total_questions']
+    is_completed = session['is_completed']
+    progress = {
+        'attempt': session.get('attempt', 1),
+        'question_completed': last_question,
+        'questions_remaining': max(0, total_questions - session['questions_completed']),
+        'quiz_completed': is_completed,
+        'next_question': session['current_question'] if not is_completed else None,
+        'progress_percentage': round((session['questions_completed'] / total_questions) * 100, 1)
+    }
+    if is_completed:
+        progress.update({
+            'final_score': session['final_score'],
+            'total_time': session['total_time'],
+            'correct_answers': session['correct_answers'],
+            'accuracy_percentage': session['accuracy_percentage']
+        })
+    return progress
+
+
+def record_session_activity(quiz_id, session, user_id):
+    """Fold an updated session into the derived daily rollups and lecture catalogue"""
+    try:
+        if session['is_completed']:
+            record_quiz_completion(user_id, session['completed_at'], session['final_score'])
+    except Exception as rollup_error:
+        print(f"⚠️ Daily stats update failed for {user_id}: {rollup_error}")
+
+    try:
+        record_lecture_answer(quiz_id, session)
+    except Exception as catalog_error:
+        # The catalogue is derived data; scripts/rebuild_lectures.py repairs it
+        print(f"⚠️ Lecture catalogue update failed for {quiz_id}: {catalog_error}")
+
+
+def open_session_query(quiz_id, user_id, attempt=None):
+    """Matches the user's unfinished attempt at a quiz (a given one, or any)"""
+    query = {'user_id': user_id, 'quiz_id': quiz_id, 'is_completed': {'$ne': True}}
+    if attempt is not None:
+        query['attempt'] = attempt
+    return query
+
+
+def session_not_updated(quiz_id, user_id):
+    if quiz_sessions_collection.count_documents({'user_id': user_id, 'quiz_id': quiz_id}, limit=1):
+        return jsonify({'error': 'Quiz already completed'}), 409
+    return jsonify({'error': 'Session not found'}), 404
+
 @app.route('/quiz/<quiz_id>/answer', methods=['POST'])
 def submit_answer(quiz_id):
     """Submit answer with enhanced tracking and FIXED score calculation"""
@@ -905,14 +1352,36 @@ def submit_answer(quiz_id):
         time_taken = data.get('time_taken', 0)
         question_number = data.get('question_number', 1)
         user_id = data.get('user_id', 'anonymous')
+        attempt = data.get('attempt')
         
         if not question_id or not selected_answer:
             return jsonify({'error': 'Question ID and selected answer required'}), 400
         
         is_correct = selected_answer == correct_answer
+        answered_at = datetime.utcnow()
+        
+        # One round trip: append the answer and, on the last question,
+        # complete the session with its score, all inside MongoDB
+        session = quiz_sessions_collection.find_one_and_update(
+            open_session_query(quiz_id, user_id, attempt),
+            build_answer_update([{
+                'question_number': question_number,
+                'question_id': question_id,
+                'selected_answer': selected_answer,
+                'correct_answer': correct_answer,
+                'is_correct': is_correct,
+                'time_taken': time_taken,
+                'answered_at': answered_at
+            }], answered_at),
+            projection={'answers': 0},
+            sort=[('attempt', -1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if session is None:
+            return session_not_updated(quiz_id, user_id)
         
         # Save detailed answer result
-        answer_result = {
+        quiz_results_collection.insert_one({
             'quiz_id': quiz_id,
             'question_id': question_id,
             'question_number': question_number,
@@ -920,96 +1389,153 @@ def submit_answer(quiz_id):
             'correct_answer': correct_answer,
             'is_correct': is_correct,
             'time_taken': time_taken,
-            'answered_at': datetime.utcnow(),
+            'answered_at': answered_at,
             'user_id': user_id,
-            'session_id': f"{quiz_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
-        }
-        
-        quiz_results_collection.insert_one(answer_result)
+            'attempt': session.get('attempt', 1),
+            'session_id': f"{quiz_id}_{answered_at.strftime('%Y%m%d_%H%M%S')}"
+        })
         print(f"💾 Saved answer for Q{question_number}: {'✅' if is_correct else '❌'} ({time_taken}s)")
         
-        # Update quiz session with PROPER score calculation
-        session = quiz_sessions_collection.find_one({'quiz_id': quiz_id})
-        if session:
-            new_completed = session['questions_completed'] + 1
-            new_current = session['current_question'] + 1
-            total_questions = session['total_questions']
-            
-            # Add answer to session
-            session_answers = session.get('answers', [])
-            session_answers.append({
-                'question_number': question_number,
-                'question_id': question_id,
-                'selected_answer': selected_answer,
-                'correct_answer': correct_answer,
-                'is_correct': is_correct,
-                'time_taken': time_taken,
-                'answered_at': datetime.utcnow()
-            })
-            
-            # Check if quiz is completed
-            is_completed = new_completed >= total_questions
-            
-            # Update session
-            update_data = {
-                'questions_completed': new_completed,
-                'current_question': min(new_current, total_questions),
-                'answers': session_answers,
-                'last_updated': datetime.utcnow(),
-                'user_id': user_id
-            }
-            
-            if is_completed:
-                update_data['is_completed'] = True
-                update_data['completed_at'] = datetime.utcnow()
-                
-                # FIXED: Proper final score calculation
-                correct_count = sum(1 for ans in session_answers if ans['is_correct'])
-                final_score = round((correct_count / total_questions) * 100, 1)
-                total_time = sum(ans['time_taken'] for ans in session_answers)
-                average_time = round(total_time / total_questions, 1)
-                
-                update_data.update({
-                    'final_score': final_score,  # FIXED: This will now save correctly
-                    'total_time': total_time,
-                    'average_time_per_question': average_time,
-                    'correct_answers': correct_count,
-                    'incorrect_answers': total_questions - correct_count,
-                    'accuracy_percentage': final_score
-                })
-                
-                print(f"🎉 Quiz completed! Score: {final_score}% ({correct_count}/{total_questions})")
-            
-            quiz_sessions_collection.update_one(
-                {'quiz_id': quiz_id},
-                {'$set': update_data}
-            )
-            
-            response_data = {
-                'is_correct': is_correct,
-                'question_completed': question_number,
-                'questions_remaining': max(0, total_questions - new_completed),
-                'quiz_completed': is_completed,
-                'next_question': new_current if not is_completed else None,
-                'progress_percentage': round((new_completed / total_questions) * 100, 1)
-            }
-            
-            if is_completed:
-                response_data.update({
-                    'final_score': update_data['final_score'],
-                    'total_time': update_data['total_time'],
-                    'correct_answers': update_data['correct_answers'],
-                    'accuracy_percentage': update_data['accuracy_percentage']
-                })
-            
-            return jsonify(response_data), 200
+        try:
+            record_answer_activity(user_id, answered_at, is_correct, time_taken)
+        except Exception as rollup_error:
+            # Rollups are derived data; scripts/backfill_daily_stats.py rebuilds them
+            print(f"⚠️ Daily stats update failed for {user_id}: {rollup_error}")
         
-        return jsonify({'error': 'Session not found'}), 404
+        if session['is_completed']:
+            print(f"🎉 Quiz completed! Score: {session['final_score']}% ({session['correct_answers']}/{session['total_questions']})")
+        record_session_activity(quiz_id, session, user_id)
+        
+        return jsonify({'is_correct': is_correct, **answer_progress(session, question_number)}), 200
         
     except Exception as e:
         print(f"❌ Error submitting answer: {str(e)}")
         return jsonify({'error': f'Failed to submit answer: {str(e)}'}), 500
 
+@app.route('/quiz/<quiz_id>/answers', methods=['POST'])
+def submit_answers(quiz_id):
+    """
+    Submit every answer of an attempt at once ("submit at end" exams, offline
+    clients). Answers are graded against the stored questions, saved with one
+    insert and recorded with one session update; the response carries the
+    same progress and completion fields as /quiz/<quiz_id>/answer.
+    """
+    try:
+        data = request.get_json() or {}
+        user_id = data.get('user_id', 'anonymous')
+        attempt = data.get('attempt')
+        submitted = data.get('answers')
+        
+        if not isinstance(submitted, list) or not submitted:
+            return jsonify({'error': 'answers must be a non-empty list'}), 400
+        
+        questions = {
+            str(q['_id']): q
+            for q in quiz_collection.find({'quiz_id': quiz_id}, {'answer': 1, 'question_number': 1})
+        }
+        if not questions:
+            # Try fallback for old structure
+            try:
+                question = quiz_collection.find_one({'_id': ObjectId(quiz_id)}, {'answer': 1, 'question_number': 1})
+                if question:
+                    questions = {quiz_id: question}
+            except:
+                pass
+        if not questions:
+            return jsonify({'error': 'Quiz not found'}), 404
+        
+        seen = set()
+        for answer in submitted:
+            question_id = answer.get('question_id') if isinstance(answer, dict) else None
+            if not question_id or not answer.get('selected_answer'):
+                return jsonify({'error': 'Every answer needs a question_id and a selected_answer'}), 400
+            if question_id not in questions:
+                return jsonify({'error': f'Question {question_id} is not part of this quiz'}), 400
+            if question_id in seen:
+                return jsonify({'error': f'Question {question_id} is answered more than once'}), 400
+            seen.add(question_id)
+        
+        answered_at = datetime.utcnow()
+        answers = []
+        for answer in submitted:
+            question = questions[answer['question_id']]
+            answers.append({
+                'question_number': question.get('question_number', answer.get('question_number', 1)),
+                'question_id': answer['question_id'],
+                'selected_answer': answer['selected_answer'],
+                'correct_answer': question['answer'],
+                'is_correct': answer['selected_answer'] == question['answer'],
+                'time_taken': answer.get('time_taken', 0),
+                'answered_at': answered_at
+            })
+        
+        # One session update for the whole batch; the attempt must still have
+        # room for every answer in it, and none of the questions may already
+        # be answered in it
+        session = quiz_sessions_collection.find_one_and_update(
+            {
+                **open_session_query(quiz_id, user_id, attempt),
+                'answers.question_id': {'$nin': list(seen)},
+                '$expr': {'$lte': [{'$add': ['$questions_completed', len(answers)]}, '$total_questions']}
+            },
+            build_answer_update(answers, answered_at),
+            projection={'answers': 0},
+            sort=[('attempt', -1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if session is None:
+            open_session = quiz_sessions_collection.find_one(
+                open_session_query(quiz_id, user_id, attempt),
+                {'answers.question_id': 1},
+                sort=[('attempt', -1)]
+            )
+            if open_session is None:
+                return session_not_updated(quiz_id, user_id)
+            answered = seen & {answer.get('question_id') for answer in open_session.get('answers', [])}
+            if answered:
+                return jsonify({
+                    'error': 'Some questions were already answered in this attempt',
+                    'answered_question_ids': sorted(answered)
+                }), 409
+            return jsonify({'error': 'More answers than unanswered questions in this attempt'}), 409
+        
+        session_id = f"{quiz_id}_{answered_at.strftime('%Y%m%d_%H%M%S')}"
+        results = [
+            {**answer, 'quiz_id': quiz_id, 'user_id': user_id, 'attempt': session.get('attempt', 1), 'session_id': session_id}
+            for answer in answers
+        ]
+        quiz_results_collection.insert_many(results)
+        correct_count = sum(1 for answer in answers if answer['is_correct'])
+        print(f"💾 Saved {len(answers)} answers for quiz {quiz_id}: {correct_count} correct")
+        
+        try:
+            record_answers_activity(user_id, answered_at, results)
+        except Exception as rollup_error:
+            # Rollups are derived data; scripts/backfill_daily_stats.py rebuilds them
+            print(f"⚠️ Daily stats update failed for {user_id}: {rollup_error}")
+        
+        if session['is_completed']:
+            print(f"🎉 Quiz completed! Score: {session['final_score']}% ({session['correct_answers']}/{session['total_questions']})")
+        record_session_activity(quiz_id, session, user_id)
+        
+        return jsonify({
+            'results': [
+                {
+                    'question_id': answer['question_id'],
+                    'question_number': answer['question_number'],
+                    'is_correct': answer['is_correct'],
+                    'correct_answer': answer['correct_answer']
+                }
+                for answer in answers
+            ],
+            'correct_in_batch': correct_count,
+            **answer_progress(session, max(answer['question_number'] for answer in answers))
+        }), 200
+        
+    except Exception as e:
+        print(f"❌ Error submitting answers: {str(e)}")
+        return jsonify({'error': f'Failed to submit answers: {str(e)}'}), 500
+
 # ===== FEEDBACK SYSTEM =====
 @app.route('/feedback', methods=['POST'])
 def submit_feedback():
@@ -1108,62 +1634,62 @@ def get_feedback(item_id):
 # ===== PROGRESS STATISTICS =====
 @app.route('/progress', methods=['GET'])
 def get_progress():
-    """Get comprehensive progress statistics"""
+    """
+    Get comprehensive progress statistics. The daily series covers the last
+    ?days= days (7, 30, 90 or 365; default 30) including today and is read
+    from the user's daily rollups: one small document per active day, never
+    the raw answers.
+    """
     try:
         user_id = request.args.get('user_id', 'anonymous')
-        print(f"📊 Generating progress for user: {user_id}")
+        days = parse_progress_days(request.args.get('days'))
+        if days is None:
+            return jsonify({'error': f'days must be one of {", ".join(map(str, PROGRESS_WINDOWS))}'}), 400
+        print(f"📊 Generating progress for user: {user_id} ({days} days)")
         
-        # Basic counts
-        total_quizzes = len(set(quiz_collection.distinct('quiz_id')))
-        completed_sessions = quiz_sessions_collection.count_documents({
-            'is_completed': True,
-            'user_id': user_id
-        })
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        window_start = today - timedelta(days=days - 1)
         
-        # Get recent activity (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        daily_stats = get_daily_stats(user_id, window_start)
+        totals = get_user_totals(user_id)
         
-        daily_activity = []
-        for i in range(30):
-            day = thirty_days_ago + timedelta(days=i)
-            day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day.replace(hour=23, minute=59, second=59, microsecond=999999)
-            
-            # Count activity for this day
-            sessions_count = quiz_sessions_collection.count_documents({
-                'completed_at': {'$gte': day_start, '$lte': day_end},
-                'is_completed': True,
-                'user_id': user_id
-            })
-            
-            questions_answered = quiz_results_collection.count_documents({
-                'answered_at': {'$gte': day_start, '$lte': day_end},
-                'user_id': user_id
-            })
-            
-            daily_activity.append({
-                'date': day.strftime('%Y-%m-%d'),
-                'quizzes_completed': sessions_count,
-                'questions_answered': questions_answered,
-                'study_time': 0
-            })
+        # Recent sessions
+        recent_sessions = list(quiz_sessions_collection.find(
+            {'is_completed': True, 'user_id': user_id},
+            {'lecture_title': 1, 'final_score': 1, 'completed_at': 1, 'questions_completed': 1, 'total_time': 1}
+        ).sort('completed_at', -1).limit(5))
         
-        # Difficulty breakdown
+        # Quiz count and per-difficulty question counts from the lecture catalogue
         difficulty_breakdown = []
+        total_quizzes = 0
         try:
-            pipeline = [
-                {'$group': {'_id': '$difficulty', 'count': {'$sum': 1}}},
-                {'$sort': {'count': -1}}
-            ]
-            difficulty_breakdown = list(quiz_collection.aggregate(pipeline))
+            lecture_facets = next(get_lectures_collection().aggregate([
+                {'$facet': {
+                    'total': [{'$count': 'count'}],
+                    'difficulty': [
+                        {'$group': {'_id': '$difficulty', 'count': {'$sum': '$question_count'}}},
+                        {'$sort': {'count': -1}}
+                    ]
+                }}
+            ]), {})
+            total_quizzes = (lecture_facets.get('total') or [{}])[0].get('count', 0)
+            difficulty_breakdown = lecture_facets.get('difficulty', [])
         except Exception as e:
             print(f"Warning: Could not generate difficulty breakdown: {e}")
         
-        # Recent sessions
-        recent_sessions = list(quiz_sessions_collection.find({
-            'is_completed': True,
-            'user_id': user_id
-        }).sort('completed_at', -1).limit(5))
+        # Distinct quizzes: a retaken quiz counts once towards completion
+        completed_sessions = len(quiz_sessions_collection.distinct('quiz_id', {'user_id': user_id, 'is_completed': True}))
+        
+        daily_activity = []
+        for i in range(days):
+            date = (window_start + timedelta(days=i)).strftime('%Y-%m-%d')
+            day = daily_stats.get(date, {})
+            daily_activity.append({
+                'date': date,
+                'quizzes_completed': day.get('quizzes_completed', 0),
+                'questions_answered': day.get('questions_answered', 0),
+                'study_time': day.get('time_spent', 0)
+            })
         
         recent_sessions_formatted = []
         for session in recent_sessions:
@@ -1176,11 +1702,8 @@ def get_progress():
             })
         
         # Overall stats
-        total_answers = quiz_results_collection.count_documents({'user_id': user_id})
-        correct_answers = quiz_results_collection.count_documents({
-            'is_correct': True,
-            'user_id': user_id
-        })
+        total_answers = totals['questions_answered']
+        correct_answers = totals['correct_answers']
         accuracy = (correct_answers / total_answers * 100) if total_answers > 0 else 0
         
         # Calculate averages
@@ -1199,6 +1722,7 @@ def get_progress():
             'average_score': int(avg_score),
             'average_time': int(avg_time),
             'total_questions_answered': total_answers,
+            'window_days': days,
             'performance_data': daily_activity,
             'difficulty_breakdown': difficulty_breakdown,
             'recent_sessions': recent_sessions_formatted
@@ -1223,6 +1747,8 @@ def summarize_text():
         user_id = data.get('user_id', 'anonymous')
         summary_type = data.get('type', 'detailed')  # brief, detailed, comprehensive, extended
         output_format = data.get('format', 'text')   # text, structured, multi-level
+        mode = data.get('mode', 'abstractive')       # abstractive, or tfidf / textrank for a fast extractive summary
+        budget_seconds = parse_budget_seconds(data.get('budget_ms'))  # optional latency budget
         
         if not text:
             return jsonify({'error': 'No text provided'}), 400
@@ -1233,12 +1759,14 @@ def summarize_text():
         # Generate appropriate summary based on format
         if output_format == 'structured':
             # Use the new structured summary function
-            structured_result = generate_long_structured_summary(text, summary_type)
+            plan = SummaryPlan.with_budget(budget_seconds)
+            structured_result = generate_long_structured_summary(text, summary_type, plan=plan)
             return jsonify({
                 'success': True,
                 'result': structured_result,
                 'original_length': len(text),
                 'summary_type': 'structured',
+                'summary_path': plan.paths.get((text, 'comprehensive'), 'cache'),
                 'format': output_format
             })
             
@@ -1268,20 +1796,77 @@ def summarize_text():
             
         else:
             # Standard summary (brief, detailed, comprehensive)
-            summary = generate_summary(text, summary_type)
+            if mode in EXTRACTIVE_MODES:
+                summary, summary_path, summary_model = generate_fast_summary(text, summary_type, mode), 'extractive', None
+            else:
+                summary, summary_path = generate_budgeted_summary(text, summary_type, budget_seconds)
+                summary_model = get_summary_model(summary_type)
             return jsonify({
                 'success': True,
                 'summary': summary,
                 'original_length': len(text),
                 'summary_length': len(summary),
                 'compression_ratio': round(len(summary) / len(text) * 100, 1),
-                'summary_type': summary_type
+                'summary_type': summary_type,
+                'summary_mode': mode if mode in EXTRACTIVE_MODES else 'abstractive',
+                'summary_model': summary_model,
+                'summary_path': summary_path  # cache, abstractive, partial, extractive or passthrough
             })
             
     except Exception as e:
         print(f"❌ Summarization error: {str(e)}")
         return jsonify({'success': False, 'error': f'Summarization failed: {str(e)}'}), 500
 
+# Summary types that can be streamed chunk by chunk
+STREAMABLE_SUMMARY_TYPES = ['brief', 'detailed', 'comprehensive']
+
+def sse_event(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def sse_response(events):
+    """Wrap a generator of SSE strings in a non-buffered streaming response"""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/summarize/stream', methods=['POST'])
+def summarize_text_stream():
+    """Stream a summary as server-sent events: each chunk summary as it's ready, then the final summary"""
+    data = request.get_json() or {}
+    text = data.get('text', '')
+    summary_type = data.get('type', 'detailed')
+    
+    if not text:
+        return jsonify({'error': 'No text provided'}), 400
+    
+    if len(text.strip()) < 50:
+        return jsonify({'error': 'Text too short to summarize (minimum 50 characters)'}), 400
+    
+    if summary_type not in STREAMABLE_SUMMARY_TYPES:
+        return jsonify({'error': f'Streaming supports summary types: {", ".join(STREAMABLE_SUMMARY_TYPES)}'}), 400
+    
+    def generate():
+        try:
+            for event in stream_summary(text, summary_type):
+                payload = {k: v for k, v in event.items() if k != 'event'}
+                if event['event'] == 'summary':
+                    summary = event['summary']
+                    payload.update({
+                        'success': True,
+                        'original_length': len(text),
+                        'summary_length': len(summary),
+                        'compression_ratio': round(len(summary) / len(text) * 100, 1)
+                    })
+                yield sse_event(event['event'], payload)
+        except Exception as e:
+            print(f"❌ Streaming summarization error: {str(e)}")
+            yield sse_event('error', {'success': False, 'error': f'Summarization failed: {str(e)}'})
+    
+    return sse_response(generate())
+
 # 4. Add new endpoint for re-summarizing existing files
 @app.route('/file/<file_id>/re-summarize', methods=['POST'])
 def re_summarize_file(file_id):
@@ -1304,20 +1889,43 @@ def re_summarize_file(file_id):
         if not file_doc:
             return jsonify({"success": False, "error": "File not found"}), 404
         
-        text_content = file_doc.get('content', '') or file_doc.get('text', '')
+        text_content = load_file_text(file_doc)
         
         if not text_content:
             return jsonify({"success": False, "error": "No text content to summarize"}), 400
         
+        # Same text, type and model, and not fallback output: keep the stored
+        # summary unless the client forces a rerun
+        if (output_format == 'standard' and not data.get('force') and not file_doc.get('has_structured_summary')
+                and not should_regenerate_summary(file_doc, text_content, summary_type)):
+            stored_summary = load_field(file_doc, 'summary') or ''
+            return jsonify({
+                "success": True,
+                "message": f"Summary is already up to date ({summary_type} detail level, standard format)",
+                "standard_summary": stored_summary,
+                "summary_path": file_doc.get('summary_path'),
+                "summary_chunks": file_doc.get('summary_chunks'),
+                "summary_length": len(stored_summary),
+                "compression_ratio": file_doc.get('compression_ratio', 0),
+                "summary_model": file_doc.get('summary_model'),
+                "regenerated": False
+            }), 200
+        
         # Generate new summary based on format
         update_data = {
             'last_summarized': datetime.utcnow(),
-            'summary_type': summary_type
+            'summary_type': summary_type,
+            # Structured and multi-level summaries are built on the comprehensive summary
+            'summary_model': get_summary_model(summary_type if output_format == 'standard' else 'comprehensive'),
+            'text_hash': text_content_hash(text_content)
         }
+        plan = SummaryPlan.with_budget(parse_budget_seconds(data.get('budget_ms')))
         
         if output_format == 'structured':
-            result = generate_long_structured_summary(text_content, summary_type)
+            result = generate_long_structured_summary(text_content, summary_type, plan=plan)
             update_data.update({
+                # The stored summary comes from the comprehensive pass
+                'summary_path': plan.paths.get((text_content, 'comprehensive'), 'cache'),
                 'summary': result.get('full_summary', ''),
                 'structured_summary': result,
                 'summary_length': len(result.get('full_summary', '')),
@@ -1330,10 +1938,11 @@ def re_summarize_file(file_id):
             }
             
         elif output_format == 'multi-level':
-            result = generate_multi_level_summary(text_content)
+            result = generate_multi_level_summary(text_content, plan=plan)
             # Store the comprehensive summary as the main summary
             main_summary = result.get('comprehensive_summary', result.get('detailed_summary', ''))
             update_data.update({
+                'summary_path': plan.paths.get((text_content, 'comprehensive'), 'cache'),
                 'summary': main_summary,
                 'multi_level_summary': result,
                 'summary_length': len(main_summary),
@@ -1346,40 +1955,121 @@ def re_summarize_file(file_id):
             }
             
         else:
-            # Standard summary
-            new_summary = generate_summary(text_content, summary_type)
+            # Standard summary; only chunks whose text changed are regenerated
+            new_summary, summary_path = generate_budgeted_summary(text_content, summary_type, plan=plan)
+            summary_chunks = {
+                'reused': plan.stats['chunks_reused'],
+                'recomputed': plan.stats['chunks_recomputed']
+            }
             update_data.update({
                 'summary': new_summary,
                 'summary_length': len(new_summary),
                 'compression_ratio': round(len(new_summary) / len(text_content) * 100, 1),
+                'summary_path': summary_path,
+                'summary_chunks': summary_chunks,
                 'structured_summary': None,  # Clear structured if switching to standard
                 'has_structured_summary': False
             })
             response_data = {
-                "standard_summary": new_summary
+                "standard_summary": new_summary,
+                "summary_chunks": summary_chunks
             }
         
-        files_collection.update_one(
-            {"_id": file_doc["_id"]},
-            {"$set": update_data}
-        )
+        update_file_fields(file_doc["_id"], update_data)
         
         return jsonify({
             "success": True,
             "message": f"File re-summarized with {summary_type} detail level and {output_format} format",
             **response_data,
+            "summary_path": update_data['summary_path'],
             "summary_length": update_data.get('summary_length', 0),
-            "compression_ratio": update_data.get('compression_ratio', 0)
+            "compression_ratio": update_data.get('compression_ratio', 0),
+            "summary_model": update_data['summary_model'],
+            "regenerated": True
         }), 200
         
     except Exception as e:
         print(f"❌ Error re-summarizing file: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/file/<file_id>/re-summarize/stream', methods=['POST'])
+def re_summarize_file_stream(file_id):
+    """Re-generate a file's standard summary, streaming chunk summaries as server-sent events"""
+    data = request.get_json(silent=True) or {}
+    summary_type = data.get('type', 'detailed')
+    
+    if summary_type not in STREAMABLE_SUMMARY_TYPES:
+        return jsonify({"success": False, "error": f'Streaming supports summary types: {", ".join(STREAMABLE_SUMMARY_TYPES)}'}), 400
+    
+    files_collection = db["files"]
+    
+    # Build query safely
+    if ObjectId.is_valid(file_id):
+        query = {"$or": [{"filename": file_id}, {"_id": ObjectId(file_id)}]}
+    else:
+        query = {"filename": file_id}
+    
+    file_doc = files_collection.find_one(query)
+    
+    if not file_doc:
+        return jsonify({"success": False, "error": "File not found"}), 404
+    
+    text_content = load_file_text(file_doc)
+    
+    if not text_content:
+        return jsonify({"success": False, "error": "No text content to summarize"}), 400
+    
+    def generate():
+        try:
+            for event in stream_summary(text_content, summary_type):
+                if event['event'] != 'summary':
+                    yield sse_event(event['event'], {k: v for k, v in event.items() if k != 'event'})
+                    continue
+                
+                new_summary = event['summary']
+                summary_chunks = {
+                    'reused': event.get('chunks_reused', 0),
+                    'recomputed': event.get('chunks_recomputed', 0)
+                }
+                update_data = {
+                    'last_summarized': datetime.utcnow(),
+                    'summary_type': summary_type,
+                    'summary_model': get_summary_model(summary_type),
+                    'summary_path': event.get('summary_path'),
+                    'text_hash': text_content_hash(text_content),
+                    'summary_chunks': summary_chunks,
+                    'summary': new_summary,
+                    'summary_length': len(new_summary),
+                    'compression_ratio': round(len(new_summary) / len(text_content) * 100, 1),
+                    'structured_summary': None,  # Clear structured if switching to standard
+                    'has_structured_summary': False
+                }
+                update_file_fields(file_doc["_id"], update_data)
+                
+                yield sse_event('summary', {
+                    "success": True,
+                    "message": f"File re-summarized with {summary_type} detail level and standard format",
+                    "standard_summary": new_summary,
+                    "summary_length": update_data['summary_length'],
+                    "compression_ratio": update_data['compression_ratio'],
+                    "summary_model": update_data['summary_model'],
+                    "summary_path": update_data['summary_path'],
+                    "summary_chunks": summary_chunks,
+                    "cached": event.get('cached', False)
+                })
+        except Exception as e:
+            print(f"❌ Error streaming re-summarize: {e}")
+            yield sse_event('error', {"success": False, "error": str(e)})
+    
+    return sse_response(generate())
+
 # 5. Update the /summary/<file_id> endpoint to include structured data
 @app.route('/summary/<file_id>', methods=['GET'])
 def get_summary(file_id):
-    """Fetch summary + content with enhanced details"""
+    """
+    Fetch summary + content with enhanced details. The extracted text is
+    streamed into the response straight from the text store.
+    """
     try:
         include_structured = request.args.get('structured', 'false').lower() == 'true'
         
@@ -1391,28 +2081,50 @@ def get_summary(file_id):
         else:
             query = {"filename": file_id}
 
-        file_doc = files_collection.find_one(query)
+        projection = {'page_offsets': 0, 'multi_level_summary': 0}
+        if not include_structured:
+            projection['structured_summary'] = 0
+        file_doc = files_collection.find_one(query, projection)
 
         if not file_doc:
             return jsonify({"success": False, "error": "File not found"}), 404
 
+        summary = load_field(file_doc, "summary")
         response_data = {
             "success": True,
             "file_id": str(file_doc["_id"]),
             "original_name": file_doc.get("original_name", "Untitled Document"),
             "filename": file_doc.get("filename"),
-            "summary": file_doc.get("summary", "No summary available"),
-            "content": file_doc.get("content", ""),
+            "summary": summary if summary is not None else "No summary available",
             "summary_type": file_doc.get("summary_type", "unknown"),
+            "summary_model": file_doc.get("summary_model"),
             "compression_ratio": file_doc.get("compression_ratio", 0),
             "last_summarized": file_doc.get("last_summarized", "").isoformat() if file_doc.get("last_summarized") else None
         }
         
         # Include structured summary if requested and available
-        if include_structured and file_doc.get("structured_summary"):
-            response_data["structured_summary"] = file_doc["structured_summary"]
-        
-        return jsonify(response_data), 200
+        if include_structured:
+            structured_summary = load_field(file_doc, "structured_summary")
+            if structured_summary:
+                response_data["structured_summary"] = structured_summary
+        
+        # Open the text before answering, so a missing blob is a 500 rather
+        # than a successful response with empty content
+        pieces = iter_field(file_doc, "text")
+        first_piece = next(pieces, "")
+        
+        def generate():
+            # Same JSON object as before, with "content" written piece by piece.
+            # A read error part way through aborts the response instead of
+            # closing the JSON around truncated content.
+            head = json.dumps(response_data, default=str)
+            yield head[:-1] + ', "content": "'
+            yield json.dumps(first_piece)[1:-1]
+            for piece in pieces:
+                yield json.dumps(piece)[1:-1]
+            yield '"}'
+        
+        return Response(stream_with_context(generate()), mimetype='application/json'), 200
 
     except Exception as e:
         print(f"❌ Error in /summary/{file_id}: {e}")
@@ -1432,11 +2144,16 @@ if __name__ == "__main__":
     print("  GET  /quiz/<id> - Get quiz for taking")
     print("  POST /quiz/<id>/answer - Submit answer with proper scoring")
     print("  GET  /progress - Comprehensive statistics")
+    print("  GET  /ready - Model and database readiness")
     print("  POST /feedback - Submit feedback")
     print("  GET  /feedback/<id> - Get feedback")
     print("  POST /upload - Enhanced file upload (respects existing structure)")
+    print("  GET  /upload/<id>/status - Ingest job progress (?stream=true for SSE)")
+    print("  DELETE /file/<id> - Delete an upload (shared copies are reference counted)")
     print("  GET  /uploads - List uploaded files")
     print("  POST /admin/fix-files - Fix existing files metadata")
+    print("  GET  /admin/summary-cache - Summary cache statistics")
     print("  GET  /debug/files - Debug file structure")
     print("  POST /summarize - Text summarization")
+    print("  POST /summarize/stream - Streamed summarization (server-sent events)")
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
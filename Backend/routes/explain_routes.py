@@ -5,6 +5,7 @@ import datetime
 from utils.complexityAnalyzer import ComplexityAnalyzer
 from utils.explainerLLM import explain_difficult_parts
 from database import get_db
+from utils.text_store import load_field, load_file_text
 
 explain_bp = Blueprint("explain", __name__)
 
@@ -42,9 +43,8 @@ def explain_complex_content():
 
         # Use text or summary based on availability
         text_content = (
-            file_doc.get("content")
-            or file_doc.get("summary")
-            or file_doc.get("text")
+            load_file_text(file_doc)
+            or load_field(file_doc, "summary")
         )
         if not text_content:
             return jsonify({"error": "No text content available"}), 400
@@ -0,0 +1,20 @@
+"""
+Rebuild the per-user daily activity rollups (user_daily_stats) from
+quiz_results and quiz_sessions. Pass a user id to rebuild only that user.
+
+Run from the Backend directory, while the app is quiet:
+    python scripts/backfill_daily_stats.py [user_id]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.daily_stats import ensure_daily_stats_indexes, rebuild_daily_stats
+
+if __name__ == "__main__":
+    user_id = sys.argv[1] if len(sys.argv) > 1 else None
+    ensure_daily_stats_indexes()
+    count = rebuild_daily_stats(user_id)
+    print(f"📊 Rebuilt {count} daily stats documents" + (f" for {user_id}" if user_id else ""))
@@ -0,0 +1,246 @@
+"""
+Compare summarizer inference backends (fp32, int8, bf16, onnx) on a fixed
+lecture corpus. Reports load time, per-document latency, peak memory and
+ROUGE of each backend's summaries against the fp32 output, so a backend is
+only switched on (SUMMARIZER_BACKEND) when its quality loss is acceptable.
+Runs where the model failed and the summarizer fell back to an extractive
+summary are counted separately and left out of latency and ROUGE.
+
+Run from the Backend directory:
+    python scripts/benchmark_summarizer.py --corpus uploads/pdfs --limit 5
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import resource
+import statistics
+import sys
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Summary paths produced by the model alone; 'partial' and 'extractive' mean
+# some or all of the summary is the extractive fallback
+MODEL_SUMMARY_PATHS = ("abstractive",)
+
+
+def load_corpus(corpus_dir, limit, max_chars):
+    """Sorted, so every run benchmarks the same documents"""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from utils.pdf_reader import extract_text_from_pdf
+
+    documents = []
+    for name in sorted(os.listdir(corpus_dir)):
+        path = os.path.join(corpus_dir, name)
+        if name.lower().endswith(".pdf"):
+            text = extract_text_from_pdf(path)
+        elif name.lower().endswith(".txt"):
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                text = f.read()
+        else:
+            continue
+        if len(text.split()) < 50:
+            continue
+        documents.append({"name": name, "text": text[:max_chars] if max_chars else text})
+        if len(documents) >= limit:
+            break
+    return documents
+
+
+# ===== ROUGE =====
+
+def _rouge_tokens(text):
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def _f1(overlap, candidate_total, reference_total):
+    if not overlap or not candidate_total or not reference_total:
+        return 0.0
+    precision = overlap / candidate_total
+    recall = overlap / reference_total
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(candidate, reference, n):
+    def ngrams(tokens):
+        return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+    cand, ref = ngrams(_rouge_tokens(candidate)), ngrams(_rouge_tokens(reference))
+    overlap = sum((cand & ref).values())
+    return _f1(overlap, sum(cand.values()), sum(ref.values()))
+
+
+def rouge_l(candidate, reference):
+    cand, ref = _rouge_tokens(candidate), _rouge_tokens(reference)
+    if not cand or not ref:
+        return 0.0
+    # Longest common subsequence, one row at a time
+    previous = [0] * (len(ref) + 1)
+    for token in cand:
+        current = [0]
+        for j, ref_token in enumerate(ref):
+            current.append(previous[j] + 1 if token == ref_token else max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(cand), len(ref))
+
+
+def rouge_scores(candidate, reference):
+    return {
+        "rouge1": rouge_n(candidate, reference, 1),
+        "rouge2": rouge_n(candidate, reference, 2),
+        "rougeL": rouge_l(candidate, reference)
+    }
+
+
+# ===== BENCHMARK =====
+
+def run_backend(backend, documents, summary_type, repeat):
+    """
+    Runs in a fresh process per backend so peak RSS belongs to that backend
+    alone and no model weights are shared between runs.
+    """
+    os.environ["SUMMARIZER_BACKEND"] = backend
+    os.environ["SUMMARIZER_LOAD_MODE"] = "lazy"
+    os.environ["SUMMARIZER_MAP_WORKERS"] = "0"
+    os.environ["SUMMARY_CACHE_SIZE"] = "0"
+    os.environ["SUMMARY_CACHE_PERSIST"] = "false"
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+    import summarizer
+
+    if summarizer.model_manager.backend != backend:
+        return {"backend": backend, "error": f"not available here (ran as {summarizer.model_manager.backend})"}
+
+    try:
+        start = time.perf_counter()
+        summarizer.model_manager.get_pipeline()
+        load_seconds = time.perf_counter() - start
+    except Exception as e:
+        return {"backend": backend, "error": str(e)}
+
+    latencies = []
+    summaries = {}
+    paths = Counter()
+    for document in documents:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result, summary_path = summarizer.generate_budgeted_summary(document["text"], summary_type)
+            elapsed = time.perf_counter() - start
+            paths[summary_path] += 1
+            if summary_path in MODEL_SUMMARY_PATHS:
+                latencies.append(elapsed)
+        # Only model output is scored; a fallback summary says nothing about the backend
+        if summary_path in MODEL_SUMMARY_PATHS:
+            summaries[document["name"]] = result.get("summary", "") if isinstance(result, dict) else str(result)
+
+    fallback_runs = sum(count for path, count in paths.items() if path not in MODEL_SUMMARY_PATHS)
+    if not latencies:
+        return {"backend": backend, "error": f"every run fell back ({dict(paths)})",
+                "summary_paths": dict(paths), "fallback_runs": fallback_runs}
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "mean_seconds": round(statistics.mean(latencies), 3),
+        "p50_seconds": round(statistics.median(latencies), 3),
+        "max_seconds": round(max(latencies), 3),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "summary_paths": dict(paths),
+        "fallback_runs": fallback_runs,
+        "summaries": summaries
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark summarizer inference backends")
+    parser.add_argument("--corpus", default=os.path.join(BACKEND_DIR, "uploads", "pdfs"),
+                        help="Directory of lecture PDFs / .txt files")
+    parser.add_argument("--limit", type=int, default=5, help="Number of documents to use")
+    parser.add_argument("--max-chars", type=int, default=20000, help="Truncate each document (0 = no limit)")
+    parser.add_argument("--backends", default="fp32,int8,bf16,onnx")
+    parser.add_argument("--summary-type", default="detailed", choices=["brief", "detailed", "comprehensive"])
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per document")
+    parser.add_argument("--min-rouge-l", type=float, default=0.6,
+                        help="Minimum mean ROUGE-L vs fp32 for a backend to be recommended")
+    parser.add_argument("--json", help="Also write the full results to this file")
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus, args.limit, args.max_chars)
+    if not documents:
+        print(f"❌ No usable documents in {args.corpus}")
+        return 1
+    print(f"📚 Corpus: {len(documents)} documents from {args.corpus}")
+
+    # fp32 always runs first: it is the quality reference
+    backends = ["fp32"] + [b.strip() for b in args.backends.split(",") if b.strip() and b.strip() != "fp32"]
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for backend in backends:
+        print(f"⏳ Benchmarking {backend}...")
+        with context.Pool(1) as pool:
+            result = pool.apply(run_backend, (backend, documents, args.summary_type, args.repeat))
+        if "error" in result:
+            print(f"⚠️ {backend}: {result['error']}")
+        results.append(result)
+
+    reference = results[0].get("summaries")
+    if not reference:
+        print("❌ fp32 reference run failed, cannot score quality")
+        return 1
+
+    for result in results:
+        if "summaries" not in result:
+            continue
+        # Documents where either run fell back are not compared
+        scored = [name for name in reference if name in result["summaries"]]
+        if not scored:
+            continue
+        per_document = [rouge_scores(result["summaries"][name], reference[name]) for name in scored]
+        result["rouge_documents"] = len(scored)
+        result["rouge"] = {
+            metric: round(statistics.mean(scores[metric] for scores in per_document), 4)
+            for metric in ("rouge1", "rouge2", "rougeL")
+        }
+
+    print()
+    print(f"{'backend':<8} {'load s':>8} {'mean s':>8} {'p50 s':>8} {'max s':>8} {'peak MB':>9} "
+          f"{'R-1':>7} {'R-2':>7} {'R-L':>7} {'fallback':>9}")
+    for result in results:
+        if "rouge" not in result:
+            print(f"{result['backend']:<8} {'failed':>8}  {result.get('error', 'no model output to score')}")
+            continue
+        rouge = result["rouge"]
+        print(f"{result['backend']:<8} {result['load_seconds']:>8} {result['mean_seconds']:>8} "
+              f"{result['p50_seconds']:>8} {result['max_seconds']:>8} {result['peak_rss_mb']:>9} "
+              f"{rouge['rouge1']:>7} {rouge['rouge2']:>7} {rouge['rougeL']:>7} {result['fallback_runs']:>9}")
+
+    flagged = [r["backend"] for r in results if r.get("fallback_runs")]
+    if flagged:
+        print(f"\n⚠️ Fell back to extractive summaries in some runs (excluded from timings and ROUGE): "
+              f"{', '.join(flagged)}")
+
+    # A backend that ever fell back is not recommended, however fast its model runs were
+    acceptable = [r for r in results
+                  if "rouge" in r and not r["fallback_runs"] and r["rouge"]["rougeL"] >= args.min_rouge_l]
+    if acceptable:
+        best = min(acceptable, key=lambda r: r["mean_seconds"])
+        print(f"\n✅ Fastest backend with ROUGE-L >= {args.min_rouge_l}: {best['backend']} "
+              f"(SUMMARIZER_BACKEND={best['backend']})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"corpus": [d["name"] for d in documents], "results": results}, f, indent=2)
+        print(f"📝 Results written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+Run upload ingest workers. The web server only queues uploads; nothing is
+summarized until at least one of these is running. INGEST_WORKERS sets how
+many worker processes to start (default 1); start as many as the machine
+can hold models for.
+
+Run from the Backend directory:
+    python scripts/ingest_worker.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ingest_queue import INGEST_WORKERS, run_worker, start_ingest_workers
+
+if __name__ == "__main__":
+    if INGEST_WORKERS <= 1:
+        run_worker()
+    else:
+        for process in start_ingest_workers(INGEST_WORKERS):
+            process.join()
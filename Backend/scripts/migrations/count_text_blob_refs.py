@@ -0,0 +1,40 @@
+"""
+Give text store blobs written before reference counting a ref_count: the
+number of files document fields that point at them. Run it before the
+updated app or ingest workers release any blobs.
+
+Run from the Backend directory:
+    python scripts/migrations/count_text_blob_refs.py
+"""
+
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from database import db
+from utils.text_store import BLOB_FIELDS, ensure_text_store_indexes, get_blob_files
+
+ensure_text_store_indexes()
+
+counts = Counter()
+for field in BLOB_FIELDS:
+    for row in db["files"].aggregate([
+        {"$match": {f"{field}_ref.blob_id": {"$exists": True}}},
+        {"$group": {"_id": f"${field}_ref.blob_id", "refs": {"$sum": 1}}}
+    ]):
+        counts[row["_id"]] += row["refs"]
+
+blob_files = get_blob_files()
+counted = 0
+unreferenced = 0
+for blob in blob_files.find({"ref_count": {"$exists": False}}, {"_id": 1}):
+    refs = counts.get(blob["_id"], 0)
+    blob_files.update_one({"_id": blob["_id"], "ref_count": {"$exists": False}}, {"$set": {"ref_count": refs}})
+    counted += 1
+    if not refs:
+        unreferenced += 1
+
+print("Blobs counted:", counted)
+print("Blobs no file references:", unreferenced)
@@ -0,0 +1,34 @@
+"""
+Move extracted text and long summaries of existing files documents into the
+GridFS text store, drop the duplicate 'content' copy and fill in text_length.
+
+Run from the Backend directory:
+    python scripts/migrations/externalize_file_text.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from database import db
+from utils.text_store import BLOB_FIELDS, ensure_text_store_indexes, update_file_fields
+
+ensure_text_store_indexes()
+files = db["files"]
+
+inline_fields = ['content'] + list(BLOB_FIELDS)
+query = {"$or": [{field: {"$exists": True, "$ne": None}} for field in inline_fields]}
+
+migrated = 0
+for file_doc in files.find(query, {field: 1 for field in inline_fields + ['text_length']}):
+    fields = {field: file_doc[field] for field in inline_fields if field in file_doc}
+    if 'text' in fields or 'content' in fields:
+        text = fields.get('text') or fields.get('content') or ''
+        fields['text'] = text
+        if file_doc.get('text_length') is None:
+            fields['text_length'] = len(text)
+    update_file_fields(file_doc["_id"], fields)
+    migrated += 1
+
+print("Migrated:", migrated)
@@ -0,0 +1,23 @@
+"""
+Give quiz sessions created before per-user attempts an attempt number and a
+user_id, then build the unique (user_id, quiz_id, attempt) index.
+
+Run from the Backend directory:
+    python scripts/migrations/number_session_attempts.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from database import db
+
+sessions = db["quiz_sessions"]
+
+owned = sessions.update_many({"user_id": {"$in": [None, ""]}}, {"$set": {"user_id": "anonymous"}})
+numbered = sessions.update_many({"attempt": {"$exists": False}}, {"$set": {"attempt": 1}})
+sessions.create_index([("user_id", 1), ("quiz_id", 1), ("attempt", -1)], unique=True)
+
+print("Sessions given a user:", owned.modified_count)
+print("Sessions numbered:", numbered.modified_count)
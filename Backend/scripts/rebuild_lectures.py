@@ -0,0 +1,20 @@
+"""
+Regenerate the lecture catalogue (the lectures collection behind /lectures)
+from quizzes and quiz_sessions. Use it to backfill lectures created before
+the catalogue existed, or to repair it after a failed incremental update.
+
+Run from the Backend directory:
+    python scripts/rebuild_lectures.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.lecture_catalog import ensure_lecture_indexes, rebuild_lecture_catalog
+
+if __name__ == "__main__":
+    ensure_lecture_indexes()
+    count = rebuild_lecture_catalog()
+    print(f"📚 Rebuilt lecture catalogue: {count} lectures")
@@ -1,48 +1,878 @@
 # summarizer.py - Enhanced version with structured output for frontend
-from transformers import pipeline
 import re
 import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-from collections import Counter
+from nltk.tokenize import sent_tokenize as _nltk_sent_tokenize, word_tokenize as _nltk_word_tokenize
+from nltk.corpus import stopwords as _nltk_stopwords
+from collections import Counter, OrderedDict
+from functools import wraps
+import copy
+import hashlib
+import inspect
 import json
+import os
+import threading
+import time
+from datetime import datetime
+from utils.extractive import EXTRACTIVE_MODES, select_sentences
+from utils.model_manager import ModelManager
+from utils.summary_workers import SummaryWorkerPool
 
-# Download NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('stopwords')
-
-# Load summarization model with MUCH LONGER output parameters
-summarizer = pipeline(
-    "summarization", 
-    model="facebook/bart-large-cnn",
-    tokenizer="facebook/bart-large-cnn",
-    framework="pt"
+# NLTK data is checked (and downloaded if missing) on first use, not at import
+_nltk_lock = threading.Lock()
+_nltk_ready = False
+
+def ensure_nltk_data():
+    global _nltk_ready
+    if _nltk_ready:
+        return
+    with _nltk_lock:
+        if _nltk_ready:
+            return
+        try:
+            nltk.data.find('tokenizers/punkt')
+            nltk.data.find('corpora/stopwords')
+        except LookupError:
+            nltk.download('punkt')
+            nltk.download('stopwords')
+        _nltk_ready = True
+
+def sent_tokenize(text):
+    ensure_nltk_data()
+    return _nltk_sent_tokenize(text)
+
+def word_tokenize(text):
+    ensure_nltk_data()
+    return _nltk_word_tokenize(text)
+
+class _LazyStopwords:
+    def words(self, language):
+        ensure_nltk_data()
+        return _nltk_stopwords.words(language)
+
+stopwords = _LazyStopwords()
+
+_english_stopwords = None
+
+def get_english_stopwords():
+    """NLTK's English stopwords as a set, built once per process"""
+    global _english_stopwords
+    if _english_stopwords is None:
+        _english_stopwords = frozenset(stopwords.words('english'))
+    return _english_stopwords
+
+# Model id is part of every summary cache key, so changing it never serves
+# summaries produced by a different model
+SUMMARIZER_MODEL = os.getenv("SUMMARIZER_MODEL", "facebook/bart-large-cnn")
+
+# lazy (default), eager (background warmup at boot) or disabled
+SUMMARIZER_LOAD_MODE = os.getenv("SUMMARIZER_LOAD_MODE", "lazy").lower()
+
+# Inference backend: fp32 (default), int8, bf16 or onnx. Compare them with
+# scripts/benchmark_summarizer.py before switching.
+SUMMARIZER_BACKEND = os.getenv("SUMMARIZER_BACKEND", "fp32").lower()
+
+model_manager = ModelManager(SUMMARIZER_MODEL, SUMMARIZER_LOAD_MODE, SUMMARIZER_BACKEND)
+
+# Other models used by the routing table, created on first use
+_model_managers = {SUMMARIZER_MODEL: model_manager}
+_model_managers_lock = threading.Lock()
+
+def get_model_manager(model_id=None):
+    """ModelManager for model_id (the default model when None)"""
+    model_id = model_id or SUMMARIZER_MODEL
+    with _model_managers_lock:
+        if model_id not in _model_managers:
+            _model_managers[model_id] = ModelManager(model_id, SUMMARIZER_LOAD_MODE, SUMMARIZER_BACKEND)
+        return _model_managers[model_id]
+
+def get_cache_model_id(model_id=None):
+    """
+    Model id as recorded in summary cache entries. Reduced-precision backends
+    produce slightly different summaries, so they get their own entries.
+    """
+    manager = get_model_manager(model_id)
+    return manager.model_id if manager.backend == "fp32" else f"{manager.model_id}:{manager.backend}"
+
+SUMMARY_CACHE_MODEL_ID = get_cache_model_id(SUMMARIZER_MODEL)
+
+# ===== MODEL ROUTING =====
+# Which model and generation settings serve each summary_type, so brief
+# summaries stay cheap while comprehensive ones get the large model with beam
+# search. Override or add types with SUMMARIZER_ROUTES (JSON), e.g.
+#   {"brief": {"model": "facebook/bart-large-cnn", "num_beams": 2}}
+# Keys other than "model" are passed to generate().
+DEFAULT_SUMMARY_ROUTES = {
+    'brief': {'model': "sshleifer/distilbart-cnn-12-6", 'num_beams': 1},
+    'detailed': {'model': SUMMARIZER_MODEL, 'num_beams': 4},
+    'comprehensive': {'model': SUMMARIZER_MODEL, 'num_beams': 4}
+}
+
+def load_summary_routes():
+    routes = copy.deepcopy(DEFAULT_SUMMARY_ROUTES)
+    raw_routes = os.getenv("SUMMARIZER_ROUTES")
+    if raw_routes:
+        try:
+            for summary_type, settings in json.loads(raw_routes).items():
+                routes.setdefault(summary_type, {}).update(settings)
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"⚠️ Ignoring invalid SUMMARIZER_ROUTES: {e}")
+    return routes
+
+SUMMARY_ROUTES = load_summary_routes()
+
+class SummaryRoute:
+    """Model and generation settings one summary_type is served with"""
+    
+    def __init__(self, summary_type, model_id, generation):
+        self.summary_type = summary_type
+        self.model_id = model_id
+        self.generation = generation
+    
+    @property
+    def manager(self):
+        return get_model_manager(self.model_id)
+    
+    @property
+    def cache_model_id(self):
+        return get_cache_model_id(self.model_id)
+    
+    def cache_params(self):
+        """Route settings that change the output, for summary cache keys"""
+        return {'model_id': self.cache_model_id, 'generation': self.generation}
+
+def get_route(summary_type=None):
+    """Route for summary_type; unrouted types use the default model as-is"""
+    settings = dict(SUMMARY_ROUTES.get(summary_type) or {})
+    model_id = settings.pop('model', None) or SUMMARIZER_MODEL
+    return SummaryRoute(summary_type, model_id, settings)
+
+def get_summary_model(summary_type=None):
+    """Model id a summary_type is generated with, for recording on file docs"""
+    return get_route(summary_type).model_id
+
+def _routed_model_ids():
+    return sorted({SUMMARIZER_MODEL} | {get_route(t).model_id for t in SUMMARY_ROUTES})
+
+def summarizer(*args, **kwargs):
+    """
+    Run the summarization pipeline, loading the model on first use. Raises
+    when the model is disabled or failed to load, which sends callers down
+    their extractive fallback path.
+    """
+    return model_manager.get_pipeline()(*args, **kwargs)
+
+def start_model_warmup():
+    """Begin loading every routed model in the background (eager mode only)"""
+    started = [get_model_manager(model_id).start_background_warmup() for model_id in _routed_model_ids()]
+    return any(started)
+
+def get_model_status():
+    """Load state and timings of the summarization models"""
+    status = model_manager.status()
+    status['map_pool'] = map_pool.status()
+    status['routes'] = {summary_type: get_route(summary_type).model_id for summary_type in SUMMARY_ROUTES}
+    status['models'] = {model_id: get_model_manager(model_id).status() for model_id in _routed_model_ids()}
+    status['ready'] = all(model['ready'] for model in status['models'].values())
+    return status
+
+# Number of chunks sent through BART per forward pass. Chunks are sorted by
+# length before batching so each padded batch wastes as little as possible.
+SUMMARIZER_BATCH_SIZE = int(os.getenv("SUMMARIZER_BATCH_SIZE", "4"))
+
+# BART reads at most 1024 tokens per input, <s> and </s> included
+SUMMARIZER_MAX_INPUT_TOKENS = int(os.getenv("SUMMARIZER_MAX_INPUT_TOKENS", "1024"))
+
+# Tokens of trailing sentences repeated at the start of the next chunk
+SUMMARIZER_CHUNK_OVERLAP_TOKENS = int(os.getenv("SUMMARIZER_CHUNK_OVERLAP_TOKENS", "0"))
+
+# Content-defined chunk boundaries: once a chunk holds SUMMARIZER_CHUNK_MIN_FILL
+# of the token budget, it ends after any sentence whose hash is 0 mod
+# SUMMARIZER_CHUNK_BOUNDARY_DIVISOR. Boundaries then depend on nearby text
+# only, so editing one page doesn't shift every later chunk and the
+# unchanged chunks are reused from the chunk summary store.
+SUMMARIZER_CONTENT_DEFINED_CHUNKS = os.getenv("SUMMARIZER_CONTENT_DEFINED_CHUNKS", "true").lower() == "true"
+SUMMARIZER_CHUNK_MIN_FILL = float(os.getenv("SUMMARIZER_CHUNK_MIN_FILL", "0.75"))
+SUMMARIZER_CHUNK_BOUNDARY_DIVISOR = int(os.getenv("SUMMARIZER_CHUNK_BOUNDARY_DIVISOR", "4"))
+
+# Per-chunk summary lengths derive from the chunk count; they are snapped down
+# to these steps so that adding or removing a page (one chunk more or less)
+# leaves the generation params, and so the chunk store keys, of the other
+# chunks unchanged
+CHUNK_SUMMARY_LENGTH_STEPS = (20, 30, 40, 60, 80, 100, 140, 200, 280, 400)
+
+# Map-reduce over a process pool of model replicas for very long documents.
+# 0/1 workers keeps everything in-process; the memory cap (MB) limits how many
+# replicas of roughly SUMMARIZER_REPLICA_MEMORY_MB each are started.
+SUMMARIZER_MAP_WORKERS = int(os.getenv("SUMMARIZER_MAP_WORKERS", "0"))
+SUMMARIZER_MAP_MEMORY_MB = int(os.getenv("SUMMARIZER_MAP_MEMORY_MB", "0"))
+SUMMARIZER_REPLICA_MEMORY_MB = int(os.getenv("SUMMARIZER_REPLICA_MEMORY_MB", "1800"))
+SUMMARIZER_MAP_REDUCE_MIN_CHUNKS = int(os.getenv("SUMMARIZER_MAP_REDUCE_MIN_CHUNKS", "8"))
+
+# Upper bound on reduce levels; each level at least halves the summaries
+SUMMARIZER_MAX_REDUCE_LEVELS = 8
+
+# Extractive engine used for fallbacks and fast mode: tfidf or textrank
+SUMMARIZER_EXTRACTIVE_MODE = os.getenv("SUMMARIZER_EXTRACTIVE_MODE", "tfidf").lower()
+
+# Latency budgets: callers may give a per-request budget (0 here means none
+# by default). Generation stops this many seconds before the deadline so the
+# extractive fill-in still fits inside the budget.
+SUMMARIZER_DEFAULT_BUDGET_SECONDS = float(os.getenv("SUMMARIZER_DEFAULT_BUDGET_SECONDS", "0"))
+SUMMARIZER_DEADLINE_RESERVE_SECONDS = float(os.getenv("SUMMARIZER_DEADLINE_RESERVE_SECONDS", "0.5"))
+
+map_pool = SummaryWorkerPool(
+    SUMMARIZER_MODEL,
+    max_workers=SUMMARIZER_MAP_WORKERS,
+    memory_mb=SUMMARIZER_MAP_MEMORY_MB,
+    replica_memory_mb=SUMMARIZER_REPLICA_MEMORY_MB,
+    backend=model_manager.backend
 )
 
-def generate_summary(text, summary_type="detailed"):
+# ===== SUMMARY CACHE =====
+# Bump when generation settings change in code so stale summaries are not reused
+SUMMARY_CACHE_VERSION = 4
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "256"))
+SUMMARY_CACHE_PERSIST = os.getenv("SUMMARY_CACHE_PERSIST", "true").lower() == "true"
+# Persisted summaries and chunk summaries expire this long after they were written (0 keeps them)
+SUMMARY_CACHE_TTL_DAYS = int(os.getenv("SUMMARY_CACHE_TTL_DAYS", "30"))
+
+# Set when a summary fell back to extractive/truncated output so it isn't cached
+_summary_state = threading.local()
+
+def _mark_degraded():
+    _summary_state.degraded = True
+
+def ensure_cache_ttl_index(collection):
+    """TTL index on created_at, so entries no longer looked up age out"""
+    if SUMMARY_CACHE_TTL_DAYS <= 0:
+        return
+    from pymongo.errors import OperationFailure
+    seconds = SUMMARY_CACHE_TTL_DAYS * 24 * 3600
+    try:
+        collection.create_index("created_at", expireAfterSeconds=seconds)
+    except OperationFailure:
+        # The index exists with a different TTL
+        collection.database.command('collMod', collection.name, index={
+            'keyPattern': {'created_at': 1},
+            'expireAfterSeconds': seconds
+        })
+
+def normalize_text_for_cache(text):
+    """Collapse whitespace so trivially different copies share a cache entry"""
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+class SummaryCache:
+    """
+    Two-tier summary cache: a bounded in-process LRU in front of a Mongo
+    collection that survives restarts.
+    """
+    
+    def __init__(self, max_entries=256, persist=True, collection_name="summary_cache"):
+        self.max_entries = max_entries
+        self.persist = persist
+        self.collection_name = collection_name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._collection = None
+        self.stats = {
+            'memory_hits': 0,
+            'persistent_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'errors': 0
+        }
+    
+    def _get_collection(self):
+        if not self.persist:
+            return None
+        if self._collection is None:
+            try:
+                from database import db
+                collection = db[self.collection_name]
+                collection.create_index("model_id")
+                # Keys include the model id, so entries of a model that is no
+                # longer routed to are never hit and simply expire
+                ensure_cache_ttl_index(collection)
+                self._collection = collection
+            except Exception as e:
+                print(f"⚠️ Persistent summary cache unavailable: {e}")
+                self.persist = False
+                return None
+        return self._collection
+    
+    def make_key(self, kind, text, params):
+        """Build the cache key from text hash, summary kind, params and model id"""
+        text_hash = hashlib.sha256(normalize_text_for_cache(text).encode('utf-8')).hexdigest()
+        payload = json.dumps({
+            'kind': kind,
+            'text_hash': text_hash,
+            'params': params,
+            'model_id': SUMMARY_CACHE_MODEL_ID,
+            'version': SUMMARY_CACHE_VERSION
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return True, copy.deepcopy(self._entries[key])
+        
+        collection = self._get_collection()
+        if collection is not None:
+            try:
+                doc = collection.find_one({'_id': key})
+                if doc is not None:
+                    self._remember(key, doc['value'])
+                    with self._lock:
+                        self.stats['persistent_hits'] += 1
+                    return True, doc['value']
+            except Exception as e:
+                print(f"⚠️ Summary cache read failed: {e}")
+                with self._lock:
+                    self.stats['errors'] += 1
+        
+        with self._lock:
+            self.stats['misses'] += 1
+        return False, None
+    
+    def set(self, key, value, kind, model_id=None):
+        self._remember(key, value)
+        with self._lock:
+            self.stats['stores'] += 1
+        
+        collection = self._get_collection()
+        if collection is not None:
+            try:
+                collection.replace_one(
+                    {'_id': key},
+                    {
+                        '_id': key,
+                        'kind': kind,
+                        'model_id': model_id or SUMMARY_CACHE_MODEL_ID,
+                        'value': value,
+                        'created_at': datetime.utcnow()
+                    },
+                    upsert=True
+                )
+            except Exception as e:
+                print(f"⚠️ Summary cache write failed: {e}")
+                with self._lock:
+                    self.stats['errors'] += 1
+    
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = copy.deepcopy(value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, model_id=None):
+        """
+        Drop cached summaries. With model_id only that model's entries are
+        removed from the persistent tier; the in-process tier is always cleared.
+        """
+        with self._lock:
+            self._entries.clear()
+        
+        removed = 0
+        collection = self._get_collection()
+        if collection is not None:
+            query = {'model_id': model_id} if model_id else {}
+            removed = collection.delete_many(query).deleted_count
+        return removed
+    
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._entries)
+        lookups = stats['memory_hits'] + stats['persistent_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups * 100, 1) if lookups else 0
+        stats['max_entries'] = self.max_entries
+        stats['persistent'] = self.persist
+        stats['model_id'] = SUMMARY_CACHE_MODEL_ID
+        return stats
+
+summary_cache = SummaryCache(SUMMARY_CACHE_SIZE, persist=SUMMARY_CACHE_PERSIST)
+
+class ChunkSummaryStore:
+    """
+    Persistent per-chunk summaries keyed by chunk content, generation params
+    and model. When a document is re-uploaded or re-summarized with a few
+    pages changed, only the chunks whose text changed go back through BART.
+    """
+    
+    def __init__(self, persist=True, collection_name="chunk_summaries"):
+        self.persist = persist
+        self.collection_name = collection_name
+        self._collection = None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'errors': 0}
+    
+    def _get_collection(self):
+        if not self.persist:
+            return None
+        if self._collection is None:
+            try:
+                from database import db
+                collection = db[self.collection_name]
+                collection.create_index("model_id")
+                ensure_cache_ttl_index(collection)
+                self._collection = collection
+            except Exception as e:
+                print(f"⚠️ Chunk summary store unavailable: {e}")
+                self.persist = False
+                return None
+        return self._collection
+    
+    @staticmethod
+    def make_key(text, params, model_id):
+        text_hash = hashlib.sha256(normalize_text_for_cache(text).encode('utf-8')).hexdigest()
+        payload = json.dumps({
+            'text_hash': text_hash,
+            'params': params,
+            'model_id': model_id,
+            'version': SUMMARY_CACHE_VERSION
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get_many(self, keys):
+        """Stored summaries for keys, as {key: summary}, in one round trip"""
+        collection = self._get_collection()
+        if collection is None or not keys:
+            return {}
+        try:
+            found = {doc['_id']: doc['summary'] for doc in collection.find({'_id': {'$in': list(keys)}})}
+        except Exception as e:
+            print(f"⚠️ Chunk summary read failed: {e}")
+            with self._lock:
+                self.stats['errors'] += 1
+            return {}
+        with self._lock:
+            self.stats['hits'] += len(found)
+            self.stats['misses'] += len(set(keys)) - len(found)
+        return found
+    
+    def set_many(self, entries, model_id):
+        """Store {key: summary} pairs"""
+        collection = self._get_collection()
+        if collection is None or not entries:
+            return
+        try:
+            from pymongo import ReplaceOne
+            now = datetime.utcnow()
+            collection.bulk_write([
+                ReplaceOne({'_id': key}, {'_id': key, 'model_id': model_id, 'summary': summary, 'created_at': now},
+                           upsert=True)
+                for key, summary in entries.items()
+            ], ordered=False)
+            with self._lock:
+                self.stats['stores'] += len(entries)
+        except Exception as e:
+            print(f"⚠️ Chunk summary write failed: {e}")
+            with self._lock:
+                self.stats['errors'] += 1
+    
+    def invalidate(self, model_id=None):
+        """Drop stored chunk summaries, optionally only those of one model"""
+        collection = self._get_collection()
+        if collection is None:
+            return 0
+        query = {'model_id': model_id} if model_id else {}
+        return collection.delete_many(query).deleted_count
+    
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['persistent'] = self.persist
+        return stats
+
+chunk_store = ChunkSummaryStore(persist=SUMMARY_CACHE_PERSIST)
+
+# Per-request arguments that don't change the summary and stay out of cache keys
+UNCACHED_PARAMS = ('plan',)
+
+def cached_summary(kind, routed=False, depends_on=None):
+    """
+    Cache a summary function's result keyed by its text and remaining arguments.
+    With routed=True the summary_type's route (model and generation settings)
+    is part of the key as well; depends_on names the summary_type whose route
+    is keyed for functions built on that type's summary.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        def key_params(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k not in UNCACHED_PARAMS}
+            if routed:
+                params['route'] = get_route(params['summary_type']).cache_params()
+            elif depends_on is not None:
+                params['route'] = get_route(depends_on).cache_params()
+            return params
+        
+        def cache_key(*args, **kwargs):
+            """(text, key) for a call; key is None when the text is empty"""
+            params = key_params(*args, **kwargs)
+            text = params.pop('text')
+            return text, (summary_cache.make_key(kind, text, params) if text else None)
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            params = key_params(*args, **kwargs)
+            text = params.pop('text')
+            key = summary_cache.make_key(kind, text, params) if text else None
+            
+            if key is None:
+                return func(*args, **kwargs)
+            
+            hit, value = summary_cache.get(key)
+            if hit:
+                print(f"⚡ Summary cache hit ({kind})")
+                return value
+            
+            outer_degraded = getattr(_summary_state, 'degraded', False)
+            _summary_state.degraded = False
+            try:
+                value = func(*args, **kwargs)
+                degraded = _summary_state.degraded
+            finally:
+                _summary_state.degraded = outer_degraded or getattr(_summary_state, 'degraded', False)
+            
+            # Don't pin fallback output; the next request may get the real summary
+            if not degraded:
+                summary_cache.set(key, value, kind, params['route']['model_id'] if 'route' in params else None)
+            return value
+        
+        wrapper.cache_key = cache_key
+        return wrapper
+    return decorator
+
+def get_summary_cache_stats():
+    """Hit/miss counters for the summary cache and the per-chunk store"""
+    stats = summary_cache.get_stats()
+    stats['chunks'] = chunk_store.get_stats()
+    return stats
+
+def invalidate_summary_cache(model_id=None):
+    """
+    Explicitly invalidate cached summaries and the chunk summaries they are
+    built from (e.g. after swapping or fixing a model). Returns how many
+    stored entries were removed.
+    """
+    removed = summary_cache.invalidate(model_id)
+    removed_chunks = chunk_store.invalidate(model_id)
+    print(f"🧹 Summary cache invalidated ({removed} persistent entries and {removed_chunks} chunk summaries removed)")
+    return removed + removed_chunks
+
+# ===== PER-REQUEST COMPUTATION PLAN =====
+class SummaryPlan:
+    """
+    Shared work for summarizing one request's text several ways. Cleaning,
+    sentence tokenization, chunking, each distinct BART call and each finished
+    summary are computed once and reused by every output section.
+    """
+    
+    def __init__(self, deadline=None):
+        self._cleaned = {}
+        self._sentences = {}
+        self._analyzed = {}
+        self._chunks = {}
+        self._generations = {}
+        # (text, summary_type) -> (summary, whether it is fallback output)
+        self.summaries = {}
+        # Which path produced each (text, summary_type) summary
+        self.paths = {}
+        # time.monotonic() by which summaries must be ready; None means no budget
+        self.deadline = deadline
+        # Called between chunk batches of long summaries (ingest jobs renew their lease)
+        self.heartbeat = None
+        self.stats = {'generations': 0, 'reused_generations': 0,
+                      'chunks_reused': 0, 'chunks_recomputed': 0}
+    
+    @classmethod
+    def with_budget(cls, budget_seconds=None):
+        """Plan whose summaries must finish within budget_seconds from now"""
+        if budget_seconds is None:
+            budget_seconds = SUMMARIZER_DEFAULT_BUDGET_SECONDS
+        return cls(time.monotonic() + budget_seconds if budget_seconds and budget_seconds > 0 else None)
+    
+    def generation_time(self):
+        """
+        max_time for the next generate() call: None without a deadline,
+        zero or less once the budget (minus the fill-in reserve) is spent
+        """
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic() - SUMMARIZER_DEADLINE_RESERVE_SECONDS
+    
+    def out_of_time(self):
+        remaining = self.generation_time()
+        return remaining is not None and remaining <= 0
+    
+    def cleaned(self, text):
+        if text not in self._cleaned:
+            self._cleaned[text] = clean_text_for_summarization(text)
+        return self._cleaned[text]
+    
+    def sentences(self, text):
+        if text not in self._sentences:
+            self._sentences[text] = sent_tokenize(text)
+        return self._sentences[text]
+    
+    def analyzed(self, text):
+        if text not in self._analyzed:
+            self._analyzed[text] = AnalyzedText(text, self.sentences(text))
+        return self._analyzed[text]
+    
+    def chunks(self, text, max_tokens=None, manager=None):
+        key = (text, max_tokens, manager.model_id if manager is not None else None)
+        if key not in self._chunks:
+            self._chunks[key] = make_text_chunks(text, max_tokens=max_tokens, sentences=self.sentences(text),
+                                                 manager=manager)
+        return self._chunks[key]
+
+    def use_chunks(self, text, chunks, manager=None):
+        """Have chunks() return chunks built while text was extracted (see IncrementalChunker)"""
+        if chunks:
+            key = (self.cleaned(text), None, manager.model_id if manager is not None else None)
+            self._chunks[key] = chunks
+
+    @staticmethod
+    def _generation_key(text, params, model_id):
+        return (text, tuple(sorted(params.items())), model_id or SUMMARIZER_MODEL)
+    
+    def get_generation(self, text, params, model_id=None):
+        summary = self._generations.get(self._generation_key(text, params, model_id))
+        if summary is not None:
+            self.stats['reused_generations'] += 1
+        return summary
+    
+    def set_generation(self, text, params, summary, model_id=None):
+        self.stats['generations'] += 1
+        self._generations[self._generation_key(text, params, model_id)] = summary
+    
+    def beat(self):
+        if self.heartbeat is not None:
+            self.heartbeat()
+    
+    def count_chunks(self, stage, reused=0, recomputed=0):
+        """Record first-level chunks served from the chunk store vs regenerated"""
+        if stage == "chunk":
+            self.stats['chunks_reused'] += reused
+            self.stats['chunks_recomputed'] += recomputed
+
+def _sentences(text, plan=None):
+    """Sentence-tokenize text, reusing the plan's result when one is given"""
+    return plan.sentences(text) if plan is not None else sent_tokenize(text)
+
+class AnalyzedText:
+    """
+    One tokenization pass over a text, shared by the structured summary
+    helpers: sentences, word tokens per sentence, their lowercase forms with
+    a stopword mask, and content-word frequencies.
+    """
+    
+    def __init__(self, text, sentences=None):
+        self.text = text
+        self.sentences = sentences if sentences is not None else sent_tokenize(text)
+        self.tokens = [word_tokenize(sentence) for sentence in self.sentences]
+        
+        stop_words = get_english_stopwords()
+        self.lower_tokens = [[token.lower() for token in tokens] for tokens in self.tokens]
+        self.stopword_mask = [[token in stop_words for token in tokens] for tokens in self.lower_tokens]
+        
+        # Alphabetic, non-stopword words longer than two letters
+        self.word_frequencies = Counter(
+            token
+            for tokens, mask in zip(self.lower_tokens, self.stopword_mask)
+            for token, is_stop in zip(tokens, mask)
+            if not is_stop and len(token) > 2 and token.isalpha()
+        )
+
+def analyze_text(text, plan=None):
+    """AnalyzedText for text, cached on the plan when one is given"""
+    return plan.analyzed(text) if plan is not None else AnalyzedText(text)
+
+def _generation_time(plan):
+    return plan.generation_time() if plan is not None else None
+
+def run_summarizer(text, plan=None, **params):
+    """
+    Run one BART call, reusing the plan's output for identical input and params.
+    Generation stops when the plan's time budget runs out, like summarize_chunk.
+    """
+    if plan is not None:
+        summary = plan.get_generation(text, params)
+        if summary is not None:
+            return summary
+    
+    max_time = _generation_time(plan)
+    if max_time is not None and max_time <= 0:
+        raise TimeoutError("summary time budget exhausted")
+    generate_params = params if max_time is None else {**params, 'max_time': max_time}
+    
+    start = time.monotonic()
+    result = summarizer(text, **generate_params)
+    summary = result[0]['summary_text']
+    
+    if max_time is not None and time.monotonic() - start >= max_time:
+        # Generation was cut off by max_time; usable, but not worth keeping
+        _mark_degraded()
+    elif plan is not None:
+        plan.set_generation(text, params, summary)
+    return summary
+
+def summarize_chunk(chunk, plan=None, route=None, stage="chunk", **params):
+    """
+    Summarize one chunk from make_text_chunks, generating straight from its
+    token ids when it has them. The route's model and generation settings
+    are used (default model when None). stage is "chunk" for document chunks
+    and "reduce" for groups of chunk summaries.
+    """
+    route = route or get_route()
+    params = {**params, **route.generation}
+    
+    if plan is not None:
+        summary = plan.get_generation(chunk['text'], params, route.model_id)
+        if summary is not None:
+            return summary
+    
+    store_key = chunk_store.make_key(chunk['text'], params, route.cache_model_id)
+    summary = chunk_store.get_many([store_key]).get(store_key)
+    if summary is not None:
+        if plan is not None:
+            plan.count_chunks(stage, reused=1)
+            plan.set_generation(chunk['text'], params, summary, route.model_id)
+        return summary
+    
+    max_time = _generation_time(plan)
+    if max_time is not None and max_time <= 0:
+        raise TimeoutError("summary time budget exhausted")
+    generate_params = params if max_time is None else {**params, 'max_time': max_time}
+    
+    start = time.monotonic()
+    if chunk['input_ids'] is not None:
+        summary = route.manager.generate_from_ids([chunk['input_ids']], **generate_params)[0]
+    else:
+        summary = route.manager.get_pipeline()(chunk['text'], **generate_params)[0]['summary_text']
+    
+    if plan is not None:
+        plan.count_chunks(stage, recomputed=1)
+    if max_time is not None and time.monotonic() - start >= max_time:
+        # Generation was cut off by max_time; usable, but not worth keeping
+        _mark_degraded()
+    else:
+        chunk_store.set_many({store_key: summary}, route.cache_model_id)
+        if plan is not None:
+            plan.set_generation(chunk['text'], params, summary, route.model_id)
+    return summary
+
+@cached_summary("summary", routed=True)
+def generate_summary(text, summary_type="detailed", plan=None):
     """
     Generate LONG summaries of different lengths and detail levels
     
     Args:
         text (str): Input text to summarize
-        summary_type (str): "brief", "detailed", or "comprehensive"
+        summary_type (str): "brief", "detailed", or "comprehensive"; also picks
+            the model and generation settings (see SUMMARY_ROUTES)
+        plan (SummaryPlan): Optional per-request plan shared with other sections
     
     Returns:
         str: Generated summary with proper formatting for frontend
     """
+    if plan is None:
+        return _generate_summary(text, summary_type, None)
     
+    memo_key = (text, summary_type)
+    if memo_key not in plan.summaries:
+        outer_degraded = getattr(_summary_state, 'degraded', False)
+        _summary_state.degraded = False
+        try:
+            summary = _generate_summary(text, summary_type, plan)
+            plan.summaries[memo_key] = (summary, _summary_state.degraded)
+        finally:
+            _summary_state.degraded = outer_degraded or getattr(_summary_state, 'degraded', False)
+    
+    summary, degraded = plan.summaries[memo_key]
+    # A memoized fallback summary taints every caller that reuses it
+    if degraded:
+        _mark_degraded()
+    return summary
+
+def _generate_summary(text, summary_type, plan):
+    summary = None
+    for event in _iter_generate_summary(text, summary_type, plan):
+        if event['event'] == 'summary':
+            summary = event['summary']
+            if plan is not None:
+                plan.paths[(text, summary_type)] = event['summary_path']
+    return summary
+
+def generate_budgeted_summary(text, summary_type="detailed", budget_seconds=None, plan=None):
+    """
+    generate_summary under a latency budget. Once the budget is nearly spent
+    generation stops: finished chunk summaries are kept and the rest is filled
+    in extractively, or the whole summary is extractive if no time is left.
+    
+    Returns:
+        (summary, summary_path): path is 'cache', 'abstractive', 'partial',
+        'extractive' or 'passthrough' (text too short to summarize)
+    """
+    if plan is None:
+        plan = SummaryPlan.with_budget(budget_seconds)
+    summary = generate_summary(text, summary_type, plan=plan)
+    return summary, plan.paths.get((text, summary_type), 'cache')
+
+def stream_summary(text, summary_type="detailed"):
+    """
+    Yield summary progress events for streaming responses: a 'progress' event
+    once the text is chunked, a 'chunk' event as each chunk summary finishes,
+    then a final 'summary' event. Reads and fills the summary cache like
+    generate_summary.
+    """
+    text, key = generate_summary.cache_key(text, summary_type)
+    
+    if key is not None:
+        hit, value = summary_cache.get(key)
+        if hit:
+            print("⚡ Summary cache hit (summary, streamed)")
+            yield {'event': 'summary', 'summary': value, 'summary_type': summary_type,
+                   'summary_path': 'cache', 'cached': True}
+            return
+    
+    summary = None
+    outer_degraded = getattr(_summary_state, 'degraded', False)
+    _summary_state.degraded = False
+    try:
+        for event in _iter_generate_summary(text, summary_type, SummaryPlan()):
+            if event['event'] == 'summary':
+                summary = event['summary']
+            yield event
+        degraded = _summary_state.degraded
+    finally:
+        _summary_state.degraded = outer_degraded or getattr(_summary_state, 'degraded', False)
+    
+    if key is not None and summary is not None and not degraded:
+        summary_cache.set(key, summary, "summary", get_route(summary_type).cache_model_id)
+
+def _iter_generate_summary(text, summary_type, plan):
     if not text or len(text.strip()) < 50:
-        return "Text too short to summarize effectively."
+        yield {'event': 'summary', 'summary': "Text too short to summarize effectively.",
+               'summary_type': summary_type, 'summary_path': 'passthrough'}
+        return
     
     # Clean and prepare text
-    cleaned_text = clean_text_for_summarization(text)
+    cleaned_text = plan.cleaned(text) if plan is not None else clean_text_for_summarization(text)
     
     if len(cleaned_text.split()) < 20:
-        return cleaned_text  # Return short texts as-is
+        # Return short texts as-is
+        yield {'event': 'summary', 'summary': cleaned_text, 'summary_type': summary_type,
+               'summary_path': 'passthrough'}
+        return
     
     # Determine summary parameters based on type - MUCH LONGER NOW
     if summary_type == "brief":
@@ -68,16 +898,39 @@ def generate_summary(text, summary_type="detailed"):
     dynamic_max = min(max_length, max(min_length, int(word_count * compression_ratio)))
     dynamic_min = min(min_length, max(100, int(dynamic_max * 0.5)))  # Increased minimum
     
-    print(f"📝 Generating {summary_type} summary: {word_count} words -> target: {dynamic_min}-{dynamic_max} words")
+    route = get_route(summary_type)
+    print(f"📝 Generating {summary_type} summary with {route.model_id}: "
+          f"{word_count} words -> target: {dynamic_min}-{dynamic_max} words")
+    
+    # Fallbacks further down mark the summary degraded; that's how a partly
+    # extractive summary is told apart from a fully abstractive one
+    outer_degraded = getattr(_summary_state, 'degraded', False)
+    _summary_state.degraded = False
+    summary_path = 'abstractive'
     
     try:
+        if plan is not None and plan.out_of_time():
+            raise TimeoutError("summary time budget exhausted")
+        
+        # Chunk by model tokens; the chunks keep their token ids for generation
+        chunks = (plan.chunks(cleaned_text, manager=route.manager) if plan is not None
+                  else make_text_chunks(cleaned_text, manager=route.manager))
+        yield {'event': 'progress', 'stage': 'chunked', 'total_chunks': len(chunks), 'model': route.model_id}
+        
         # Handle long texts by chunking
-        if word_count > 1024:
-            summary = generate_chunked_summary(cleaned_text, dynamic_max, dynamic_min, 1024)
+        if len(chunks) > 1:
+            for event in iter_chunked_summary(cleaned_text, dynamic_max, dynamic_min,
+                                              chunks=chunks, plan=plan, route=route):
+                if event['event'] == 'chunk':
+                    yield event
+                else:
+                    summary = event['summary']
         else:
             # Use more aggressive parameters for longer output
-            result = summarizer(
-                cleaned_text, 
+            summary = summarize_chunk(
+                chunks[0], 
+                plan=plan,
+                route=route,
                 max_length=dynamic_max, 
                 min_length=dynamic_min, 
                 do_sample=False,
@@ -86,29 +939,47 @@ def generate_summary(text, summary_type="detailed"):
                 no_repeat_ngram_size=2,  # Reduced from 3 to allow more repetition
                 early_stopping=False  # Don't stop early, generate full length
             )
-            summary = result[0]['summary_text']
         
         summary = postprocess_summary(summary)
-        print(f"✅ Generated summary: {len(summary.split())} words")
+        if _summary_state.degraded:
+            summary_path = 'partial'
+        print(f"✅ Generated summary: {len(summary.split())} words ({summary_path})")
         
         # Format for frontend display
-        return format_for_frontend(summary, summary_type)
+        summary = format_for_frontend(summary, summary_type, plan)
     
     except Exception as e:
-        print(f"❌ Summarization error: {e}")
+        if isinstance(e, TimeoutError):
+            print("⏱️ Summary time budget exhausted, using extractive summary")
+        else:
+            print(f"❌ Summarization error: {e}")
+        _mark_degraded()
+        summary_path = 'extractive'
         # Fallback to extractive summarization
-        fallback_summary = generate_extractive_summary(cleaned_text, summary_type)
-        return format_for_frontend(fallback_summary, summary_type)
+        fallback_summary = generate_extractive_summary(cleaned_text, summary_type, plan)
+        summary = format_for_frontend(fallback_summary, summary_type, plan)
+    
+    finally:
+        _summary_state.degraded = outer_degraded or _summary_state.degraded
+    
+    event = {'event': 'summary', 'summary': summary, 'summary_type': summary_type,
+             'summary_path': summary_path, 'model': route.model_id}
+    if plan is not None:
+        event['chunks_reused'] = plan.stats['chunks_reused']
+        event['chunks_recomputed'] = plan.stats['chunks_recomputed']
+    yield event
 
-def format_for_frontend(summary, summary_type):
+def format_for_frontend(summary, summary_type, plan=None, sentences=None):
     """
-    Format the summary for better display on frontend with proper structure
+    Format the summary for better display on frontend with proper structure.
+    Pass sentences when the summary is already split.
     """
     if not summary:
         return ""
     
     # Split into paragraphs based on content length and type
-    sentences = sent_tokenize(summary)
+    if sentences is None:
+        sentences = _sentences(summary, plan)
     
     if len(sentences) <= 3:
         return summary  # Short summaries don't need formatting
@@ -155,83 +1026,279 @@ def format_comprehensive_summary(sentences):
     
     return "\n\n".join(paragraphs)
 
-def generate_chunked_summary(text, max_length, min_length, chunk_size):
+def generate_chunked_summary(text, max_length, min_length, chunk_size=None, batch_size=None,
+                             plan=None, chunks=None, route=None):
     """
-    Handle long texts by breaking into chunks and summarizing each
+    Handle long texts by breaking into chunks and summarizing them in batches.
+    chunk_size is the per-chunk token budget; pre-built chunks can be passed in.
     """
-    chunks = split_text_into_chunks(text, chunk_size)
-    chunk_summaries = []
-    
-    for i, chunk in enumerate(chunks):
-        try:
-            # Use larger chunks for better context
-            chunk_max = max_length // len(chunks) * 2  # Increased chunk size
-            chunk_min = min_length // len(chunks) * 2  # Increased chunk size
-            
-            result = summarizer(
-                chunk, 
-                max_length=min(chunk_max, 400),  # Increased from 200
-                min_length=min(chunk_min, 150),  # Increased from 50
-                do_sample=False,
-                length_penalty=2.5,  # Increased for longer output
-                early_stopping=False
-            )
-            chunk_summaries.append(result[0]['summary_text'])
-        except Exception as e:
-            print(f"Chunk summarization error: {e}")
-            # Fallback to first few sentences
-            sentences = sent_tokenize(chunk)[:4]  # Increased from 2
-            chunk_summaries.append(' '.join(sentences))
+    summary = None
+    for event in iter_chunked_summary(text, max_length, min_length, chunk_size, batch_size, plan, chunks, route):
+        if event['event'] == 'summary':
+            summary = event['summary']
+    return summary
+
+def iter_chunked_summary(text, max_length, min_length, chunk_size=None, batch_size=None,
+                         plan=None, chunks=None, route=None):
+    """
+    Generator behind generate_chunked_summary: yields a 'chunk' event for each
+    chunk summary as soon as its batch finishes, then the merged 'summary'.
+    Long documents are mapped across the worker pool and reduced
+    hierarchically until the chunk summaries fit one model input.
+    """
+    route = route or get_route()
+    if chunks is None:
+        chunks = (plan.chunks(text, chunk_size, manager=route.manager) if plan is not None
+                  else make_text_chunks(text, max_tokens=chunk_size, manager=route.manager))
+    
+    # Use larger chunks for better context
+    chunk_max = min(max_length // len(chunks) * 2, 400)  # Increased from 200
+    chunk_min = min(min_length // len(chunks) * 2, 150)  # Increased from 50
+    # Very long documents would otherwise ask for near-empty chunk summaries
+    chunk_max = snap_chunk_length(max(chunk_max, 60))
+    chunk_min = min(snap_chunk_length(chunk_min), chunk_max // 2)
+    
+    # The pool's replicas only hold the default model
+    use_pool = (map_pool.enabled and route.model_id == map_pool.model_id and
+                len(chunks) >= SUMMARIZER_MAP_REDUCE_MIN_CHUNKS)
+    
+    chunk_summaries = [None] * len(chunks)
+    for i, chunk_summary in iter_chunk_summaries_batched(
+        chunks,
+        max_length=chunk_max,
+        min_length=chunk_min,
+        batch_size=batch_size,
+        plan=plan,
+        use_pool=use_pool,
+        route=route
+    ):
+        chunk_summaries[i] = chunk_summary
+        yield {'event': 'chunk', 'index': i, 'total': len(chunks), 'summary': chunk_summary}
     
     # Combine chunk summaries
     combined_summary = ' '.join(chunk_summaries)
     
     # Final summarization pass to ensure coherence
-    if len(combined_summary.split()) > max_length * 1.2:
+    if len(combined_summary.split()) > max_length * 1.2 and plan is not None and plan.out_of_time():
+        print("⏱️ Summary time budget exhausted, reducing chunk summaries extractively")
+        _mark_degraded()
+        summary = generate_extractive_summary(combined_summary, "comprehensive", plan)
+    elif len(combined_summary.split()) > max_length * 1.2:
         try:
-            final_result = summarizer(
-                combined_summary,
-                max_length=max_length,
-                min_length=min_length,
-                do_sample=False,
-                length_penalty=3.0,  # Increased for longer output
-                early_stopping=False
+            final_summary = reduce_summaries(
+                chunk_summaries, max_length, min_length, chunk_max, chunk_min,
+                batch_size=batch_size, plan=plan, use_pool=use_pool, route=route
             )
-            return postprocess_summary(final_result[0]['summary_text'])
-        except:
-            # If final summarization fails, return the combined summary
-            return combined_summary[:max_length * 3] + "..."  # Increased buffer
+            summary = postprocess_summary(final_summary)
+        except Exception as e:
+            print(f"❌ Reduce pass failed: {e}")
+            _mark_degraded()
+            # Keep the most representative chunk-summary sentences instead of truncating
+            summary = generate_extractive_summary(combined_summary, "comprehensive", plan)
+    else:
+        summary = postprocess_summary(combined_summary)
     
-    return postprocess_summary(combined_summary)
+    yield {'event': 'summary', 'summary': summary}
+
+def snap_chunk_length(length):
+    """Largest CHUNK_SUMMARY_LENGTH_STEPS step not above length (the smallest one for shorter lengths)"""
+    return max((step for step in CHUNK_SUMMARY_LENGTH_STEPS if step <= length), default=CHUNK_SUMMARY_LENGTH_STEPS[0])
+
+def reduce_summaries(summaries, max_length, min_length, group_max, group_min,
+                     batch_size=None, plan=None, use_pool=False, route=None):
+    """
+    Hierarchically reduce chunk summaries: pack consecutive summaries into
+    groups that fit one model input, summarize each group, and repeat until
+    everything fits, then run the final coherence pass on that input.
+    """
+    route = route or get_route()
+    for level in range(SUMMARIZER_MAX_REDUCE_LEVELS):
+        groups = make_text_chunks(' '.join(summaries), overlap_tokens=0, sentences=summaries,
+                                  manager=route.manager, content_defined=False)
+        
+        if len(groups) <= 1:
+            break
+        
+        print(f"🔁 Reduce level {level + 1}: {len(summaries)} summaries -> {len(groups)} groups")
+        reduced = [None] * len(groups)
+        for i, group_summary in iter_chunk_summaries_batched(
+            groups, group_max, group_min, batch_size=batch_size, plan=plan, use_pool=use_pool, route=route,
+            stage="reduce"
+        ):
+            reduced[i] = group_summary
+        summaries = reduced
+    else:
+        # Still too long after the level cap; only the first input-sized group is used
+        groups = make_text_chunks(' '.join(summaries), overlap_tokens=0, sentences=summaries,
+                                  manager=route.manager, content_defined=False)
+        _mark_degraded()
+    
+    final = [None]
+    for _, final_summary in iter_chunk_summaries_batched(
+        groups[:1], max_length, min_length, plan=plan, use_pool=use_pool, route=route, stage="reduce",
+        length_penalty=3.0  # Increased for longer output
+    ):
+        final[0] = final_summary
+    return final[0]
+
+def summarize_chunks_batched(chunks, max_length, min_length, batch_size=None, plan=None):
+    """
+    Summarize chunks as padded batches, grouping chunks of similar length.
+    Returns the chunk summaries in the original chunk order.
+    """
+    chunk_summaries = [None] * len(chunks)
+    for i, chunk_summary in iter_chunk_summaries_batched(chunks, max_length, min_length, batch_size, plan):
+        chunk_summaries[i] = chunk_summary
+    return chunk_summaries
+
+def iter_chunk_summaries_batched(chunks, max_length, min_length, batch_size=None, plan=None,
+                                 use_pool=False, length_penalty=2.5, route=None, stage="chunk"):
+    """
+    Yield (chunk index, summary) pairs as each padded batch finishes. With
+    use_pool the batches run on the worker pool's model replicas. Chunks
+    whose summary is already in the chunk store are not regenerated.
+    """
+    route = route or get_route()
+    batch_size = max(1, batch_size or SUMMARIZER_BATCH_SIZE)
+    params = {
+        'max_length': max_length,
+        'min_length': min_length,
+        'do_sample': False,
+        'length_penalty': length_penalty,  # Increased for longer output
+        'early_stopping': False,
+        **route.generation
+    }
+    chunk_summaries = [None] * len(chunks)
+    
+    # Chunks the plan already summarized with these params are reused
+    if plan is not None:
+        for i, chunk in enumerate(chunks):
+            chunk_summaries[i] = plan.get_generation(chunk['text'], params, route.model_id)
+            if chunk_summaries[i] is not None:
+                yield i, chunk_summaries[i]
+    pending = [i for i, summary in enumerate(chunk_summaries) if summary is None]
+    
+    # Then the persistent chunk store, in one lookup for the whole call
+    store_keys = {i: chunk_store.make_key(chunks[i]['text'], params, route.cache_model_id) for i in pending}
+    stored = chunk_store.get_many(store_keys.values())
+    for i in pending:
+        summary = stored.get(store_keys[i])
+        if summary is not None:
+            chunk_summaries[i] = summary
+            if plan is not None:
+                plan.set_generation(chunks[i]['text'], params, summary, route.model_id)
+            yield i, summary
+    reused = len(pending)
+    pending = [i for i in pending if chunk_summaries[i] is None]
+    if plan is not None:
+        plan.count_chunks(stage, reused=reused - len(pending), recomputed=len(pending))
+    
+    max_time = _generation_time(plan)
+    if use_pool and map_pool.enabled and route.model_id == map_pool.model_id and pending:
+        # The pool turns max_time into a deadline each worker batch enforces
+        for i, summary, cut_off in map_pool.iter_summaries(chunks, pending, params, batch_size, timeout=max_time):
+            if summary is None:
+                # Keep the fallback in-process cheap; don't load a model here
+                _mark_degraded()
+                summary = ' '.join(_sentences(chunks[i]['text'], plan)[:4])
+            elif cut_off:
+                # Generation cut off by the deadline: keep the output but don't reuse it
+                _mark_degraded()
+            else:
+                chunk_store.set_many({store_keys[i]: summary}, route.cache_model_id)
+                if plan is not None:
+                    plan.set_generation(chunks[i]['text'], params, summary, route.model_id)
+            if plan is not None:
+                plan.beat()
+            yield i, summary
+        return
+    
+    # Sort chunk indices by length so each batch pads to a similar size
+    order = sorted(pending, key=lambda i: chunks[i]['token_count'])
+    
+    for start in range(0, len(order), batch_size):
+        batch_indices = order[start:start + batch_size]
+        batch = [chunks[i] for i in batch_indices]
+        
+        max_time = _generation_time(plan)
+        if max_time is not None and max_time <= 0:
+            # Out of time: keep the finished chunk summaries, fill in the rest extractively
+            _mark_degraded()
+            for i in batch_indices:
+                chunk_summaries[i] = generate_extractive_summary(chunks[i]['text'], "brief", plan)
+                yield i, chunk_summaries[i]
+            continue
+        batch_params = params if max_time is None else {**params, 'max_time': max_time}
+        
+        try:
+            batch_start = time.monotonic()
+            if all(chunk['input_ids'] is not None for chunk in batch):
+                summaries = route.manager.generate_from_ids([chunk['input_ids'] for chunk in batch], **batch_params)
+            else:
+                results = route.manager.get_pipeline()([chunk['text'] for chunk in batch],
+                                                       batch_size=len(batch), **batch_params)
+                summaries = [(result[0] if isinstance(result, list) else result)['summary_text']
+                             for result in results]
+            # Generation cut off by max_time: keep the output but don't reuse it
+            truncated = max_time is not None and time.monotonic() - batch_start >= max_time
+            if truncated:
+                _mark_degraded()
+            for i, summary in zip(batch_indices, summaries):
+                chunk_summaries[i] = summary
+                if plan is not None and not truncated:
+                    plan.set_generation(chunks[i]['text'], params, summary, route.model_id)
+            if not truncated:
+                chunk_store.set_many({store_keys[i]: chunk_summaries[i] for i in batch_indices},
+                                     route.cache_model_id)
+        except Exception as e:
+            print(f"Batch summarization error ({len(batch)} chunks): {e}")
+            # Retry chunk by chunk so one bad chunk doesn't sink the batch
+            for i in batch_indices:
+                # Already counted above, so the retry isn't counted again
+                chunk_summaries[i] = summarize_single_chunk(chunks[i], max_length, min_length, plan,
+                                                            length_penalty=length_penalty, route=route,
+                                                            stage="retry")
+        
+        if plan is not None:
+            plan.beat()
+        for i in batch_indices:
+            yield i, chunk_summaries[i]
+
+def summarize_single_chunk(chunk, max_length, min_length, plan=None, length_penalty=2.5, route=None,
+                           stage="chunk"):
+    """
+    Summarize one chunk, falling back to its first sentences on failure
+    """
+    try:
+        return summarize_chunk(
+            chunk,
+            plan=plan,
+            route=route,
+            stage=stage,
+            max_length=max_length,
+            min_length=min_length,
+            do_sample=False,
+            length_penalty=length_penalty,
+            early_stopping=False
+        )
+    except Exception as e:
+        print(f"Chunk summarization error: {e}")
+        _mark_degraded()
+        # Fallback to first few sentences
+        sentences = _sentences(chunk['text'], plan)[:4]  # Increased from 2
+        return ' '.join(sentences)
 
-def generate_extractive_summary(text, summary_type="detailed"):
+def generate_extractive_summary(text, summary_type="detailed", plan=None, mode=None):
     """
-    Fallback extractive summarization using sentence scoring - LONGER OUTPUT
+    Extractive summarization: the best-scoring sentences in original order.
+    mode is "tfidf" (similarity to the document centroid) or "textrank"
+    (PageRank over sentence similarity); both run on sparse matrices.
     """
-    sentences = sent_tokenize(text)
+    sentences = _sentences(text, plan)
     
     if len(sentences) <= 3:
         return text
     
-    # Score sentences based on word frequency and position
-    word_freq = get_word_frequencies(text)
-    sentence_scores = {}
-    
-    for i, sentence in enumerate(sentences):
-        words = re.findall(r'\b[a-zA-Z]{3,}\b', sentence.lower())
-        score = 0
-        word_count = 0
-        
-        for word in words:
-            if word in word_freq:
-                score += word_freq[word]
-                word_count += 1
-        
-        if word_count > 0:
-            # Average score with position bonus (earlier sentences get slight boost)
-            position_bonus = 1.2 if i < len(sentences) * 0.3 else 0.8
-            sentence_scores[sentence] = (score / word_count) * position_bonus
-    
     # Select MORE sentences based on summary type
     if summary_type == "brief":
         num_sentences = min(8, max(5, len(sentences) // 3))  # Increased from 3
@@ -240,35 +1307,48 @@ def generate_extractive_summary(text, summary_type="detailed"):
     else:  # comprehensive
         num_sentences = min(25, max(12, len(sentences) // 1.5))  # Increased from 10
     
-    top_sentences = sorted(sentence_scores.items(), key=lambda x: x[1], reverse=True)[:num_sentences]
+    mode = mode or SUMMARIZER_EXTRACTIVE_MODE
+    if mode not in EXTRACTIVE_MODES:
+        mode = "tfidf"
+    selected = select_sentences(sentences, num_sentences, mode, EXTRACTIVE_STOP_WORDS)
     
-    # Sort selected sentences by original order
-    selected_sentences = [sent for sent, score in top_sentences]
-    ordered_sentences = []
-    
-    for sentence in sentences:
-        if sentence in selected_sentences:
-            ordered_sentences.append(sentence)
-    
-    summary = ' '.join(ordered_sentences)
+    summary = ' '.join(sentences[i] for i in selected)
     return postprocess_summary(summary)
 
-def generate_extended_summary(text, target_length=1500):  # Increased default
+def generate_fast_summary(text, summary_type="detailed", mode=None):
+    """
+    Extractive-only summary for the fast mode on /summarize; never loads a model
+    """
+    if not text or len(text.strip()) < 50:
+        return "Text too short to summarize effectively."
+    
+    cleaned_text = clean_text_for_summarization(text)
+    summary = generate_extractive_summary(cleaned_text, summary_type, mode=mode)
+    return format_for_frontend(summary, summary_type)
+
+@cached_summary("extended", depends_on="comprehensive")
+def generate_extended_summary(text, target_length=1500, plan=None):  # Increased default
     """
     Generate an extra-long summary using iterative summarization
     """
     if len(text.split()) < 500:
-        return generate_summary(text, "comprehensive")
+        return generate_summary(text, "comprehensive", plan=plan)
     
     # First pass: comprehensive summary
-    first_summary = generate_summary(text, "comprehensive")
-    
+    first_summary = generate_summary(text, "comprehensive", plan=plan)
+
+    if plan is not None and plan.out_of_time():
+        # No budget left for the second pass over the whole text
+        _mark_degraded()
+        return first_summary
+
     # Second pass: expand on the first summary with context
     expanded_text = text + " " + first_summary
     
     try:
-        result = summarizer(
+        summary = run_summarizer(
             expanded_text,
+            plan=plan,
             max_length=min(target_length, 1200),  # Increased
             min_length=min(600, target_length // 2),  # Increased
             do_sample=False,
@@ -277,10 +1357,10 @@ def generate_extended_summary(text, target_length=1500):  # Increased default
             no_repeat_ngram_size=2,
             early_stopping=False
         )
-        summary = result[0]['summary_text']
-        return format_for_frontend(postprocess_summary(summary), "comprehensive")
+        return format_for_frontend(postprocess_summary(summary), "comprehensive", plan)
     except Exception as e:
         print(f"Extended summary error: {e}")
+        _mark_degraded()
         return first_summary
 
 def clean_text_for_summarization(text):
@@ -315,9 +1395,197 @@ def clean_text_for_summarization(text):
     
     return cleaned_text
 
-def split_text_into_chunks(text, chunk_size):
-    """Split text into chunks at sentence boundaries"""
-    sentences = sent_tokenize(text)
+def get_summarizer_tokenizer(manager=None):
+    """The model's fast tokenizer, or None when it can't be loaded"""
+    try:
+        return (manager or model_manager).get_tokenizer()
+    except Exception as e:
+        print(f"⚠️ Tokenizer unavailable, chunking by words: {e}")
+        return None
+
+def make_text_chunks(text, max_tokens=None, overlap_tokens=None, sentences=None, manager=None,
+                     content_defined=None):
+    """
+    Chunk text for a model (the default one when manager is None). Chunks are
+    dicts with 'text', 'input_ids' and 'token_count'; without a tokenizer they
+    fall back to word counts and carry no input_ids.
+    """
+    max_tokens = max_tokens or SUMMARIZER_MAX_INPUT_TOKENS
+    if sentences is None:
+        sentences = sent_tokenize(text)
+    
+    tokenizer = get_summarizer_tokenizer(manager)
+    if tokenizer is None:
+        # Roughly 1.3 BART tokens per English word
+        word_budget = max(1, int(max_tokens / 1.3))
+        return [
+            {'text': chunk, 'input_ids': None, 'token_count': len(chunk.split())}
+            for chunk in split_text_into_chunks(text, word_budget, sentences=sentences)
+        ]
+    
+    return split_text_into_token_chunks(sentences, tokenizer, max_tokens, overlap_tokens, content_defined)
+
+def is_chunk_boundary(sentence):
+    """Content-defined boundary test; stable across processes, unlike hash()"""
+    digest = hashlib.md5(sentence.encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big') % max(1, SUMMARIZER_CHUNK_BOUNDARY_DIVISOR) == 0
+
+def split_text_into_token_chunks(sentences, tokenizer, max_tokens=None, overlap_tokens=None,
+                                 content_defined=None):
+    """
+    Pack sentences into chunks of at most max_tokens model tokens (special
+    tokens included), optionally repeating up to overlap_tokens of trailing
+    sentences at the start of the next chunk. All sentences are tokenized in
+    one batched call and each chunk keeps its ids for generation. With
+    content_defined, chunks may also end early at content-defined boundaries.
+    """
+    packer = TokenChunkPacker(tokenizer, max_tokens, overlap_tokens, content_defined)
+    packer.add(sentences)
+    return packer.finish()
+
+class TokenChunkPacker:
+    """
+    The packing behind split_text_into_token_chunks, fed sentences in any
+    number of batches. Every decision depends only on sentences already
+    added, so batches give the same chunks as one call with all of them.
+    """
+    
+    def __init__(self, tokenizer, max_tokens=None, overlap_tokens=None, content_defined=None):
+        max_tokens = max_tokens or SUMMARIZER_MAX_INPUT_TOKENS
+        self.tokenizer = tokenizer
+        self.overlap_tokens = SUMMARIZER_CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        self.content_defined = SUMMARIZER_CONTENT_DEFINED_CHUNKS if content_defined is None else content_defined
+        self.budget = max_tokens - tokenizer.num_special_tokens_to_add()
+        self.min_fill = int(self.budget * SUMMARIZER_CHUNK_MIN_FILL)
+        
+        self.chunks = []
+        self.sentences = []
+        self.sentence_ids = []
+        self.current = []        # sentence indices in the chunk being built
+        self.current_tokens = 0
+        self.has_new = False     # False while current only holds overlap from the last chunk
+        self.cut_here = False    # the last sentence was a content-defined boundary
+    
+    def add(self, sentences):
+        if not sentences:
+            return
+        offset = len(self.sentences)
+        # BPE marks word starts with a leading space, so sentences after the
+        # first are encoded the way they appear inside the joined text
+        sentence_ids = self.tokenizer(
+            [sentence if offset + i == 0 else " " + sentence for i, sentence in enumerate(sentences)],
+            add_special_tokens=False
+        )['input_ids']
+        self.sentences.extend(sentences)
+        self.sentence_ids.extend(sentence_ids)
+        for i in range(offset, len(self.sentences)):
+            self._place(i)
+    
+    def finish(self):
+        """Flush the last chunk and return all chunks"""
+        self._flush()
+        self.current, self.current_tokens, self.has_new = [], 0, False
+        return self.chunks
+    
+    def _add_chunk(self, text, ids):
+        self.chunks.append({
+            'text': text,
+            'input_ids': self.tokenizer.build_inputs_with_special_tokens(ids),
+            'token_count': len(ids) + self.tokenizer.num_special_tokens_to_add()
+        })
+    
+    def _flush(self):
+        if self.current and self.has_new:
+            ids = [token for i in self.current for token in self.sentence_ids[i]]
+            self._add_chunk(' '.join(self.sentences[i] for i in self.current), ids)
+    
+    def _place(self, i):
+        ids = self.sentence_ids[i]
+        budget = self.budget
+        
+        if len(ids) > budget:
+            # A single sentence longer than the budget is split on token boundaries
+            self._flush()
+            self.current, self.current_tokens, self.has_new = [], 0, False
+            for start in range(0, len(ids), budget):
+                piece = ids[start:start + budget]
+                self._add_chunk(self.tokenizer.decode(piece).strip(), piece)
+            self.cut_here = False
+            return
+        
+        if self.current_tokens + len(ids) > budget or self.cut_here:
+            self._flush()
+            carried, carried_tokens = [], 0
+            for j in reversed(self.current):
+                size = len(self.sentence_ids[j])
+                if carried_tokens + size > self.overlap_tokens or carried_tokens + size + len(ids) > budget:
+                    break
+                carried.insert(0, j)
+                carried_tokens += size
+            self.current, self.current_tokens, self.has_new = carried, carried_tokens, False
+        
+        self.current.append(i)
+        self.current_tokens += len(ids)
+        self.has_new = True
+        self.cut_here = (self.content_defined and self.current_tokens >= self.min_fill
+                         and is_chunk_boundary(self.sentences[i]))
+
+# Where a piece of arriving text can be cut without splitting a sentence
+_SENTENCE_END = re.compile(r'[.!?]\s')
+
+class IncrementalChunker:
+    """
+    make_text_chunks for text that arrives in pieces, such as PDF pages while
+    they are extracted. Each piece is cleaned, sentence-tokenized and packed
+    into chunks right away; text after the last sentence end is held back
+    until the next piece, since the sentence may continue there.
+    Content-defined boundaries only depend on nearby sentences, so the chunks
+    match chunking the finished text except, rarely, around page breaks.
+    """
+    
+    def __init__(self, max_tokens=None, manager=None):
+        self.max_tokens = max_tokens or SUMMARIZER_MAX_INPUT_TOKENS
+        tokenizer = get_summarizer_tokenizer(manager)
+        self.packer = TokenChunkPacker(tokenizer, self.max_tokens) if tokenizer is not None else None
+        self.sentences = []
+        self._pending = ""
+    
+    def feed(self, text):
+        self._pending += text
+        last_end = None
+        for last_end in _SENTENCE_END.finditer(self._pending):
+            pass
+        if last_end is None:
+            return
+        # Cut after the punctuation: cleaning drops a trailing '. ' separator
+        cut = last_end.start() + 1
+        complete, self._pending = self._pending[:cut], self._pending[cut:]
+        self._add(complete)
+    
+    def finish(self):
+        """All chunks, once the last piece has been fed"""
+        self._add(self._pending)
+        self._pending = ""
+        if self.packer is not None:
+            return self.packer.finish()
+        # Without a tokenizer, chunk by words like make_text_chunks
+        word_budget = max(1, int(self.max_tokens / 1.3))
+        return [
+            {'text': chunk, 'input_ids': None, 'token_count': len(chunk.split())}
+            for chunk in split_text_into_chunks(' '.join(self.sentences), word_budget, sentences=self.sentences)
+        ]
+    
+    def _add(self, text):
+        sentences = sent_tokenize(clean_text_for_summarization(text))
+        if self.packer is not None:
+            self.packer.add(sentences)
+        else:
+            self.sentences.extend(sentences)
+
+def split_text_into_chunks(text, chunk_size, sentences=None):
+    """Split text into chunks at sentence boundaries (chunk_size in words)"""
+    if sentences is None:
+        sentences = sent_tokenize(text)
     chunks = []
     current_chunk = ""
     
@@ -334,22 +1602,23 @@ def split_text_into_chunks(text, chunk_size):
     
     return chunks
 
+# Common stop words ignored when scoring sentences for extractive summaries
+EXTRACTIVE_STOP_WORDS = frozenset({
+    'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 
+    'by', 'from', 'up', 'about', 'into', 'through', 'during', 'before', 
+    'after', 'above', 'below', 'between', 'among', 'this', 'that', 'these', 
+    'those', 'his', 'her', 'him', 'she', 'they', 'them', 'their', 'what', 
+    'which', 'who', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 
+    'each', 'few', 'more', 'most', 'other', 'some', 'such', 'only', 'own', 
+    'same', 'than', 'too', 'very', 'can', 'will', 'just', 'should', 'now'
+})
+
 def get_word_frequencies(text):
     """Calculate word frequencies for extractive summarization"""
     words = re.findall(r'\b[a-zA-Z]{3,}\b', text.lower())
     
     # Remove common stop words
-    stop_words = {
-        'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 
-        'by', 'from', 'up', 'about', 'into', 'through', 'during', 'before', 
-        'after', 'above', 'below', 'between', 'among', 'this', 'that', 'these', 
-        'those', 'his', 'her', 'him', 'she', 'they', 'them', 'their', 'what', 
-        'which', 'who', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 
-        'each', 'few', 'more', 'most', 'other', 'some', 'such', 'only', 'own', 
-        'same', 'than', 'too', 'very', 'can', 'will', 'just', 'should', 'now'
-    }
-    
-    filtered_words = [word for word in words if word not in stop_words]
+    filtered_words = [word for word in words if word not in EXTRACTIVE_STOP_WORDS]
     
     # Count frequencies
     freq = {}
@@ -435,7 +1704,8 @@ def generate_detailed_summary(text):
     """
     return generate_summary(text, summary_type="detailed")
 
-def generate_long_structured_summary(text, structure_level="detailed"):
+@cached_summary("structured", depends_on="comprehensive")
+def generate_long_structured_summary(text, structure_level="detailed", plan=None):
     """
     Generate a comprehensive, structured summary with multiple sections
     """
@@ -443,73 +1713,72 @@ def generate_long_structured_summary(text, structure_level="detailed"):
         return {"error": "Text too short for structured summary"}
     
     # Generate comprehensive summary first (LONGER)
-    comprehensive_summary = generate_summary(text, "comprehensive")
+    comprehensive_summary = generate_summary(text, "comprehensive", plan=plan)
+    
+    # Tokenize the text and the summary once; every section reads from these
+    text_analysis = analyze_text(text, plan)
+    summary_analysis = analyze_text(comprehensive_summary, plan)
     
     # Extract key information for structure
-    key_topics = extract_key_topics(text)  # Use original text for better topics
-    key_entities = extract_named_entities(text)  # Use original text
-    main_points = extract_main_points(comprehensive_summary)
+    key_topics = extract_key_topics(text, analysis=text_analysis)  # Use original text for better topics
+    key_entities = extract_named_entities(text, analysis=text_analysis)  # Use original text
+    main_points = extract_main_points(comprehensive_summary, analysis=summary_analysis)
     
     # Build structured summary
     structured_summary = {
-        "overview": generate_overview_section(comprehensive_summary),
+        "overview": generate_overview_section(comprehensive_summary, analysis=summary_analysis),
         "key_findings": generate_key_findings(main_points),
         "topics_covered": key_topics[:10],  # Increased from 8
         "main_entities": key_entities[:8],  # Increased from 6
-        "detailed_analysis": generate_detailed_analysis(comprehensive_summary, structure_level),
-        "conclusion": generate_conclusion_section(comprehensive_summary),
-        "full_summary": format_for_frontend(comprehensive_summary, "comprehensive")
+        "detailed_analysis": generate_detailed_analysis(comprehensive_summary, structure_level,
+                                                        analysis=summary_analysis, plan=plan),
+        "conclusion": generate_conclusion_section(comprehensive_summary, analysis=summary_analysis),
+        "full_summary": format_for_frontend(comprehensive_summary, "comprehensive", plan,
+                                            sentences=summary_analysis.sentences)
     }
     
     return structured_summary
 
-def extract_key_topics(text, num_topics=12):  # Increased from 10
+def extract_key_topics(text, num_topics=12, analysis=None):  # Increased from 10
     """
     Extract main topics from text using TF-IDF like approach
     """
-    words = word_tokenize(text.lower())
+    if analysis is None:
+        analysis = AnalyzedText(text)
     
-    # Remove stopwords and short words
-    stop_words = set(stopwords.words('english'))
-    filtered_words = [word for word in words if word.isalpha() and word not in stop_words and len(word) > 2]
-    
-    # Get word frequencies
-    word_freq = Counter(filtered_words)
-    
-    # Get most common topics
-    topics = [word for word, count in word_freq.most_common(num_topics)]
+    # Most common non-stopword words (frequencies come from the analysis)
+    topics = [word for word, count in analysis.word_frequencies.most_common(num_topics)]
     
     return topics
 
-def extract_named_entities(text):
+def extract_named_entities(text, analysis=None):
     """
     Simple named entity extraction (can be enhanced with proper NER)
     """
     # This is a simple implementation - consider using spaCy for better NER
-    sentences = sent_tokenize(text)
-    entities = set()
+    if analysis is None:
+        analysis = AnalyzedText(text)
+    entities = {}  # insertion-ordered set
     
     # Look for capitalized phrases that might be entities
-    for sentence in sentences:
-        words = word_tokenize(sentence)
+    for words, is_stop in zip(analysis.tokens, analysis.stopword_mask):
         for i, word in enumerate(words):
-            if (word.istitle() and len(word) > 2 and 
-                word.lower() not in stopwords.words('english')):
+            if word.istitle() and len(word) > 2 and not is_stop[i]:
                 # Check if it's part of a multi-word entity
-                if (i > 0 and words[i-1].istitle() and 
-                    words[i-1].lower() not in stopwords.words('english')):
-                    entity = f"{words[i-1]} {word}"
-                    entities.add(entity)
+                if i > 0 and words[i-1].istitle() and not is_stop[i-1]:
+                    entities[f"{words[i-1]} {word}"] = None
                 else:
-                    entities.add(word)
+                    entities[word] = None
     
     return list(entities)[:12]  # Increased from 10
 
-def extract_main_points(summary_text, num_points=8):  # Increased from 5
+def extract_main_points(summary_text, num_points=8, analysis=None):  # Increased from 5
     """
     Extract MORE main points from a summary
     """
-    sentences = sent_tokenize(summary_text)
+    if analysis is None:
+        analysis = AnalyzedText(summary_text)
+    sentences = analysis.sentences
     
     if len(sentences) <= num_points:
         return sentences
@@ -531,11 +1800,11 @@ def extract_main_points(summary_text, num_points=8):  # Increased from 5
     scored_sentences.sort(key=lambda x: x[1], reverse=True)
     return [sentence for sentence, score in scored_sentences[:num_points]]
 
-def generate_overview_section(summary_text):
+def generate_overview_section(summary_text, analysis=None):
     """
     Generate overview section from summary
     """
-    sentences = sent_tokenize(summary_text)
+    sentences = analysis.sentences if analysis is not None else sent_tokenize(summary_text)
     if len(sentences) >= 3:  # Increased from 2
         return '. '.join(sentences[:3]) + '.'
     return summary_text
@@ -546,11 +1815,11 @@ def generate_key_findings(main_points):
     """
     return [f"• {point}" if not point.startswith('•') else point for point in main_points]
 
-def generate_detailed_analysis(summary_text, structure_level):
+def generate_detailed_analysis(summary_text, structure_level, analysis=None, plan=None):
     """
     Generate detailed analysis section with proper formatting
     """
-    sentences = sent_tokenize(summary_text)
+    sentences = analysis.sentences if analysis is not None else sent_tokenize(summary_text)
     
     if structure_level == "basic":
         analysis_sentences = sentences[3:6] if len(sentences) > 6 else sentences[3:]
@@ -560,13 +1829,13 @@ def generate_detailed_analysis(summary_text, structure_level):
         analysis_sentences = sentences[3:12] if len(sentences) > 12 else sentences[3:]
     
     # Format as paragraphs
-    return format_for_frontend(" ".join(analysis_sentences), "detailed")
+    return format_for_frontend(" ".join(analysis_sentences), "detailed", plan, sentences=analysis_sentences)
 
-def generate_conclusion_section(summary_text):
+def generate_conclusion_section(summary_text, analysis=None):
     """
     Extract or generate conclusion from summary with proper formatting
     """
-    sentences = sent_tokenize(summary_text)
+    sentences = analysis.sentences if analysis is not None else sent_tokenize(summary_text)
     
     if len(sentences) >= 4:  # Increased from 3
         # Try to find concluding sentences (often the last ones)
@@ -583,34 +1852,54 @@ def generate_conclusion_section(summary_text):
     
     return sentences[-1] if sentences else ""
 
-def generate_multi_level_summary(text):
+def generate_multi_level_summary(text, plan=None):
     """
-    Generate summaries at multiple levels of detail with proper formatting
+    Generate summaries at multiple levels of detail with proper formatting.
+    All levels share one plan, so the comprehensive summary, cleaning,
+    tokenization and chunking are computed once for the whole request.
     """
-    return {
-        "executive_summary": generate_summary(text, "brief"),
-        "detailed_summary": generate_summary(text, "detailed"),
-        "comprehensive_summary": generate_summary(text, "comprehensive"),
-        "extended_summary": generate_extended_summary(text),
-        "structured_summary": generate_long_structured_summary(text, "detailed")
+    if plan is None:
+        plan = SummaryPlan()
+    result = {
+        "executive_summary": generate_summary(text, "brief", plan=plan),
+        "detailed_summary": generate_summary(text, "detailed", plan=plan),
+        "comprehensive_summary": generate_summary(text, "comprehensive", plan=plan),
+        "extended_summary": generate_extended_summary(text, plan=plan),
+        "structured_summary": generate_long_structured_summary(text, "detailed", plan=plan)
     }
+    print(f"🧩 Multi-level plan: {plan.stats['generations']} BART calls, "
+          f"{plan.stats['reused_generations']} reused")
+    return result
 
 # Additional utility function for your upload endpoint
-def should_regenerate_summary(file_doc, new_text):
+def text_content_hash(text):
+    """Hash of the whitespace-normalized text, stored on file docs as text_hash"""
+    return hashlib.sha256(normalize_text_for_cache(text).encode('utf-8')).hexdigest()
+
+def should_regenerate_summary(file_doc, new_text, summary_type=None):
     """
-    Determine if a summary should be regenerated based on content changes
+    Determine if a summary should be regenerated. Any content change counts:
+    regenerating only re-runs the chunks whose text changed (the rest come
+    from the chunk summary store), so there is no size threshold.
     """
-    if not file_doc.get('summary'):
+    if not file_doc.get('summary') and not file_doc.get('summary_ref'):
         return True
     
-    old_text = file_doc.get('text', '')
-    if not old_text:
+    # Fallback output is replaced as soon as the model can do better
+    if file_doc.get('summary_path') in ('partial', 'extractive'):
         return True
     
-    # If text length changed significantly, regenerate
-    length_diff = abs(len(new_text) - len(old_text)) / max(len(new_text), 1)
-    if length_diff > 0.3:  # 30% change
-        return True
+    if summary_type is not None:
+        if file_doc.get('summary_type') != summary_type:
+            return True
+        if file_doc.get('summary_model') and file_doc['summary_model'] != get_summary_model(summary_type):
+            return True
+    
+    old_hash = file_doc.get('text_hash')
+    if old_hash is None:
+        old_text = file_doc.get('text') or file_doc.get('content') or ''
+        if not old_text:
+            return True
+        old_hash = text_content_hash(old_text)
     
-    # TODO: Add more sophisticated content comparison
-    return False
\ No newline at end of file
+    return old_hash != text_content_hash(new_text)
\ No newline at end of file
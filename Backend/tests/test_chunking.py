@@ -0,0 +1,152 @@
+import random
+
+import pytest
+
+import summarizer
+from summarizer import (
+    IncrementalChunker,
+    TokenChunkPacker,
+    clean_text_for_summarization,
+    make_text_chunks,
+    split_text_into_token_chunks
+)
+
+WORDS = "cells energy protein membrane nucleus enzyme signal gene growth light water carbon".split()
+
+
+class WordTokenizer:
+    """One token per word plus BOS/EOS, enough to exercise the packing without a model"""
+
+    def __init__(self):
+        self.vocabulary = {}
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {'input_ids': [
+            [self.vocabulary.setdefault(word, len(self.vocabulary) + 3) for word in text.split()]
+            for text in texts
+        ]}
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def build_inputs_with_special_tokens(self, ids):
+        return [0] + list(ids) + [2]
+
+    def decode(self, ids):
+        words = {token: word for word, token in self.vocabulary.items()}
+        return " ".join(words[token] for token in ids)
+
+
+class Manager:
+    model_id = "test/word-model"
+
+    def __init__(self, tokenizer=None):
+        self.tokenizer = tokenizer
+
+    def get_tokenizer(self):
+        if self.tokenizer is None:
+            raise OSError("no tokenizer here")
+        return self.tokenizer
+
+
+def make_sentences(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(WORDS).capitalize()} {' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 30)))} {i}."
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def frequent_boundaries(monkeypatch):
+    # Make content-defined boundaries common enough to show up in short texts
+    monkeypatch.setattr(summarizer, "SUMMARIZER_CHUNK_BOUNDARY_DIVISOR", 3)
+
+
+def as_tuples(chunks):
+    return [(chunk['text'], chunk['input_ids'], chunk['token_count']) for chunk in chunks]
+
+
+@pytest.mark.parametrize("content_defined", [False, True])
+@pytest.mark.parametrize("overlap_tokens", [0, 40])
+def test_packer_fed_in_batches_matches_one_call(content_defined, overlap_tokens):
+    sentences = make_sentences(200)
+    tokenizer = WordTokenizer()
+    expected = split_text_into_token_chunks(sentences, tokenizer, 128, overlap_tokens, content_defined)
+
+    packer = TokenChunkPacker(tokenizer, 128, overlap_tokens, content_defined)
+    rng = random.Random(3)
+    start = 0
+    while start < len(sentences):
+        size = rng.randint(0, 15)
+        packer.add(sentences[start:start + size])
+        start += size
+
+    assert len(expected) > 5
+    assert as_tuples(packer.finish()) == as_tuples(expected)
+
+
+def test_chunks_fit_the_token_budget():
+    chunks = split_text_into_token_chunks(make_sentences(200), WordTokenizer(), 64, 16, True)
+    assert chunks
+    assert all(chunk['token_count'] <= 64 for chunk in chunks)
+    assert all(len(chunk['input_ids']) == chunk['token_count'] for chunk in chunks)
+
+
+def test_sentence_longer_than_budget_is_split_on_token_boundaries():
+    long_sentence = " ".join(WORDS * 10)
+    chunks = split_text_into_token_chunks(["Short one.", long_sentence, "Short two."], WordTokenizer(), 32, 0, False)
+    pieces = [chunk['text'] for chunk in chunks[1:-1]]
+    assert " ".join(pieces) == long_sentence
+    assert all(chunk['token_count'] <= 32 for chunk in chunks)
+
+
+def test_no_sentences_make_no_chunks():
+    assert split_text_into_token_chunks([], WordTokenizer()) == []
+
+
+def pages_of(text, count, seed=11):
+    """Cut text at arbitrary points, mid-sentence and mid-word included"""
+    cuts = sorted(random.Random(seed).sample(range(1, len(text)), count - 1))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+@pytest.mark.parametrize("content_defined", [False, True])
+def test_incremental_chunker_matches_chunking_the_whole_text(monkeypatch, content_defined):
+    monkeypatch.setattr(summarizer, "SUMMARIZER_CONTENT_DEFINED_CHUNKS", content_defined)
+    text = " ".join(make_sentences(300))
+    manager = Manager(WordTokenizer())
+    expected = make_text_chunks(clean_text_for_summarization(text), 256, manager=manager)
+
+    chunker = IncrementalChunker(256, manager=manager)
+    for page in pages_of(text, 25):
+        chunker.feed(page)
+
+    assert len(expected) > 5
+    assert as_tuples(chunker.finish()) == as_tuples(expected)
+
+
+def test_incremental_chunker_without_tokenizer_chunks_by_words():
+    text = " ".join(make_sentences(120))
+    manager = Manager()
+    expected = make_text_chunks(clean_text_for_summarization(text), 128, manager=manager)
+
+    chunker = IncrementalChunker(128, manager=manager)
+    for page in pages_of(text, 10):
+        chunker.feed(page)
+
+    chunks = chunker.finish()
+    assert all(chunk['input_ids'] is None for chunk in chunks)
+    assert [chunk['text'] for chunk in chunks] == [chunk['text'] for chunk in expected]
+
+
+def test_plan_reuses_chunks_built_during_extraction():
+    text = " ".join(make_sentences(50))
+    manager = Manager(WordTokenizer())
+    chunker = IncrementalChunker(manager=manager)
+    chunker.feed(text)
+    chunks = chunker.finish()
+
+    plan = summarizer.SummaryPlan()
+    plan.use_chunks(text, chunks, manager=manager)
+    assert plan.chunks(plan.cleaned(text), manager=manager) is chunks
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from utils.extractive import (
+    build_term_matrix,
+    rank_sentences,
+    select_sentences,
+    textrank_scores,
+    tfidf_rows,
+    tfidf_scores
+)
+
+SENTENCES = [
+    "Photosynthesis converts light energy into chemical energy in plants.",
+    "Chlorophyll in plant leaves absorbs light for photosynthesis.",
+    "The lecture hall was painted blue last summer.",
+    "Plants store the chemical energy from photosynthesis as glucose.",
+    "Glucose from photosynthesis fuels plant growth."
+]
+
+
+def test_term_matrix_counts_words_of_three_or_more_letters():
+    counts = build_term_matrix(["The cat sat on the mat with the cat", "A dog"], stop_words=frozenset({"the"}))
+    dense = counts.toarray()
+    assert dense.shape == (2, 5)  # cat, sat, mat, with, dog
+    assert sorted(dense[0].tolist()) == [0, 1, 1, 1, 2]
+    assert dense[1].sum() == 1
+
+
+def test_tfidf_rows_are_unit_length_and_empty_rows_stay_zero():
+    weights = tfidf_rows(build_term_matrix(["energy from light", "!!", "light and water"]))
+    norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+    assert norms == pytest.approx([1.0, 0.0, 1.0])
+
+
+def test_tfidf_scores_of_empty_document_are_zero():
+    weights = tfidf_rows(build_term_matrix(["!!", "?"]))
+    assert tfidf_scores(weights).tolist() == [0.0, 0.0]
+
+
+def test_textrank_matches_dense_pagerank():
+    weights = tfidf_rows(build_term_matrix(SENTENCES))
+    similarity = (weights @ weights.T).toarray()
+    np.fill_diagonal(similarity, 0)
+    degree = similarity.sum(axis=1)
+    transition = np.divide(similarity, degree[:, None], out=np.zeros_like(similarity), where=degree[:, None] > 0)
+    n = len(SENTENCES)
+    expected = np.full(n, 1.0 / n)
+    for _ in range(200):
+        expected = 0.15 / n + 0.85 * transition.T @ expected
+
+    assert textrank_scores(weights, max_iter=200, tol=1e-12) == pytest.approx(expected, abs=1e-6)  # float32 weights
+
+
+def test_textrank_of_no_sentences_is_empty():
+    assert textrank_scores(tfidf_rows(build_term_matrix([]))).shape == (0,)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        rank_sentences(SENTENCES, mode="lexrank")
+
+
+@pytest.mark.parametrize("mode", ["tfidf", "textrank"])
+def test_off_topic_sentence_is_left_out(mode):
+    selected = select_sentences(SENTENCES, 3, mode=mode)
+    assert len(selected) == 3
+    assert 2 not in selected
+    assert selected == sorted(selected)
+
+
+@pytest.mark.parametrize("count, expected", [(0, []), (-1, []), (10, [0, 1, 2, 3, 4])])
+def test_selection_size_is_clamped(count, expected):
+    assert select_sentences(SENTENCES, count) == expected
+
+
+def test_repeated_sentences_are_selected_independently():
+    sentences = [SENTENCES[0], SENTENCES[0], SENTENCES[2]]
+    assert select_sentences(sentences, 2) == [0, 1]
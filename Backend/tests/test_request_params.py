@@ -0,0 +1,31 @@
+import pytest
+
+from utils.request_params import parse_budget_seconds, parse_progress_days
+
+
+@pytest.mark.parametrize("value, expected", [
+    (1500, 1.5),
+    ("250", 0.25),
+    (0.5, 0.0005),
+])
+def test_budget_ms_becomes_seconds(value, expected):
+    assert parse_budget_seconds(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", [None, "", "fast", [], 0, "0", -100])
+def test_missing_invalid_or_non_positive_budget_means_server_default(value):
+    assert parse_budget_seconds(value) is None
+
+
+def test_progress_window_defaults_to_thirty_days():
+    assert parse_progress_days(None) == 30
+
+
+@pytest.mark.parametrize("value", ["7", "30", "90", "365", 90])
+def test_dashboard_windows_are_accepted(value):
+    assert parse_progress_days(value) == int(value)
+
+
+@pytest.mark.parametrize("value", ["", "week", "14", "0", "-7", "7.5", "1000"])
+def test_other_windows_are_rejected(value):
+    assert parse_progress_days(value) is None
@@ -0,0 +1,68 @@
+import pytest
+
+from summarizer import get_summary_model, should_regenerate_summary, text_content_hash
+
+TEXT = "Cells turn glucose into energy.  Mitochondria are where this happens."
+
+
+def stored_file(**fields):
+    """A files document as the ingest worker leaves it after a detailed summary"""
+    doc = {
+        'summary': 'Cells make energy in mitochondria.',
+        'summary_type': 'detailed',
+        'summary_model': get_summary_model('detailed'),
+        'summary_path': 'abstractive',
+        'text_hash': text_content_hash(TEXT)
+    }
+    doc.update(fields)
+    return doc
+
+
+def test_up_to_date_summary_is_kept():
+    assert not should_regenerate_summary(stored_file(), TEXT, 'detailed')
+
+
+def test_whitespace_only_changes_do_not_count():
+    reflowed = TEXT.replace("  ", "\n")
+    assert not should_regenerate_summary(stored_file(), reflowed, 'detailed')
+
+
+def test_any_content_change_regenerates():
+    assert should_regenerate_summary(stored_file(), TEXT + " Plants use chloroplasts.", 'detailed')
+
+
+def test_missing_summary_regenerates():
+    assert should_regenerate_summary(stored_file(summary=''), TEXT, 'detailed')
+
+
+def test_summary_in_text_store_counts_as_present():
+    doc = stored_file(summary_ref={'blob_id': 'blob'})
+    del doc['summary']
+    assert not should_regenerate_summary(doc, TEXT, 'detailed')
+
+
+@pytest.mark.parametrize("path", ['partial', 'extractive'])
+def test_fallback_summaries_are_replaced(path):
+    assert should_regenerate_summary(stored_file(summary_path=path), TEXT, 'detailed')
+
+
+def test_other_summary_type_regenerates():
+    assert should_regenerate_summary(stored_file(), TEXT, 'brief')
+
+
+def test_other_model_regenerates():
+    assert should_regenerate_summary(stored_file(summary_model='retired/model'), TEXT, 'detailed')
+
+
+def test_without_summary_type_only_content_is_compared():
+    assert not should_regenerate_summary(stored_file(summary_type='brief'), TEXT)
+
+
+def test_legacy_file_without_text_hash_compares_stored_text():
+    doc = stored_file(text_hash=None, content=TEXT)
+    assert not should_regenerate_summary(doc, TEXT, 'detailed')
+    assert should_regenerate_summary(doc, "Something else entirely.", 'detailed')
+
+
+def test_legacy_file_without_text_hash_or_text_regenerates():
+    assert should_regenerate_summary(stored_file(text_hash=None), TEXT, 'detailed')
@@ -0,0 +1,143 @@
+# Backend/utils/blob_store.py
+
+import hashlib
+import os
+from datetime import datetime
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Upload bytes are hashed in blocks of this size while being written to disk
+UPLOAD_HASH_BLOCK_SIZE = int(os.getenv("UPLOAD_HASH_BLOCK_SIZE", str(1024 * 1024)))
+
+# Everything the ingest pipeline writes onto a file document; copied as-is
+# from an already processed upload of the same bytes. Text store refs are
+# copied too, so both documents share the stored text.
+PROCESSED_FILE_FIELDS = (
+    'text', 'content', 'text_ref', 'text_length', 'page_count', 'page_offsets',
+    'summary', 'summary_ref', 'summary_preview', 'summary_length', 'compression_ratio', 'summary_type',
+    'summary_model', 'summary_path', 'text_hash', 'summary_chunks', 'last_summarized',
+    'structured_summary', 'structured_summary_ref', 'has_structured_summary'
+)
+
+
+def get_blobs_collection():
+    from database import db
+    return db["blobs"]
+
+
+def ensure_blob_indexes():
+    from database import db
+    get_blobs_collection().create_index([("sha256", ASCENDING)], unique=True)
+    db["files"].create_index([("content_sha256", ASCENDING), ("status", ASCENDING)])
+
+
+def save_and_hash(file_storage, filepath):
+    """
+    Write an uploaded file to filepath, computing its SHA-256 on the way.
+    Returns (sha256 hex digest, size in bytes).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    stream = file_storage.stream
+    with open(filepath, 'wb') as out:
+        while True:
+            block = stream.read(UPLOAD_HASH_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            out.write(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+
+def acquire_blob(sha256, filepath, size, category):
+    """
+    Take a reference on the stored blob with this hash, creating it from
+    filepath if it is new. When the blob already existed, the duplicate copy
+    at filepath is removed and the returned blob points at the original file.
+    Returns (blob, is_duplicate).
+    """
+    now = datetime.utcnow()
+    blobs = get_blobs_collection()
+    for attempt in range(2):
+        try:
+            blob = blobs.find_one_and_update(
+                {'sha256': sha256},
+                {
+                    '$setOnInsert': {
+                        'sha256': sha256,
+                        'filepath': filepath,
+                        'size': size,
+                        'category': category,
+                        'created_at': now
+                    },
+                    '$inc': {'ref_count': 1},
+                    '$set': {'updated_at': now}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            break
+        except DuplicateKeyError:
+            # Two first uploads of the same bytes raced on the upsert; the
+            # second try finds the winner's blob
+            if attempt:
+                raise
+
+    is_duplicate = blob['filepath'] != filepath
+    if is_duplicate and os.path.exists(filepath):
+        os.remove(filepath)
+    return blob, is_duplicate
+
+
+def release_blob(blob_id):
+    """
+    Drop one reference. The blob document and its file on disk are removed
+    once nothing references them. Returns True when the blob was deleted.
+    """
+    blobs = get_blobs_collection()
+    blob = blobs.find_one_and_update(
+        {'_id': blob_id},
+        {'$inc': {'ref_count': -1}, '$set': {'updated_at': datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if blob is None or blob['ref_count'] > 0:
+        return False
+
+    # Conditional delete: an upload that took a new reference in the meantime
+    # keeps the blob alive
+    if blobs.delete_one({'_id': blob_id, 'ref_count': {'$lte': 0}}).deleted_count != 1:
+        return False
+    if os.path.exists(blob['filepath']):
+        os.remove(blob['filepath'])
+    print(f"🗑️ Removed blob {blob['sha256'][:12]} ({blob['filepath']})")
+    return True
+
+
+def find_processed_artefacts(sha256, exclude_id=None):
+    """
+    Extracted text, summaries and structured summary of an already processed
+    upload with the same content hash, or None. The copy holds its own
+    references on the stored text; release_blobs them if it is not saved.
+    """
+    from database import db
+    from utils.text_store import BLOB_FIELDS, retain_blobs
+
+    query = {'content_sha256': sha256, 'status': 'processed'}
+    if exclude_id is not None:
+        query['_id'] = {'$ne': exclude_id}
+    source = db["files"].find_one(
+        query,
+        {field: 1 for field in PROCESSED_FILE_FIELDS},
+        sort=[('updatedAt', -1)]
+    )
+    if not source or not ((source.get('summary') or '').strip() or source.get('summary_ref')):
+        return None
+
+    artefacts = {field: source[field] for field in PROCESSED_FILE_FIELDS if field in source}
+    # The source may have been deleted since it was read
+    if not retain_blobs(artefacts.get(f'{field}_ref') for field in BLOB_FIELDS):
+        return None
+    artefacts['reused_from'] = source['_id']
+    return artefacts
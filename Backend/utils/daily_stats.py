@@ -0,0 +1,136 @@
+# Backend/utils/daily_stats.py
+
+from datetime import datetime
+
+from pymongo import ASCENDING
+
+# Counters kept per (user_id, date); date is the UTC day as 'YYYY-MM-DD'
+DAILY_COUNTERS = ('questions_answered', 'correct_answers', 'time_spent', 'quizzes_completed', 'score_total')
+
+
+def get_daily_stats_collection():
+    from database import db
+    return db["user_daily_stats"]
+
+
+def ensure_daily_stats_indexes():
+    # Unique: the upserts below and the rebuild's $merge both match on it
+    get_daily_stats_collection().create_index([("user_id", ASCENDING), ("date", ASCENDING)], unique=True)
+
+
+def day_key(moment):
+    return moment.strftime('%Y-%m-%d')
+
+
+def _increment(user_id, moment, counters):
+    get_daily_stats_collection().update_one(
+        {'user_id': user_id, 'date': day_key(moment)},
+        {'$inc': counters, '$set': {'updated_at': datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def record_answer_activity(user_id, answered_at, is_correct, time_taken):
+    """Count one answered question on the user's day"""
+    _increment(user_id, answered_at, {
+        'questions_answered': 1,
+        'correct_answers': 1 if is_correct else 0,
+        'time_spent': time_taken if isinstance(time_taken, (int, float)) else 0
+    })
+
+
+def record_answers_activity(user_id, answered_at, results):
+    """Count a batch of answered questions (quiz_results documents) on the user's day in one update"""
+    _increment(user_id, answered_at, {
+        'questions_answered': len(results),
+        'correct_answers': sum(1 for result in results if result['is_correct']),
+        'time_spent': sum(
+            result['time_taken'] for result in results if isinstance(result['time_taken'], (int, float))
+        )
+    })
+
+
+def record_quiz_completion(user_id, completed_at, final_score):
+    """Count one completed quiz and its score on the user's day"""
+    _increment(user_id, completed_at, {
+        'quizzes_completed': 1,
+        'score_total': final_score or 0
+    })
+
+
+def get_daily_stats(user_id, start_date, end_date=None):
+    """The user's rollup documents from start_date to end_date (inclusive), keyed by date"""
+    date_range = {'$gte': day_key(start_date)}
+    if end_date is not None:
+        date_range['$lte'] = day_key(end_date)
+    cursor = get_daily_stats_collection().find(
+        {'user_id': user_id, 'date': date_range},
+        {'_id': 0, 'user_id': 0}
+    ).sort('date', ASCENDING)
+    return {doc['date']: doc for doc in cursor}
+
+
+def get_user_totals(user_id):
+    """Every counter summed over all of the user's days"""
+    totals = next(get_daily_stats_collection().aggregate([
+        {'$match': {'user_id': user_id}},
+        {'$group': {
+            '_id': None,
+            'active_days': {'$sum': 1},
+            **{counter: {'$sum': f'${counter}'} for counter in DAILY_COUNTERS}
+        }}
+    ]), None) or {}
+    return {counter: totals.get(counter, 0) for counter in ('active_days',) + DAILY_COUNTERS}
+
+
+def rebuild_daily_stats(user_id=None):
+    """
+    Recompute the rollups from quiz_results and quiz_sessions, for one user
+    or everyone. Answers made while it runs may be counted twice or lost, so
+    run it while the app is quiet. Returns the number of rollup documents.
+    """
+    from database import db
+
+    user_match = {'user_id': user_id} if user_id is not None else {'user_id': {'$exists': True}}
+    rollups = get_daily_stats_collection()
+    rollups.delete_many(user_match)
+
+    def merge_into_rollups(date_field, counters):
+        return [
+            {'$group': {
+                '_id': {
+                    'user_id': '$user_id',
+                    'date': {'$dateToString': {'format': '%Y-%m-%d', 'date': f'${date_field}'}}
+                },
+                **counters
+            }},
+            {'$project': {
+                '_id': 0,
+                'user_id': '$_id.user_id',
+                'date': '$_id.date',
+                'updated_at': '$$NOW',
+                **{counter: 1 for counter in counters}
+            }},
+            # Answers and completions fill different counters of the same day
+            {'$merge': {
+                'into': rollups.name,
+                'on': ['user_id', 'date'],
+                'whenMatched': 'merge',
+                'whenNotMatched': 'insert'
+            }}
+        ]
+
+    db["quiz_results"].aggregate(
+        [{'$match': {**user_match, 'answered_at': {'$type': 'date'}}}] + merge_into_rollups('answered_at', {
+            'questions_answered': {'$sum': 1},
+            'correct_answers': {'$sum': {'$cond': [{'$eq': ['$is_correct', True]}, 1, 0]}},
+            'time_spent': {'$sum': '$time_taken'}
+        })
+    )
+    db["quiz_sessions"].aggregate(
+        [{'$match': {**user_match, 'is_completed': True, 'completed_at': {'$type': 'date'}}}] + merge_into_rollups('completed_at', {
+            'quizzes_completed': {'$sum': 1},
+            'score_total': {'$sum': '$final_score'}
+        })
+    )
+    return rollups.count_documents(user_match)
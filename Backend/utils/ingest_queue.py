@@ -0,0 +1,398 @@
+# Backend/utils/ingest_queue.py
+
+import atexit
+import multiprocessing
+import os
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, ReturnDocument
+
+# Worker processes scripts/ingest_worker.py runs; the web server never starts
+# any, so its processes don't each load their own summarization model
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+INGEST_RETRY_BASE_SECONDS = int(os.getenv("INGEST_RETRY_BASE_SECONDS", "30"))
+# A running job whose lease expires (worker crashed or was killed) is picked up
+# again, until it has used up its attempts
+INGEST_LEASE_SECONDS = int(os.getenv("INGEST_LEASE_SECONDS", "1800"))
+# How often a busy worker renews its lease, so long documents are not handed
+# to a second worker while the first is still on them
+INGEST_HEARTBEAT_SECONDS = float(os.getenv("INGEST_HEARTBEAT_SECONDS", str(max(INGEST_LEASE_SECONDS // 6, 1))))
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "2"))
+
+# Stages in run order; each one is timed on the job document
+INGEST_STAGES = ('extract', 'summary', 'structured')
+
+
+def get_jobs_collection():
+    from database import db
+    return db["ingest_jobs"]
+
+
+def ensure_job_indexes():
+    jobs = get_jobs_collection()
+    jobs.create_index([("status", ASCENDING), ("run_after", ASCENDING)])
+    jobs.create_index([("file_id", ASCENDING)])
+
+
+def enqueue_ingest_job(file_id, filepath, category, options=None):
+    """Queue text extraction and summarization for an uploaded file"""
+    now = datetime.utcnow()
+    job = {
+        'file_id': file_id,
+        'filepath': filepath,
+        'category': category,
+        'options': options or {},
+        'status': 'queued',
+        'stage': None,
+        'stages': {},
+        'attempts': 0,
+        'max_attempts': INGEST_MAX_ATTEMPTS,
+        'error': None,
+        'run_after': now,
+        'lease_until': None,
+        'worker': None,
+        'created_at': now,
+        'updated_at': now
+    }
+    job['_id'] = get_jobs_collection().insert_one(job).inserted_id
+    return job
+
+
+def get_job_for_file(file_id):
+    """Most recent ingest job for a file, or None"""
+    return get_jobs_collection().find_one({'file_id': file_id}, sort=[('created_at', -1)])
+
+
+def cancel_ingest_jobs(file_id):
+    """Stop queued jobs of a deleted file from running; returns how many were cancelled"""
+    now = datetime.utcnow()
+    return get_jobs_collection().update_many(
+        {'file_id': file_id, 'status': 'queued'},
+        {'$set': {'status': 'cancelled', 'finished_at': now, 'updated_at': now}}
+    ).modified_count
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and the job was claimed again or given up"""
+
+
+def fail_abandoned_jobs():
+    """
+    Give up on running jobs whose worker died on their last attempt; a
+    crashed worker never gets to call fail_job itself
+    """
+    now = datetime.utcnow()
+    abandoned = get_jobs_collection().find({
+        'status': 'running',
+        'lease_until': {'$lt': now},
+        '$expr': {'$gte': ['$attempts', '$max_attempts']}
+    }, {'file_id': 1, 'attempts': 1, 'max_attempts': 1})
+    for job in abandoned:
+        fail_job(job, 'Worker stopped before finishing (lease expired)')
+
+
+def claim_next_job(worker_id):
+    """
+    Atomically take the oldest runnable job: queued and due, or running with
+    an expired lease and attempts left
+    """
+    fail_abandoned_jobs()
+    now = datetime.utcnow()
+    return get_jobs_collection().find_one_and_update(
+        {'$or': [
+            {'status': 'queued', 'run_after': {'$lte': now}},
+            {
+                'status': 'running',
+                'lease_until': {'$lt': now},
+                '$expr': {'$lt': ['$attempts', '$max_attempts']}
+            }
+        ]},
+        {
+            '$set': {
+                'status': 'running',
+                'worker': worker_id,
+                'lease_until': now + timedelta(seconds=INGEST_LEASE_SECONDS),
+                'updated_at': now
+            },
+            '$inc': {'attempts': 1}
+        },
+        sort=[('run_after', ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def renew_lease(job):
+    """
+    Extend a running job's lease. Keyed on this worker and attempt, so it
+    fails (returns False) once the job has been claimed by someone else.
+    """
+    now = datetime.utcnow()
+    return get_jobs_collection().update_one(
+        {'_id': job['_id'], 'status': 'running', 'worker': job['worker'], 'attempts': job['attempts']},
+        {'$set': {'lease_until': now + timedelta(seconds=INGEST_LEASE_SECONDS), 'updated_at': now}}
+    ).matched_count == 1
+
+
+def _extract_text(job, on_text=None):
+    """
+    Returns (text, pages); pages maps PDF pages to character spans of the text.
+    on_text is called with each piece of text (a PDF page) as it is read.
+    """
+    from utils.pdf_reader import extract_pdf_pages
+
+    if job['category'] == 'pdfs':
+        return extract_pdf_pages(job['filepath'], on_page=on_text)
+    # For text files, read directly
+    with open(job['filepath'], 'r', encoding='utf-8', errors='ignore') as f:
+        text = f.read()
+    if on_text is not None:
+        on_text(text)
+    return text, None
+
+
+def process_job(job):
+    """Run every stage of one job, recording progress on the job and file docs"""
+    from database import db
+    from summarizer import (
+        IncrementalChunker,
+        SummaryPlan,
+        generate_budgeted_summary,
+        generate_long_structured_summary,
+        get_route,
+        get_summary_model,
+        text_content_hash
+    )
+    from utils.blob_store import find_processed_artefacts
+    from utils.text_store import BLOB_FIELDS, release_blobs, update_file_fields
+
+    jobs = get_jobs_collection()
+    files = db["files"]
+
+    lease = {'renewed': time.monotonic(), 'lost': False}
+
+    def heartbeat(force=False):
+        """Renew the lease between stages and from inside long loops"""
+        if lease['lost'] or (not force and time.monotonic() - lease['renewed'] < INGEST_HEARTBEAT_SECONDS):
+            return
+        try:
+            lease['lost'] = not renew_lease(job)
+            lease['renewed'] = time.monotonic()
+        except Exception as e:
+            print(f"⚠️ Could not renew lease of ingest job {job['_id']}: {e}")
+        if lease['lost']:
+            print(f"⚠️ Ingest job {job['_id']} lost its lease; its results will be dropped")
+
+    def check_lease():
+        heartbeat(force=True)
+        if lease['lost']:
+            raise LeaseLost(f"Ingest job {job['_id']} was claimed by another worker")
+
+    def close_job(status, **fields):
+        now = datetime.utcnow()
+        jobs.update_one({'_id': job['_id']}, {'$set': {
+            'status': status, 'stage': None, 'lease_until': None, 'error': None,
+            'finished_at': now, 'updated_at': now, **fields
+        }})
+
+    file_doc = files.find_one({'_id': job['file_id']}, {'content_sha256': 1})
+    if file_doc is None:
+        close_job('cancelled')
+        print(f"🚫 File {job['file_id']} was deleted, dropping ingest job {job['_id']}")
+        return
+
+    # An identical upload may have finished processing since this job was queued
+    artefacts = find_processed_artefacts(file_doc['content_sha256'], exclude_id=job['file_id']) \
+        if file_doc.get('content_sha256') else None
+    if artefacts:
+        refs = [f'{field}_ref' for field in BLOB_FIELDS]
+        # Returns the document as it was, with any refs an earlier attempt stored
+        previous = files.find_one_and_update({'_id': job['file_id']}, {
+            '$set': {**artefacts, 'status': 'processed', 'updatedAt': datetime.utcnow()},
+            '$unset': {'processing_stage': '', 'processing_error': '',
+                       **{ref: '' for ref in refs if ref not in artefacts}}
+        }, projection={ref: 1 for ref in refs})
+        if previous is None:
+            release_blobs(artefacts.get(ref) for ref in refs)
+            close_job('cancelled')
+            print(f"🚫 File {job['file_id']} was deleted, dropping ingest job {job['_id']}")
+            return
+        release_blobs(previous.get(ref) for ref in refs)
+        close_job('done', reused_from=artefacts['reused_from'])
+        print(f"♻️ File {job['file_id']} reuses the results of identical file {artefacts['reused_from']}")
+        return
+
+    def start_stage(stage):
+        check_lease()
+        now = datetime.utcnow()
+        jobs.update_one({'_id': job['_id']}, {'$set': {
+            'stage': stage,
+            f'stages.{stage}': {'started_at': now, 'seconds': None},
+            'updated_at': now
+        }})
+        files.update_one({'_id': job['file_id']}, {'$set': {
+            'status': 'processing', 'processing_stage': stage, 'updatedAt': now
+        }})
+        return time.time()
+
+    def finish_stage(stage, started, file_fields):
+        # A stage that outlived its lease leaves the file to the new owner
+        check_lease()
+        now = datetime.utcnow()
+        jobs.update_one({'_id': job['_id']}, {'$set': {
+            f'stages.{stage}.seconds': round(time.time() - started, 2),
+            'updated_at': now
+        }})
+        # Text and long summaries go to the text store, not the files document
+        update_file_fields(job['file_id'], {**file_fields, 'updatedAt': now})
+
+    # Chunk for the summary stage while the pages are still being extracted
+    summary_manager = get_route('detailed').manager
+    chunker = IncrementalChunker(manager=summary_manager)
+
+    def on_text(piece):
+        chunker.feed(piece)
+        heartbeat()
+
+    started = start_stage('extract')
+    extracted_text, pages = _extract_text(job, on_text)
+    chunks = chunker.finish()
+    finish_stage('extract', started, {
+        'text': extracted_text,
+        'content': extracted_text,
+        'text_length': len(extracted_text),
+        'page_count': len(pages) if pages is not None else None,
+        'page_offsets': pages
+    })
+
+    # Both summaries share one plan (and latency budget, if the upload sent one)
+    plan = SummaryPlan.with_budget(job['options'].get('budget_seconds'))
+    plan.heartbeat = heartbeat
+    plan.use_chunks(extracted_text, chunks, manager=summary_manager)
+
+    started = start_stage('summary')
+    summary, summary_path = generate_budgeted_summary(extracted_text, "detailed", plan=plan)
+    finish_stage('summary', started, {
+        'summary': summary,
+        'summary_length': len(summary) if summary else 0,
+        'compression_ratio': round(len(summary) / len(extracted_text) * 100, 2) if extracted_text and len(extracted_text) > 0 else 0,
+        'summary_type': 'detailed',
+        'summary_model': get_summary_model('detailed'),
+        'summary_path': summary_path,
+        'text_hash': text_content_hash(extracted_text),
+        'summary_chunks': {
+            'reused': plan.stats['chunks_reused'],
+            'recomputed': plan.stats['chunks_recomputed']
+        },
+        'last_summarized': datetime.utcnow()
+    })
+
+    started = start_stage('structured')
+    structured_summary = generate_long_structured_summary(extracted_text, "detailed", plan=plan)
+    finish_stage('structured', started, {
+        'structured_summary': structured_summary,
+        'has_structured_summary': True
+    })
+
+    check_lease()
+    close_job('done')
+    files.update_one({'_id': job['file_id']}, {
+        '$set': {'status': 'processed', 'updatedAt': datetime.utcnow()},
+        '$unset': {'processing_stage': '', 'processing_error': ''}
+    })
+    print(f"📝 Processed file {job['file_id']}: {len(extracted_text)} chars, summary: {len(summary)} chars")
+
+
+def fail_job(job, error):
+    """
+    Requeue with exponential backoff, or give up after max_attempts. Only
+    applies while the job is still on this attempt.
+    """
+    from database import db
+
+    now = datetime.utcnow()
+    this_attempt = {'_id': job['_id'], 'status': 'running', 'attempts': job['attempts']}
+    if job['attempts'] < job.get('max_attempts', INGEST_MAX_ATTEMPTS):
+        delay = INGEST_RETRY_BASE_SECONDS * 2 ** (job['attempts'] - 1)
+        requeued = get_jobs_collection().update_one(this_attempt, {'$set': {
+            'status': 'queued', 'error': error, 'lease_until': None,
+            'run_after': now + timedelta(seconds=delay), 'updated_at': now
+        }}).modified_count
+        if not requeued:
+            return
+        db["files"].update_one({'_id': job['file_id']}, {'$set': {
+            'status': 'queued', 'processing_error': error, 'updatedAt': now
+        }})
+        print(f"🔁 Ingest job {job['_id']} failed (attempt {job['attempts']}), retrying in {delay}s: {error}")
+        return
+
+    failed = get_jobs_collection().update_one(this_attempt, {'$set': {
+        'status': 'failed', 'error': error, 'lease_until': None, 'finished_at': now, 'updated_at': now
+    }}).modified_count
+    if not failed:
+        return
+    db["files"].update_one({'_id': job['file_id']}, {'$set': {
+        'status': 'failed', 'processing_error': error, 'updatedAt': now
+    }})
+    print(f"❌ Ingest job {job['_id']} failed after {job['attempts']} attempts: {error}")
+
+
+def run_worker(poll_seconds=None):
+    """Claim and process jobs until the process is stopped"""
+    poll_seconds = INGEST_POLL_SECONDS if poll_seconds is None else poll_seconds
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    ensure_job_indexes()
+    print(f"👷 Ingest worker {worker_id} started")
+
+    while True:
+        try:
+            job = claim_next_job(worker_id)
+        except Exception as e:
+            print(f"⚠️ Ingest queue unavailable: {e}")
+            time.sleep(poll_seconds * 5)
+            continue
+
+        if job is None:
+            time.sleep(poll_seconds)
+            continue
+
+        print(f"⚙️ Ingest job {job['_id']} (attempt {job['attempts']}) for file {job['file_id']}")
+        try:
+            process_job(job)
+        except LeaseLost as e:
+            # Another worker owns the job now; its attempt records the outcome
+            print(f"⚠️ {e}")
+        except Exception as e:
+            traceback.print_exc()
+            try:
+                fail_job(job, str(e))
+            except Exception as record_error:
+                # The lease expiry will hand the job to another worker
+                print(f"⚠️ Could not record ingest failure: {record_error}")
+
+
+def start_ingest_workers(count=None):
+    """Start worker processes (scripts/ingest_worker.py)"""
+    count = INGEST_WORKERS if count is None else count
+    # spawn: the workers open their own Mongo connections and load models themselves
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    for i in range(count):
+        # Not daemonic, so a worker can still start the summarizer's map pool;
+        # stopped explicitly when the parent exits instead
+        process = context.Process(target=run_worker, name=f"ingest-worker-{i}")
+        process.start()
+        workers.append(process)
+    if workers:
+        atexit.register(_stop_workers, workers)
+        print(f"👷 Started {len(workers)} ingest worker processes")
+    return workers
+
+
+def _stop_workers(workers):
+    for process in workers:
+        if process.is_alive():
+            process.terminate()
@@ -0,0 +1,152 @@
+# Backend/utils/lecture_catalog.py
+
+from pymongo import ASCENDING, DESCENDING
+
+# A stored question only counts towards a lecture when it is complete
+VALID_QUESTION_QUERY = {
+    'question': {'$exists': True, '$nin': [None, '']},
+    'options': {'$exists': True, '$ne': None, '$not': {'$size': 0}},
+    'answer': {'$exists': True, '$nin': [None, '']}
+}
+
+
+def get_lectures_collection():
+    from database import db
+    return db["lectures"]
+
+
+def ensure_lecture_indexes():
+    from database import db
+    lectures = get_lectures_collection()
+    lectures.create_index([("created_at", DESCENDING), ("_id", DESCENDING)])
+    lectures.create_index([("difficulty", ASCENDING), ("created_at", DESCENDING)])
+    lectures.create_index([("topic_tags", ASCENDING), ("created_at", DESCENDING)])
+    # Embedded questions of a page of lectures are fetched by quiz_id
+    db["quizzes"].create_index([("quiz_id", ASCENDING), ("question_number", ASCENDING)])
+
+
+def build_search_text(lecture_title, questions):
+    """The title and every question text, which /lectures?search= matches against"""
+    return " ".join([lecture_title] + list(questions))
+
+
+def record_lecture_created(quiz_docs):
+    """Add the lecture of a freshly generated quiz (its question documents) to the catalogue"""
+    if not quiz_docs:
+        return
+    first = quiz_docs[0]
+    get_lectures_collection().update_one(
+        {'_id': first['quiz_id']},
+        {
+            '$set': {
+                'lecture_title': first['lecture_title'],
+                'difficulty': first['difficulty'],
+                'topic_tags': first['topic_tags'],
+                'created_at': first['created_at'],
+                'created_by': first['created_by'],
+                'source_summary': first['source_summary'],
+                'search_text': build_search_text(first['lecture_title'], [doc['question'] for doc in quiz_docs])
+            },
+            '$inc': {'question_count': len(quiz_docs)}
+        },
+        upsert=True
+    )
+
+
+def record_lecture_answer(quiz_id, session):
+    """
+    Fold a just-updated quiz session into the lecture's last activity and,
+    when the answer completed the quiz, into its attempt statistics. Progress
+    is per user and read from quiz_sessions, so it is not kept here.
+    """
+    update = {'$max': {'last_attempt': session.get('completed_at') or session['last_updated']}}
+
+    if session.get('is_completed'):
+        final_score = session['final_score']
+        update['$inc'] = {
+            'attempts': 1,
+            'score_total': final_score,
+            'scored_attempts': 1,
+            'total_time': session.get('total_time', 0)
+        }
+        update['$max']['best_score'] = final_score
+
+    # Lectures generated before the catalogue existed are added by
+    # scripts/rebuild_lectures.py, from their question documents
+    if get_lectures_collection().update_one({'_id': quiz_id}, update).matched_count == 0:
+        print(f"⚠️ Lecture {quiz_id} is not in the catalogue; run scripts/rebuild_lectures.py")
+
+
+def rebuild_lecture_catalog():
+    """
+    Regenerate the whole catalogue from quizzes and quiz_sessions in one
+    aggregation; $out swaps the result in and keeps the collection's indexes.
+    Returns the number of lectures.
+    """
+    from database import db
+
+    completed_score = {'$cond': [{'$eq': ['$is_completed', True]}, '$final_score', None]}
+    pipeline = [
+        {'$match': VALID_QUESTION_QUERY},
+        {'$sort': {'created_at': -1, 'question_number': 1}},
+        {'$group': {
+            '_id': {'$ifNull': ['$quiz_id', {'$toString': '$_id'}]},
+            'lecture_title': {'$first': {'$ifNull': ['$lecture_title', 'Untitled Quiz']}},
+            'difficulty': {'$first': {'$ifNull': ['$difficulty', 'Medium']}},
+            'topic_tags': {'$first': {'$ifNull': ['$topic_tags', []]}},
+            'created_at': {'$first': '$created_at'},
+            'created_by': {'$first': {'$ifNull': ['$created_by', 'anonymous']}},
+            'source_summary': {'$first': {'$ifNull': ['$source_summary', '']}},
+            'question_count': {'$sum': 1},
+            'questions': {'$push': '$question'}
+        }},
+        {'$lookup': {
+            'from': 'quiz_sessions',
+            'let': {'quiz_id': '$_id'},
+            'pipeline': [
+                {'$match': {'$expr': {'$eq': ['$quiz_id', '$$quiz_id']}}},
+                {'$project': {
+                    'is_completed': 1,
+                    'final_score': 1,
+                    'total_time': 1,
+                    'last_touched': {'$ifNull': ['$completed_at', '$last_updated']}
+                }},
+                {'$group': {
+                    '_id': None,
+                    'attempts': {'$sum': {'$cond': [{'$eq': ['$is_completed', True]}, 1, 0]}},
+                    'best_score': {'$max': completed_score},
+                    'score_total': {'$sum': completed_score},
+                    'scored_attempts': {'$sum': {'$cond': [{'$ne': [{'$ifNull': [completed_score, None]}, None]}, 1, 0]}},
+                    'total_time': {'$sum': {'$cond': [
+                        {'$eq': ['$is_completed', True]}, {'$ifNull': ['$total_time', 0]}, 0
+                    ]}},
+                    'last_attempt': {'$max': '$last_touched'}
+                }}
+            ],
+            'as': 'sessions'
+        }},
+        {'$addFields': {'sessions': {'$ifNull': [{'$arrayElemAt': ['$sessions', 0]}, {}]}}},
+        {'$project': {
+            'lecture_title': 1,
+            'difficulty': 1,
+            'topic_tags': 1,
+            'created_at': 1,
+            'created_by': 1,
+            'source_summary': 1,
+            'question_count': 1,
+            'search_text': {'$reduce': {
+                'input': '$questions',
+                'initialValue': '$lecture_title',
+                'in': {'$concat': ['$$value', ' ', '$$this']}
+            }},
+            'attempts': {'$ifNull': ['$sessions.attempts', 0]},
+            'best_score': '$sessions.best_score',
+            'score_total': {'$ifNull': ['$sessions.score_total', 0]},
+            'scored_attempts': {'$ifNull': ['$sessions.scored_attempts', 0]},
+            'total_time': {'$ifNull': ['$sessions.total_time', 0]},
+            'last_attempt': '$sessions.last_attempt'
+        }},
+        {'$out': 'lectures'}
+    ]
+    db["quizzes"].aggregate(pipeline)
+    return get_lectures_collection().count_documents({})
@@ -0,0 +1,225 @@
+# Backend/utils/model_manager.py
+
+import os
+import threading
+import time
+
+# lazy: load on first summarization call
+# eager: start loading in a background thread at boot
+# disabled: never load; callers fall back to extractive summaries
+SUMMARIZER_LOAD_MODES = ('lazy', 'eager', 'disabled')
+
+# fp32: stock PyTorch weights (reference quality)
+# int8: dynamic int8 quantization of the Linear layers
+# bf16: bfloat16 weights, only where the CPU has native bf16 support
+# onnx: exported ONNX Runtime graph (needs optimum[onnxruntime])
+SUMMARIZER_BACKENDS = ('fp32', 'int8', 'bf16', 'onnx')
+
+# Where exported ONNX graphs are kept so the export only happens once
+SUMMARIZER_ONNX_DIR = os.getenv("SUMMARIZER_ONNX_DIR", os.path.join("models", "onnx"))
+
+# After a failed load, wait this long before trying again
+SUMMARIZER_RETRY_SECONDS = int(os.getenv("SUMMARIZER_RETRY_SECONDS", "60"))
+
+
+def cpu_supports_bf16():
+    """True when the CPU advertises native bfloat16 instructions (AVX512-BF16 / AMX)"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+        return "avx512_bf16" in flags or "amx_bf16" in flags
+    except OSError:
+        return False
+
+
+class ModelManager:
+    """
+    Owns the lifecycle of the summarization pipeline so importing the
+    summarizer never loads the model by itself.
+    """
+
+    def __init__(self, model_id, mode="lazy", backend="fp32"):
+        if mode not in SUMMARIZER_LOAD_MODES:
+            print(f"⚠️ Unknown summarizer load mode '{mode}', using 'lazy'")
+            mode = "lazy"
+        if backend not in SUMMARIZER_BACKENDS:
+            print(f"⚠️ Unknown summarizer backend '{backend}', using 'fp32'")
+            backend = "fp32"
+        if backend == "bf16" and not cpu_supports_bf16():
+            print("⚠️ CPU has no native bf16 support, using 'fp32'")
+            backend = "fp32"
+
+        self.model_id = model_id
+        self.mode = mode
+        self.backend = backend
+        self.state = "disabled" if mode == "disabled" else "not_loaded"
+        self.error = None
+        self.load_started_at = None
+        self.load_finished_at = None
+        self.load_seconds = None
+        self._pipeline = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+        self._tokenizer_lock = threading.Lock()
+        self._warmup_thread = None
+
+    def get_pipeline(self):
+        """Return the loaded pipeline, loading it first if needed"""
+        if self._pipeline is not None:
+            return self._pipeline
+
+        if self.mode == "disabled":
+            raise RuntimeError("Summarization model is disabled (SUMMARIZER_LOAD_MODE=disabled)")
+
+        return self._load()
+
+    def get_tokenizer(self):
+        """
+        Fast tokenizer for the model. Loaded on its own so chunking doesn't
+        wait for the full model; returns None when the model is disabled.
+        """
+        if self._pipeline is not None:
+            return self._pipeline.tokenizer
+        if self.mode == "disabled":
+            return None
+
+        with self._tokenizer_lock:
+            if self._tokenizer is None:
+                from transformers import AutoTokenizer
+
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_id, use_fast=True)
+        return self._tokenizer
+
+    def generate_from_ids(self, batch_ids, **generate_kwargs):
+        """
+        Generate summaries straight from token ids (special tokens included),
+        so text that was already tokenized for chunking isn't tokenized again.
+        """
+        pipe = self.get_pipeline()
+        import torch
+
+        tokenizer = pipe.tokenizer
+        inputs = tokenizer.pad({"input_ids": batch_ids}, padding=True, return_tensors="pt")
+        inputs = {name: tensor.to(pipe.model.device) for name, tensor in inputs.items()}
+
+        with torch.no_grad():
+            output_ids = pipe.model.generate(**inputs, **generate_kwargs)
+
+        return tokenizer.batch_decode(
+            output_ids, skip_special_tokens=True, clean_up_tokenization_spaces=True
+        )
+
+    def _load(self):
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            if self._pipeline is not None:
+                return self._pipeline
+
+            if (self.state == "failed" and self.load_finished_at and
+                    time.time() - self.load_finished_at < SUMMARIZER_RETRY_SECONDS):
+                raise RuntimeError(f"Summarization model failed to load: {self.error}")
+
+            self.state = "loading"
+            self.error = None
+            self.load_started_at = time.time()
+            print(f"⏳ Loading summarization model {self.model_id} ({self.backend})...")
+
+            try:
+                self._pipeline = self._build_pipeline()
+                self.state = "ready"
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                print(f"❌ Failed to load summarization model: {e}")
+                raise
+            finally:
+                self.load_finished_at = time.time()
+                self.load_seconds = round(self.load_finished_at - self.load_started_at, 2)
+
+            print(f"✅ Summarization model ready in {self.load_seconds}s")
+            return self._pipeline
+
+    def _build_pipeline(self):
+        from transformers import pipeline
+
+        if self.backend == "onnx":
+            return self._build_onnx_pipeline()
+
+        pipe = pipeline(
+            "summarization",
+            model=self.model_id,
+            tokenizer=self.model_id,
+            framework="pt"
+        )
+
+        if self.backend == "int8":
+            import torch
+
+            pipe.model = torch.quantization.quantize_dynamic(
+                pipe.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        elif self.backend == "bf16":
+            import torch
+
+            pipe.model = pipe.model.to(torch.bfloat16)
+
+        return pipe
+
+    def _build_onnx_pipeline(self):
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        from transformers import AutoTokenizer, pipeline
+
+        export_dir = os.path.join(SUMMARIZER_ONNX_DIR, self.model_id.replace("/", "__"))
+        if os.path.isdir(export_dir):
+            model = ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+        else:
+            print(f"📦 Exporting {self.model_id} to ONNX (one-time)...")
+            model = ORTModelForSeq2SeqLM.from_pretrained(self.model_id, export=True)
+            model.save_pretrained(export_dir)
+
+        tokenizer = AutoTokenizer.from_pretrained(self.model_id, use_fast=True)
+        return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+    def start_background_warmup(self):
+        """In eager mode, load the model in a daemon thread without blocking boot"""
+        if self.mode != "eager" or self._pipeline is not None:
+            return False
+        if self._warmup_thread is not None and self._warmup_thread.is_alive():
+            return False
+
+        self._warmup_thread = threading.Thread(
+            target=self._warmup, name="summarizer-warmup", daemon=True
+        )
+        self._warmup_thread.start()
+        return True
+
+    def _warmup(self):
+        try:
+            self._load()
+        except Exception:
+            pass  # Already recorded in self.error
+
+    def is_ready(self):
+        """
+        Whether this worker can serve summaries without a cold start surprise:
+        eager mode waits for the load, lazy mode is ready unless loading failed,
+        disabled mode always serves extractive summaries.
+        """
+        if self.mode == "disabled":
+            return True
+        if self.mode == "eager":
+            return self.state == "ready"
+        return self.state != "failed"
+
+    def status(self):
+        return {
+            "model_id": self.model_id,
+            "mode": self.mode,
+            "backend": self.backend,
+            "state": self.state,
+            "ready": self.is_ready(),
+            "loaded": self._pipeline is not None,
+            "load_seconds": self.load_seconds,
+            "load_started_at": self.load_started_at,
+            "error": self.error
+        }
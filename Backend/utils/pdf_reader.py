@@ -1,13 +1,92 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import fitz  # PyMuPDF
 
-def extract_text_from_pdf(filepath):
-    """Extract text content from a PDF file."""
-    text = ""
+# Processes used to extract large PDFs; 0 or 1 extracts in-process
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0"))
+# Smaller PDFs are not worth starting a pool for
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "100"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "50"))
+
+
+def _extract_page_range(filepath, start, stop):
+    """Runs in a pool worker: text of pages [start, stop)"""
+    doc = fitz.open(filepath)
     try:
-        doc = fitz.open(filepath)
-        for page in doc:
-            text += page.get_text()
+        return [doc[number].get_text() for number in range(start, stop)]
+    finally:
         doc.close()
+
+
+def iter_pdf_pages(filepath, workers=None):
+    """
+    Yield (page_number, text) for every page in order, starting as soon as
+    the first page is read. With workers > 1, large PDFs are split into page
+    ranges extracted by a process pool; pages are still yielded in order.
+    """
+    workers = PDF_EXTRACT_WORKERS if workers is None else workers
+    doc = fitz.open(filepath)
+    page_count = doc.page_count
+
+    if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+        try:
+            for number, page in enumerate(doc):
+                yield number, page.get_text()
+        finally:
+            doc.close()
+        return
+
+    doc.close()
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count))
+              for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)),
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        results = executor.map(_extract_page_range,
+                               [filepath] * len(ranges),
+                               [start for start, _ in ranges],
+                               [stop for _, stop in ranges])
+        for (start, _), texts in zip(ranges, results):
+            for offset, text in enumerate(texts):
+                yield start + offset, text
+
+
+def extract_pdf_pages(filepath, workers=None, on_page=None):
+    """
+    Extract text content from a PDF file along with where each page lands in
+    it. Returns (text, pages) where pages[i] is {'page', 'start', 'end'}: the
+    character span of page i (1-based 'page') in the returned text.
+    on_page, if given, is called with each page's text as soon as it is read.
+    """
+    parts = []
+    spans = []
+    length = 0
+    try:
+        for number, page_text in iter_pdf_pages(filepath, workers):
+            parts.append(page_text)
+            spans.append((number + 1, length, length + len(page_text)))
+            length += len(page_text)
+            if on_page is not None:
+                on_page(page_text)
     except Exception as e:
         print(f"Error reading PDF: {e}")
-    return text.strip()
+
+    text = "".join(parts)
+    stripped = text.strip()
+    # Shift the spans by the leading whitespace that strip() removed
+    lead = len(text) - len(text.lstrip())
+    pages = [
+        {
+            'page': number,
+            'start': min(max(start - lead, 0), len(stripped)),
+            'end': min(max(end - lead, 0), len(stripped))
+        }
+        for number, start, end in spans
+    ]
+    return stripped, pages
+
+
+def extract_text_from_pdf(filepath, workers=None):
+    """Extract text content from a PDF file."""
+    return extract_pdf_pages(filepath, workers)[0]
@@ -1,7 +1,8 @@
 # Backend/utils/progress_calculator.py 
 
 from datetime import datetime, timezone, timedelta
-from database import quiz_collection, flashcard_collection, feedback_collection
+from database import quiz_collection, flashcard_collection
+from utils.daily_stats import get_daily_stats, get_user_totals
 
 def calculate_quiz_statistics():
     """
@@ -81,47 +82,61 @@ def calculate_flashcard_statistics():
         "average_per_lecture": total_flashcards / max(len(lecture_breakdown), 1)
     }
 
-def calculate_user_progress(user_id=None):
+def calculate_user_progress(user_id=None, days=30):
     """
     Calculate user-specific progress metrics
     
     Args:
         user_id (str): User identifier (optional)
+        days (int): Length of the performance window in days
         
     Returns:
         dict: User progress data
     """
-    # For now, return mock data since we don't have user-specific tracking yet
-    # In a real implementation, you would filter by user_id
-    
     quiz_stats = calculate_quiz_statistics()
     flashcard_stats = calculate_flashcard_statistics()
     
-    # Mock performance data - in real app, this would come from user quiz attempts
-    mock_performance = [
-        {"date": "2024-08-05", "score": 0.7, "questions_answered": 15},
-        {"date": "2024-08-06", "score": 0.8, "questions_answered": 20},
-        {"date": "2024-08-07", "score": 0.75, "questions_answered": 10},
-        {"date": "2024-08-08", "score": 0.85, "questions_answered": 25},
-        {"date": "2024-08-09", "score": 0.9, "questions_answered": 18},
-        {"date": "2024-08-10", "score": 0.72, "questions_answered": 22},
-        {"date": "2024-08-11", "score": 0.88, "questions_answered": 16}
-    ]
+    # One rollup document per day the user answered something
+    since = datetime.now(timezone.utc) - timedelta(days=days - 1)
+    daily_stats = get_daily_stats(user_id or "anonymous", since)
+    totals = get_user_totals(user_id or "anonymous")
+    
+    performance = []
+    for date, day in daily_stats.items():
+        answered = day.get("questions_answered", 0)
+        if not answered:
+            continue
+        performance.append({
+            "date": date,
+            "score": round(day.get("correct_answers", 0) / answered, 3),
+            "questions_answered": answered
+        })
     
     # Calculate overall metrics
-    total_questions = sum(day["questions_answered"] for day in mock_performance)
-    average_score = sum(day["score"] for day in mock_performance) / len(mock_performance)
+    scores = [day["score"] for day in performance]
+    average_score = sum(scores) / len(scores) if scores else 0
+    
+    # Compare the latest three active days with the first three
+    trend = "stable"
+    if len(scores) >= 2:
+        window = min(3, len(scores) // 2)
+        early = sum(scores[:window]) / window
+        recent = sum(scores[-window:]) / window
+        if recent > early:
+            trend = "positive"
+        elif recent < early:
+            trend = "negative"
     
     return {
         "user_id": user_id or "default",
         "quiz_statistics": quiz_stats,
         "flashcard_statistics": flashcard_stats,
-        "performance_data": mock_performance,
+        "performance_data": performance,
         "overall_metrics": {
-            "total_questions_answered": total_questions,
+            "total_questions_answered": totals["questions_answered"],
             "average_score": round(average_score, 3),
-            "total_study_sessions": len(mock_performance),
-            "improvement_trend": "positive"  # Could calculate actual trend
+            "total_study_sessions": len(performance),
+            "improvement_trend": trend
         }
     }
 
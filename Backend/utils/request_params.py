@@ -0,0 +1,25 @@
+# Backend/utils/request_params.py
+
+# Dashboard windows /progress?days= accepts
+PROGRESS_WINDOWS = (7, 30, 90, 365)
+PROGRESS_DEFAULT_DAYS = 30
+
+
+def parse_budget_seconds(value):
+    """Latency budget from a request's budget_ms field; None means the server default"""
+    try:
+        budget_ms = float(value)
+    except (TypeError, ValueError):
+        return None
+    return budget_ms / 1000 if budget_ms > 0 else None
+
+
+def parse_progress_days(value):
+    """The /progress window from ?days= (default 30); None when it isn't one of PROGRESS_WINDOWS"""
+    if value is None:
+        return PROGRESS_DEFAULT_DAYS
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return None
+    return days if days in PROGRESS_WINDOWS else None
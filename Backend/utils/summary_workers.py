@@ -0,0 +1,150 @@
+# Backend/utils/summary_workers.py
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+
+from utils.model_manager import ModelManager
+
+# Model replica owned by each worker process
+_worker_model = None
+
+
+def _init_worker(model_id, torch_threads, backend):
+    """Runs once in each worker process before it takes any work"""
+    global _worker_model
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except Exception:
+        pass
+    _worker_model = ModelManager(model_id, "lazy", backend)
+
+
+def _summarize_batch(batch, params, deadline=None):
+    """
+    Summarize one padded batch inside a worker. Each item is (input_ids, text);
+    token ids are used when every item has them. Generation stops at deadline
+    (a time.time() value), however long the batch waited in the queue.
+    Returns (summaries, cut_off); summaries are None if the deadline had
+    already passed when the batch started.
+    """
+    max_time = None
+    if deadline is not None:
+        max_time = deadline - time.time()
+        if max_time <= 0:
+            return [None] * len(batch), True
+        params = {**params, "max_time": max_time}
+
+    started = time.time()
+    if all(input_ids is not None for input_ids, _ in batch):
+        summaries = _worker_model.generate_from_ids([input_ids for input_ids, _ in batch], **params)
+    else:
+        results = _worker_model.get_pipeline()([text for _, text in batch], batch_size=len(batch), **params)
+        summaries = [(result[0] if isinstance(result, list) else result)["summary_text"] for result in results]
+    return summaries, max_time is not None and time.time() - started >= max_time
+
+
+def resolve_worker_count(max_workers, memory_mb=0, replica_memory_mb=1800):
+    """
+    Number of model replicas to run: capped by max_workers, CPU count and,
+    when memory_mb is set, by how many replicas fit in that budget
+    """
+    workers = min(max_workers, os.cpu_count() or 1)
+    if memory_mb:
+        workers = min(workers, memory_mb // max(1, replica_memory_mb))
+    return max(0, workers)
+
+
+class SummaryWorkerPool:
+    """
+    Process pool of summarization model replicas used for the map and reduce
+    passes over very long documents. Each replica loads its own model on
+    first use, so the pool costs nothing until a long document arrives.
+    """
+
+    def __init__(self, model_id, max_workers=0, memory_mb=0, replica_memory_mb=1800, backend="fp32"):
+        self.model_id = model_id
+        self.backend = backend
+        self.workers = resolve_worker_count(max_workers, memory_mb, replica_memory_mb)
+        # Split the CPU between replicas instead of letting each grab every core
+        self.torch_threads = max(1, (os.cpu_count() or 1) // max(1, self.workers))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        # A single replica is no faster than summarizing in-process
+        return self.workers > 1
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                print(f"🧵 Starting {self.workers} summarizer worker processes "
+                      f"({self.torch_threads} torch threads each)")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # fork would copy the parent's torch/thread state into workers
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_id, self.torch_threads, self.backend)
+                )
+            return self._executor
+
+    def iter_summaries(self, chunks, indices, params, batch_size, timeout=None):
+        """
+        Summarize chunks[i] for i in indices across the pool, yielding
+        (index, summary, cut_off) as batches complete. Every batch stops
+        generating timeout seconds from now; cut_off marks output generation
+        stopped early. A failed batch, or one that started too late, yields
+        None summaries so the caller can fall back for those chunks.
+        """
+        executor = self._get_executor()
+        # Wall clock, since the deadline is checked in other processes
+        deadline = None if timeout is None else time.time() + max(timeout, 0)
+
+        # Length-sorted batches keep padding low within each replica
+        order = sorted(indices, key=lambda i: chunks[i]["token_count"])
+        futures = {}
+        for start in range(0, len(order), batch_size):
+            batch_indices = order[start:start + batch_size]
+            batch = [(chunks[i]["input_ids"], chunks[i]["text"]) for i in batch_indices]
+            futures[executor.submit(_summarize_batch, batch, params, deadline)] = batch_indices
+
+        done = set()
+        try:
+            for future in as_completed(futures, timeout=None if timeout is None else max(timeout, 0)):
+                done.add(future)
+                batch_indices = futures[future]
+                try:
+                    summaries, cut_off = future.result()
+                except Exception as e:
+                    print(f"Worker batch error ({len(batch_indices)} chunks): {e}")
+                    summaries, cut_off = [None] * len(batch_indices), False
+                    if "BrokenProcessPool" in type(e).__name__:
+                        self.shutdown()
+                for i, summary in zip(batch_indices, summaries):
+                    yield i, summary, cut_off
+        except TimeoutError:
+            print(f"⏱️ {len(futures) - len(done)} worker batches missed the deadline")
+            for future, batch_indices in futures.items():
+                if future not in done:
+                    future.cancel()
+                    for i in batch_indices:
+                        yield i, None, True
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def status(self):
+        return {
+            "workers": self.workers,
+            "enabled": self.enabled,
+            "started": self._executor is not None,
+            "torch_threads_per_worker": self.torch_threads
+        }
@@ -0,0 +1,222 @@
+# Backend/utils/text_store.py
+
+import codecs
+import json
+import os
+import zlib
+
+import gridfs
+from pymongo import ASCENDING, ReturnDocument
+
+# Values longer than this (in characters) are moved off the files document
+# into GridFS, zlib-compressed, and replaced by a <field>_ref
+TEXT_STORE_INLINE_CHARS = int(os.getenv("TEXT_STORE_INLINE_CHARS", "4096"))
+TEXT_STORE_COMPRESSION_LEVEL = int(os.getenv("TEXT_STORE_COMPRESSION_LEVEL", "6"))
+TEXT_STORE_READ_SIZE = 64 * 1024
+
+# Kept on the files document for list views when the summary itself is stored out of line
+SUMMARY_PREVIEW_CHARS = 500
+
+# Fields that may be stored out of line -> whether the value is JSON rather than text
+BLOB_FIELDS = {
+    'text': False,
+    'summary': False,
+    'structured_summary': True,
+    'multi_level_summary': True
+}
+
+
+def get_text_fs():
+    from database import db
+    return gridfs.GridFS(db, collection="text_blobs")
+
+
+def get_blob_files():
+    """GridFS file documents of the text store; each carries a ref_count"""
+    from database import db
+    return db["text_blobs.files"]
+
+
+def ensure_text_store_indexes():
+    """Indexes files documents by the blobs they reference"""
+    from database import db
+    for field in BLOB_FIELDS:
+        db["files"].create_index([(f"{field}_ref.blob_id", ASCENDING)], sparse=True)
+
+
+def put_blob(value, kind):
+    data = value.encode('utf-8')
+    compressed = zlib.compress(data, TEXT_STORE_COMPRESSION_LEVEL)
+    blob_id = get_text_fs().put(compressed, kind=kind, encoding='zlib', length=len(value), ref_count=1)
+    return {'blob_id': blob_id, 'length': len(value), 'bytes': len(data), 'stored_bytes': len(compressed)}
+
+
+def pack_file_fields(fields):
+    """
+    Split files document fields into ($set, $unset) documents. Large values
+    are written to GridFS and replaced by <field>_ref; the extracted text is
+    kept once, under 'text' (the legacy 'content' copy is dropped).
+    """
+    fields = dict(fields)
+    unset = {}
+
+    if 'text' in fields or 'content' in fields:
+        content = fields.pop('content', None)
+        if fields.get('text') is None:
+            fields['text'] = content
+        unset['content'] = ''
+
+    for field, is_json in BLOB_FIELDS.items():
+        if field not in fields:
+            continue
+        value = fields[field]
+        serialized = json.dumps(value, default=str) if is_json and value is not None else value
+        if serialized is None or len(serialized) <= TEXT_STORE_INLINE_CHARS:
+            unset[f'{field}_ref'] = ''
+            if field == 'summary':
+                unset['summary_preview'] = ''
+            continue
+
+        fields[f'{field}_ref'] = put_blob(serialized, field)
+        del fields[field]
+        unset[field] = ''
+        if field == 'summary':
+            fields['summary_preview'] = value[:SUMMARY_PREVIEW_CHARS]
+
+    return fields, unset
+
+
+def update_file_fields(file_id, fields):
+    """
+    $set fields on a files document, moving large values to GridFS and
+    releasing the blobs they replace. Returns False if the file is gone.
+    """
+    from database import db
+
+    set_fields, unset_fields = pack_file_fields(fields)
+    replaced = [f'{field}_ref' for field in BLOB_FIELDS if field in fields]
+    if 'content' in fields and 'text_ref' not in replaced:
+        replaced.append('text_ref')
+
+    update = {'$set': set_fields}
+    if unset_fields:
+        update['$unset'] = unset_fields
+    # Returns the document as it was before the update, with its old refs
+    previous = db["files"].find_one_and_update(
+        {'_id': file_id},
+        update,
+        projection={ref: 1 for ref in replaced} or {'_id': 1}
+    )
+
+    if previous is None:
+        # The file was deleted meanwhile; nothing points at the new blobs
+        release_blobs(set_fields.get(f'{field}_ref') for field in BLOB_FIELDS)
+        return False
+    release_blobs(previous.get(ref) for ref in replaced)
+    return True
+
+
+def retain_blobs(refs):
+    """
+    Take another reference on each blob, for a files document that copies the
+    refs of another (duplicate uploads). Returns False, keeping no
+    references, if any blob was already released.
+    """
+    retained = []
+    for ref in refs:
+        if not ref:
+            continue
+        taken = get_blob_files().update_one(
+            {'_id': ref['blob_id'], 'ref_count': {'$gt': 0}},
+            {'$inc': {'ref_count': 1}}
+        )
+        if taken.matched_count != 1:
+            release_blobs(retained)
+            return False
+        retained.append(ref)
+    return True
+
+
+def release_blobs(refs):
+    """Drop one reference on each blob, deleting the blobs nothing references any more"""
+    from database import db
+
+    blob_files = get_blob_files()
+    for ref in refs:
+        if not ref:
+            continue
+        blob_id = ref['blob_id']
+        blob = blob_files.find_one_and_update(
+            {'_id': blob_id},
+            {'$inc': {'ref_count': -1}},
+            projection={'ref_count': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if blob is None or blob['ref_count'] > 0:
+            continue
+        # retain_blobs never revives a blob at zero, so the conditional delete
+        # only guards against a concurrent release deleting it first
+        if blob_files.delete_one({'_id': blob_id, 'ref_count': {'$lte': 0}}).deleted_count == 1:
+            db["text_blobs.chunks"].delete_many({'files_id': blob_id})
+
+
+def load_field(file_doc, field):
+    """A text or summary field of a files document, read from GridFS if it was moved there"""
+    ref = file_doc.get(f'{field}_ref')
+    if not ref:
+        if field == 'text':
+            return file_doc.get('content') or file_doc.get('text') or ''
+        return file_doc.get(field)
+
+    try:
+        raw = zlib.decompress(get_text_fs().get(ref['blob_id']).read()).decode('utf-8')
+    except gridfs.errors.NoFile:
+        print(f"⚠️ Missing {field} blob {ref['blob_id']} for file {file_doc.get('_id')}")
+        return None if BLOB_FIELDS[field] else ''
+    return json.loads(raw) if BLOB_FIELDS[field] else raw
+
+
+def load_file_text(file_doc):
+    return load_field(file_doc, 'text')
+
+
+def iter_field(file_doc, field):
+    """
+    Yield a text field in pieces, decompressing GridFS chunks as they are
+    read, so the whole value is never held in memory. Raises
+    gridfs.errors.NoFile if the stored blob is missing.
+    """
+    ref = file_doc.get(f'{field}_ref')
+    if not ref:
+        value = load_field(file_doc, field)
+        if value:
+            yield value
+        return
+
+    try:
+        grid_out = get_text_fs().get(ref['blob_id'])
+    except gridfs.errors.NoFile:
+        print(f"⚠️ Missing {field} blob {ref['blob_id']} for file {file_doc.get('_id')}")
+        raise
+
+    decompressor = zlib.decompressobj()
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        data = grid_out.read(TEXT_STORE_READ_SIZE)
+        if not data:
+            break
+        piece = decoder.decode(decompressor.decompress(data))
+        if piece:
+            yield piece
+    tail = decoder.decode(decompressor.flush(), final=True)
+    if tail:
+        yield tail
+
+
+def has_stored_text(file_doc):
+    return bool(file_doc.get('text_ref') or file_doc.get('text_length') or file_doc.get('content') or file_doc.get('text'))
+
+
+def summary_preview(file_doc):
+    """Summary for list views: the inline summary, or the stored preview of a long one"""
+    return file_doc.get('summary') or file_doc.get('summary_preview') or ''